@@ -0,0 +1,193 @@
+"""Local stand-in for the Massive snapshot API.
+
+Serves the single- and multi-ticker snapshot endpoints, the paginated
+reference tickers listing and aggregate bars, with configurable
+latency, error rate and 404 rate so the service can be load tested
+without touching api.massive.com. Run it standalone with
+
+    python -m bench.fake_massive --port 9100 --latency 0.05
+
+and point MASSIVE_BASE_URL at it, or mount it in-process with
+httpx.ASGITransport(app=create_app(...)).
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+import zlib
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+KNOWN_TICKERS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "AMD", "NFLX", "INTC"]
+SNAPSHOT_PATH = "/v2/snapshot/locale/us/markets/stocks/tickers"
+REFERENCE_PATH = "/v3/reference/tickers"
+AGGS_PATH = "/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{start}/{end}"
+TIMESPAN_MS = {"minute": 60_000, "hour": 3_600_000, "day": 86_400_000}
+
+
+@dataclass
+class FakeMassiveConfig:
+    latency: float = 0.0
+    error_rate: float = 0.0
+    not_found_rate: float = 0.0
+    extra_tickers: int = 500
+    seed: int = 0
+
+
+@dataclass
+class FakeMassiveStats:
+    calls: int = 0
+    single_calls: int = 0
+    multi_calls: int = 0
+    reference_calls: int = 0
+    aggs_calls: int = 0
+    aggs_ranges: list = field(default_factory=list)
+    errors: int = 0
+    not_found: int = 0
+    symbols: dict = field(default_factory=dict)
+
+
+def universe(config: FakeMassiveConfig) -> set[str]:
+    """Tickers the stand-in knows about."""
+    return set(KNOWN_TICKERS) | {f"T{i:04d}" for i in range(config.extra_tickers)}
+
+
+def ticker_snapshot(symbol: str) -> dict:
+    """A plausible, slowly moving snapshot derived from the symbol and clock."""
+    base = 20 + zlib.crc32(symbol.encode()) % 480
+    drift = ((time.time() // 1) % 60 - 30) / 100
+    price = round(base * (1 + drift / 100), 2)
+    change = round(price - base, 2)
+    return {
+        "ticker": symbol,
+        "todaysChange": change,
+        "todaysChangePerc": round(change / base * 100, 4),
+        "updated": time.time_ns(),
+        "min": {"c": price, "o": base, "h": max(base, price), "l": min(base, price), "v": 1000},
+        "day": {"c": price, "o": base, "h": max(base, price), "l": min(base, price), "v": 100000},
+        "prevDay": {"c": base},
+    }
+
+
+def bar(symbol: str, t: int) -> dict:
+    """A deterministic OHLCV bar starting at t (ms)."""
+    base = 20 + zlib.crc32(symbol.encode()) % 480
+    close = round(base * (1 + 0.02 * math.sin(t / 3_600_000)), 4)
+    return {"t": t, "o": close, "h": close * 1.001, "l": close * 0.999, "c": close, "v": 1000, "n": 10}
+
+
+def _ms(value: str) -> int:
+    if value.isdigit():
+        return int(value)
+    return int(time.mktime(time.strptime(value, "%Y-%m-%d")) - time.timezone) * 1000
+
+
+def create_app(config: FakeMassiveConfig = None) -> FastAPI:
+    """Build the stand-in app; its counters live on app.state.stats."""
+    config = config or FakeMassiveConfig()
+    known = universe(config)
+    rng = random.Random(config.seed)
+    stats = FakeMassiveStats()
+    app = FastAPI(title="Fake Massive API")
+    app.state.config = config
+    app.state.stats = stats
+
+    async def begin(symbols: list[str]):
+        stats.calls += 1
+        for symbol in symbols:
+            stats.symbols[symbol] = stats.symbols.get(symbol, 0) + 1
+        if config.latency:
+            await asyncio.sleep(config.latency)
+        if rng.random() < config.error_rate:
+            stats.errors += 1
+            return JSONResponse(status_code=503, content={"status": "ERROR"})
+        return None
+
+    @app.get(SNAPSHOT_PATH + "/{symbol}")
+    async def single_snapshot(symbol: str):
+        stats.single_calls += 1
+        error = await begin([symbol])
+        if error is not None:
+            return error
+        if symbol not in known or rng.random() < config.not_found_rate:
+            stats.not_found += 1
+            return JSONResponse(status_code=404, content={"status": "NOT_FOUND"})
+        return {"status": "OK", "ticker": ticker_snapshot(symbol)}
+
+    @app.get(SNAPSHOT_PATH)
+    async def multi_snapshot(tickers: str = Query("")):
+        stats.multi_calls += 1
+        symbols = [symbol for symbol in tickers.split(",") if symbol]
+        error = await begin(symbols)
+        if error is not None:
+            return error
+        found = [ticker_snapshot(symbol) for symbol in symbols if symbol in known]
+        return {"status": "OK", "count": len(found), "tickers": found}
+
+    @app.get(AGGS_PATH)
+    async def aggregates(
+        symbol: str, multiplier: int, timespan: str, start: str, end: str, limit: int = Query(5000)
+    ):
+        stats.aggs_calls += 1
+        error = await begin([symbol])
+        if error is not None:
+            return error
+        start_ms, end_ms = _ms(start), _ms(end)
+        stats.aggs_ranges.append((symbol, timespan, start_ms, end_ms))
+        if symbol not in known:
+            return {"status": "OK", "ticker": symbol, "resultsCount": 0}
+        step = TIMESPAN_MS[timespan] * multiplier
+        # No bars from the future
+        last = min(end_ms, int(time.time() * 1000))
+        first = -(-start_ms // step) * step
+        times = list(range(first, last + 1, step))
+        body = {"status": "OK", "ticker": symbol, "results": [bar(symbol, t) for t in times[:limit]]}
+        body["resultsCount"] = len(body["results"])
+        if len(times) > limit:
+            body["next_url"] = (
+                f"/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{times[limit]}/{end_ms}?limit={limit}"
+            )
+        return body
+
+    @app.get(REFERENCE_PATH)
+    async def reference_tickers(limit: int = Query(100), cursor: str = Query("")):
+        stats.reference_calls += 1
+        error = await begin([])
+        if error is not None:
+            return error
+        listed = sorted(known)
+        start = int(cursor or 0)
+        page = listed[start:start + limit]
+        body = {
+            "status": "OK",
+            "count": len(page),
+            "results": [{"ticker": symbol, "market": "stocks", "active": True} for symbol in page],
+        }
+        if start + limit < len(listed):
+            body["next_url"] = f"{REFERENCE_PATH}?cursor={start + limit}&limit={limit}"
+        return body
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = FakeMassiveConfig(
+        latency=args.latency, error_rate=args.error_rate, not_found_rate=args.not_found_rate
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Local stand-in for a Redis server.
+
+Speaks enough RESP2 for the shared quote cache (PING, AUTH, SELECT, GET,
+MGET, SET with NX/PX/EX, DEL, DBSIZE, FLUSHDB and the lock release and
+token bucket scripts) so multi-worker caching and rate limiting can be
+tested and load tested without a real Redis. Run it standalone with
+
+    python -m bench.fake_redis --port 6390
+
+and set QUOTE_CACHE_BACKEND=redis REDIS_URL=redis://127.0.0.1:6390/0.
+"""
+import argparse
+import asyncio
+import time
+from typing import Optional
+
+from cache_backends import RELEASE_LOCK_SCRIPT, TAKE_TOKENS_SCRIPT, _read_reply
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class FakeRedis:
+    """In-memory key space with per-key expiry, served over TCP."""
+
+    def __init__(self):
+        self.data: dict[bytes, tuple[bytes, Optional[float]]] = {}
+        self.commands = 0
+        self._server = None
+        self._handlers: set[asyncio.Task] = set()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _set(self, key: bytes, value: bytes, options: list[bytes]) -> bytes:
+        expires_at = None
+        upper = [option.upper() for option in options]
+        if b"PX" in upper:
+            expires_at = time.monotonic() + int(options[upper.index(b"PX") + 1]) / 1000
+        elif b"EX" in upper:
+            expires_at = time.monotonic() + int(options[upper.index(b"EX") + 1])
+        if b"NX" in upper and self._get(key) is not None:
+            return b"$-1\r\n"
+        self.data[key] = (value, expires_at)
+        return b"+OK\r\n"
+
+    def _take_tokens(self, key, rate, capacity, amount, keep, ttl_ms: bytes) -> bytes:
+        now = time.time()
+        state = self._get(key)
+        tokens, updated = (float(part) for part in state.split()) if state else (capacity, now)
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+        granted = tokens - amount >= keep
+        if granted:
+            tokens = min(capacity, tokens - amount)
+        self._set(key, b"%r %r" % (tokens, now), [b"PX", ttl_ms])
+        return b"*2\r\n:%d\r\n" % granted + _bulk(repr(tokens).encode())
+
+    def execute(self, args: list[bytes]) -> bytes:
+        self.commands += 1
+        command = args[0].upper()
+        if command in (b"PING",):
+            return b"+PONG\r\n"
+        if command in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if command == b"GET":
+            return _bulk(self._get(args[1]))
+        if command == b"MGET":
+            return b"*%d\r\n" % (len(args) - 1) + b"".join(_bulk(self._get(key)) for key in args[1:])
+        if command == b"SET":
+            return self._set(args[1], args[2], args[3:])
+        if command == b"DEL":
+            removed = sum(1 for key in args[1:] if self._get(key) is not None and self.data.pop(key))
+            return b":%d\r\n" % removed
+        if command == b"DBSIZE":
+            return b":%d\r\n" % sum(1 for key in list(self.data) if self._get(key) is not None)
+        if command == b"FLUSHDB":
+            self.data.clear()
+            return b"+OK\r\n"
+        if command == b"EVAL" and args[1].decode() == RELEASE_LOCK_SCRIPT:
+            key, token = args[3], args[4]
+            if self._get(key) == token:
+                del self.data[key]
+                return b":1\r\n"
+            return b":0\r\n"
+        if command == b"EVAL" and args[1].decode() == TAKE_TOKENS_SCRIPT:
+            return self._take_tokens(args[3], *(float(arg) for arg in args[4:8]), args[8])
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                args = await _read_reply(reader)
+                writer.write(self.execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening and return the bound port."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._handlers):
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+
+async def _serve(host: str, port: int):
+    fake = FakeRedis()
+    port = await fake.start(host, port)
+    print(f"Fake Redis listening on {host}:{port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(_serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Load generator for the Stock Quote API.
+
+Runs the app in-process against the local Massive stand-in and a
+throwaway SQLite database, then reports latency percentiles, throughput,
+DB queries per request and upstream calls per request for each scenario:
+
+    python -m bench.loadgen --scenarios quote,history --requests 2000
+    python -m bench.loadgen --save-baseline bench/baseline.json
+    python -m bench.loadgen --baseline bench/baseline.json
+
+With --baseline the run exits non-zero when a scenario regresses past
+--tolerance. Set DATABASE_URL to benchmark against another database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+SCENARIOS = ["signup", "token", "quote", "history"]
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "T0001", "T0002", "T0003", "INVALID"]
+PASSWORD = "benchpassword123"
+
+# Lower is better for these, higher is better for rps
+COMPARED = ("p50_ms", "p95_ms", "p99_ms", "db_queries_per_request", "upstream_calls_per_request")
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Counters:
+    """Counts DB statements and upstream calls while a scenario runs."""
+
+    def __init__(self, engine, fake_stats):
+        from sqlalchemy import event
+
+        self.queries = 0
+        self.fake_stats = fake_stats
+
+        def count(*args):
+            self.queries += 1
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+
+    def snapshot(self) -> tuple[int, int]:
+        return self.queries, self.fake_stats.calls
+
+
+@asynccontextmanager
+async def running_app(fake_config):
+    """Start the API in-process with upstream routed to the stand-in."""
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(prefix="stockquote-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    # Measure the service itself, not the per-user limits
+    os.environ.setdefault("USER_RATE_PER_MINUTE", "0")
+
+    import httpx
+    import upstream
+    from bench.fake_massive import create_app
+    from bootstrap import create_schema
+    from database import get_async_engine
+    from main import app
+
+    fake = create_app(fake_config)
+    await upstream.set_transport(httpx.ASGITransport(app=fake))
+    await create_schema()
+    counters = Counters(get_async_engine(), fake.state.stats)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client, counters
+    await upstream.set_transport(None)
+
+
+async def _login(client, email: str) -> dict:
+    await client.post("/signup", json={"email": email, "password": PASSWORD})
+    response = await client.post("/token", data={"username": email, "password": PASSWORD})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _request_factory(scenario: str, client, headers_pool: list[dict], run_id: str):
+    if scenario == "signup":
+        return lambda i: client.post(
+            "/signup", json={"email": f"{run_id}-{i}@bench.example.com", "password": PASSWORD}
+        )
+    if scenario == "token":
+        return lambda i: client.post(
+            "/token", data={"username": f"{run_id}-user-{i % len(headers_pool)}@bench.example.com", "password": PASSWORD}
+        )
+    if scenario == "quote":
+        return lambda i: client.post(
+            "/stock-quote",
+            headers=headers_pool[i % len(headers_pool)],
+            json={"symbol": SYMBOLS[i % len(SYMBOLS)]},
+        )
+    if scenario == "history":
+        return lambda i: client.get(
+            "/stock-quotes/history", headers=headers_pool[i % len(headers_pool)]
+        )
+    raise ValueError(f"Unknown scenario {scenario}")
+
+
+async def run_scenario(client, counters, scenario: str, requests: int, concurrency: int, users: int) -> dict:
+    """Fire requests for one scenario and summarise the results."""
+    run_id = f"{scenario}-{time.time_ns()}"
+    headers_pool = [
+        await _login(client, f"{run_id}-user-{i}@bench.example.com") for i in range(users)
+    ]
+    if scenario == "history":
+        # Give every user some history to page through
+        for i in range(users * 20):
+            await client.post(
+                "/stock-quote",
+                headers=headers_pool[i % users],
+                json={"symbol": SYMBOLS[i % (len(SYMBOLS) - 1)]},
+            )
+
+    send = _request_factory(scenario, client, headers_pool, run_id)
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            started = time.perf_counter()
+            response = await send(i)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    queries_before, upstream_before = counters.snapshot()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    queries_after, upstream_after = counters.snapshot()
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "db_queries_per_request": round((queries_after - queries_before) / requests, 3),
+        "upstream_calls_per_request": round((upstream_after - upstream_before) / requests, 3),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+async def run(scenarios: list[str], requests: int, concurrency: int, users: int, fake_config) -> dict:
+    """Run the given scenarios and return a report keyed by scenario."""
+    report = {}
+    async with running_app(fake_config) as (client, counters):
+        for scenario in scenarios:
+            # Argon2 makes auth scenarios slow; keep their request count modest
+            count = min(requests, 50) if scenario in ("signup", "token") else requests
+            report[scenario] = await run_scenario(client, counters, scenario, count, concurrency, users)
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of every metric that regressed past tolerance."""
+    regressions = []
+    for scenario, current in report.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        for metric in COMPARED:
+            before, after = previous.get(metric, 0), current.get(metric, 0)
+            if after > before * (1 + tolerance) and after - before > 1e-3:
+                regressions.append(f"{scenario}.{metric}: {before} -> {after}")
+        if current["rps"] < previous.get("rps", 0) * (1 - tolerance):
+            regressions.append(f"{scenario}.rps: {previous['rps']} -> {current['rps']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    from bench.fake_massive import FakeMassiveConfig
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02, help="fake upstream latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="compare against this stored report")
+    parser.add_argument("--save-baseline", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    fake_config = FakeMassiveConfig(
+        latency=args.latency, error_rate=args.error_rate, not_found_rate=args.not_found_rate
+    )
+    scenarios = [scenario for scenario in args.scenarios.split(",") if scenario]
+    report = asyncio.run(run(scenarios, args.requests, args.concurrency, args.users, fake_config))
+    text = json.dumps(report, indent=2, sort_keys=True)
+    print(text)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Benchmark of the history response serialization paths.
+
+Compares the ORM + Pydantic + stdlib JSON path FastAPI takes for a
+`response_model` with the column-tuple + orjson path the history
+endpoint uses, on the same rows from an in-memory SQLite database:
+
+    python -m bench.serialization --rows 50 --iterations 2000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+
+async def _session_factory(rows: int):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import StaticPool
+
+    import models
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    started = datetime(2024, 1, 2, 15, 30, tzinfo=timezone.utc)
+    async with sessions() as db:
+        db.add(models.User(id=1, email="bench@example.com", hashed_password="x"))
+        db.add_all(
+            models.StockQuote(
+                user_id=1,
+                symbol=f"T{i % 500:04d}",
+                price=100 + i / 7,
+                change=i / 13,
+                change_percent=i / 17,
+                created_at=started + timedelta(seconds=i, microseconds=i * 37),
+            )
+            for i in range(rows)
+        )
+        await db.commit()
+    return engine, sessions
+
+
+async def orm_path(db, limit: int) -> bytes:
+    """ORM instances validated through the response model, then stdlib JSON."""
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+
+    import models
+    import schemas
+
+    adapter = TypeAdapter(list[schemas.StockQuoteResponse])
+    quotes = (await db.scalars(
+        select(models.StockQuote).where(models.StockQuote.user_id == 1).order_by(
+            models.StockQuote.created_at.desc(), models.StockQuote.id.desc()
+        ).limit(limit)
+    )).all()
+    validated = adapter.validate_python(quotes, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+async def tuple_path(db, limit: int) -> bytes:
+    """Column tuples encoded directly with orjson."""
+    import models
+    from serialization import encode_quote_rows, select_quotes
+
+    rows = (await db.execute(
+        select_quotes().where(models.StockQuote.user_id == 1).order_by(
+            models.StockQuote.created_at.desc(), models.StockQuote.id.desc()
+        ).limit(limit)
+    )).all()
+    return encode_quote_rows(rows)
+
+
+async def run(rows: int, iterations: int) -> dict:
+    """Time both paths and return per-response timings in microseconds."""
+    engine, sessions = await _session_factory(rows)
+    report = {"rows": rows, "iterations": iterations}
+    try:
+        async with sessions() as db:
+            orm_body = json.loads(await orm_path(db, rows))
+            tuple_body = json.loads(await tuple_path(db, rows))
+            report["identical_output"] = orm_body == tuple_body
+            for name, path in (("orm_pydantic_json", orm_path), ("tuples_orjson", tuple_path)):
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    await path(db, rows)
+                    db.expunge_all()
+                report[f"{name}_us"] = round((time.perf_counter() - started) / iterations * 1e6, 1)
+    finally:
+        await engine.dispose()
+    report["speedup"] = round(report["orm_pydantic_json_us"] / report["tuples_orjson_us"], 2)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args(argv)
+    report = asyncio.run(run(args.rows, args.iterations))
+    print(json.dumps(report, indent=2))
+    return 0 if report["identical_output"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Measure worker cold start.
+
+Spawns fresh interpreters that import the app and run its startup
+lifespan, the way a new uvicorn worker does, and reports how long each
+phase took plus which heavy modules were loaded before the first request:
+
+    python -m bench.startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ("httpx", "pwdlib", "argon2", "asyncpg", "psycopg2", "aiosqlite", "numpy")
+
+WORKER = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once(env: dict) -> dict:
+    """Start one interpreter and return its phase timings."""
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs: int) -> dict:
+    """Measure several cold starts and summarise them."""
+    env = dict(os.environ)
+    if not env.get("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(prefix="stockquote-startup-"), "startup.db")
+        env["DATABASE_URL"] = f"sqlite:///{path}"
+    samples = [measure_once(env) for _ in range(runs)]
+    report = {"runs": runs, "loaded_before_first_request": samples[-1]["loaded"]}
+    for phase in ("import_ms", "lifespan_ms"):
+        values = [sample[phase] for sample in samples]
+        report[phase] = {
+            "median": round(statistics.median(values), 1),
+            "max": round(max(values), 1),
+        }
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.runs), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Create the database schema.
+
+Tables and indexes are no longer created when the app is imported. Run
+
+    python bootstrap.py
+
+once per deploy (for example as the pre-deploy command), or set
+DB_AUTO_CREATE=1 to create them during application startup instead.
+Existing tables are left alone apart from the upgrades in _upgrade; only
+missing tables, columns and indexes are added.
+"""
+import asyncio
+import os
+import sys
+
+DB_AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "0") == "1"
+
+
+def _create_all(conn):
+    from database import Base
+    import models  # noqa: F401  registers the tables on Base
+
+    Base.metadata.create_all(conn)
+    _upgrade(conn)
+    # create_all skips indexes of tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _upgrade(conn):
+    """Bring tables created before quote_snapshots, its prices_hash or partitioning up to date."""
+    from sqlalchemy import inspect
+
+    if conn.dialect.name == "postgresql":
+        # Tables partitioned before every index moved to the new parent left
+        # ix_stock_quotes_id on the legacy partition, where it blocks creating it
+        owner = conn.exec_driver_sql(
+            "SELECT tablename FROM pg_indexes WHERE indexname = 'ix_stock_quotes_id'"
+        ).scalar()
+        if owner == "stock_quotes_legacy":
+            conn.exec_driver_sql("ALTER INDEX ix_stock_quotes_id RENAME TO ix_stock_quotes_legacy_id")
+
+    snapshot_columns = {column["name"] for column in inspect(conn).get_columns("quote_snapshots")}
+    if "prices_hash" not in snapshot_columns:
+        if conn.dialect.name != "postgresql":
+            raise RuntimeError(
+                "quote_snapshots has no prices_hash column; recreate this database to upgrade it"
+            )
+        for statement in (
+            "ALTER TABLE quote_snapshots ADD COLUMN prices_hash BIGINT NOT NULL DEFAULT 0",
+            "ALTER TABLE quote_snapshots DROP CONSTRAINT uq_quote_snapshots_symbol_as_of",
+            "ALTER TABLE quote_snapshots ADD CONSTRAINT uq_quote_snapshots_symbol_as_of_prices "
+            "UNIQUE (symbol, as_of, prices_hash)",
+        ):
+            conn.exec_driver_sql(statement)
+
+    columns = {column["name"]: column for column in inspect(conn).get_columns("stock_quotes")}
+    if "snapshot_id" not in columns:
+        conn.exec_driver_sql(
+            "ALTER TABLE stock_quotes ADD COLUMN snapshot_id INTEGER REFERENCES quote_snapshots (id)"
+        )
+    if not columns["price"]["nullable"]:
+        if conn.dialect.name != "postgresql":
+            raise RuntimeError(
+                "stock_quotes.price is NOT NULL; recreate this database to use quote snapshots"
+            )
+        conn.exec_driver_sql("ALTER TABLE stock_quotes ALTER COLUMN price DROP NOT NULL")
+
+
+async def create_schema(engine=None):
+    """Create missing tables and indexes with the async engine."""
+    from database import get_async_engine
+
+    engine = engine or get_async_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(_create_all)
+
+
+async def _main():
+    from database import DATABASE_URL, dispose_engines, make_url
+
+    await create_schema()
+    await dispose_engines()
+    print(f"Schema ready on {make_url(DATABASE_URL).render_as_string(hide_password=True)}")
+
+
+def main() -> int:
+    asyncio.run(_main())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,418 @@
+import asyncio
+import os
+import struct
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+QUOTE_CACHE_BACKEND = os.getenv("QUOTE_CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "8"))
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "0.5"))
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "stockquote:")
+
+# A cache entry is (fetched_at, snapshot); snapshot is None for "ticker not found".
+# fetched_at is wall-clock time so workers on different hosts agree on freshness.
+Entry = tuple[float, Optional[dict]]
+
+_NOT_FOUND = struct.Struct("<Bd")
+_SNAPSHOT = struct.Struct("<Bddddq")
+_KIND_NOT_FOUND = 0
+_KIND_SNAPSHOT = 1
+_NAN = float("nan")
+
+
+def encode_entry(entry: Entry) -> bytes:
+    """Pack an entry into a fixed-size record (9 bytes, or 41 for a snapshot).
+
+    Only the snapshot fields the service reads are kept: last price,
+    today's change and change percent, and the upstream update time.
+    """
+    fetched_at, snapshot = entry
+    if snapshot is None:
+        return _NOT_FOUND.pack(_KIND_NOT_FOUND, fetched_at)
+    change = snapshot.get("todaysChange")
+    change_percent = snapshot.get("todaysChangePerc")
+    return _SNAPSHOT.pack(
+        _KIND_SNAPSHOT,
+        fetched_at,
+        snapshot["min"]["c"],
+        _NAN if change is None else change,
+        _NAN if change_percent is None else change_percent,
+        snapshot.get("updated") or 0,
+    )
+
+
+def decode_entry(symbol: str, data: bytes) -> Entry:
+    """Unpack a record written by encode_entry into a trimmed snapshot."""
+    if data[0] == _KIND_NOT_FOUND:
+        return _NOT_FOUND.unpack(data)[1], None
+    _, fetched_at, price, change, change_percent, updated = _SNAPSHOT.unpack(data)
+    return fetched_at, {
+        "ticker": symbol,
+        "todaysChange": None if change != change else change,
+        "todaysChangePerc": None if change_percent != change_percent else change_percent,
+        "updated": updated,
+        "min": {"c": price},
+    }
+
+
+class CacheBackend(ABC):
+    """Storage for quote cache entries.
+
+    Backends with shared = True are visible to every worker, so the quote
+    cache takes a refresh lock before fetching a symbol from upstream.
+    """
+    name = ""
+    shared = False
+
+    @abstractmethod
+    async def get_many(self, symbols: list[str]) -> dict[str, Entry]:
+        """Return the live entries among symbols."""
+
+    @abstractmethod
+    async def set_many(self, entries: dict[str, Entry], ttl: float):
+        """Store entries for ttl seconds."""
+
+    @abstractmethod
+    async def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        """Take a lock for ttl seconds; return its token, or None if it is held."""
+
+    @abstractmethod
+    async def release_lock(self, name: str, token: str):
+        """Release a lock, but only if it is still held with token."""
+
+    @abstractmethod
+    async def mark(self, name: str, ttl: float):
+        """Record that an event called name happened now; remembered for ttl seconds."""
+
+    @abstractmethod
+    async def marked_at(self, name: str) -> Optional[float]:
+        """Wall-clock time of the latest mark(name) still remembered, or None."""
+
+    @abstractmethod
+    async def take_tokens(
+        self, name: str, rate: float, capacity: float, amount: float = 1.0, keep: float = 0.0
+    ) -> tuple[bool, float]:
+        """Take amount tokens from the bucket called name if that leaves at least keep.
+
+        The bucket holds up to capacity tokens and refills at rate per
+        second; a negative amount gives tokens back. Returns whether the
+        tokens were taken and how many are left.
+        """
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def clear(self):
+        """Drop entries held by this process."""
+
+    async def close(self):
+        """Release connections."""
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU storage; entries are kept as Python objects."""
+    name = "memory"
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple[float, Entry]]" = OrderedDict()
+        self._locks: dict[str, tuple[float, str]] = {}
+        self._marks: dict[str, tuple[float, float]] = {}
+        # name -> (tokens, monotonic time of the last update); full buckets are dropped
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    async def get_many(self, symbols: list[str]) -> dict[str, Entry]:
+        now = time.monotonic()
+        found = {}
+        for symbol in symbols:
+            item = self._entries.get(symbol)
+            if item is None:
+                continue
+            if item[0] <= now:
+                del self._entries[symbol]
+                continue
+            self._entries.move_to_end(symbol)
+            found[symbol] = item[1]
+        return found
+
+    async def set_many(self, entries: dict[str, Entry], ttl: float):
+        expires_at = time.monotonic() + ttl
+        for symbol, entry in entries.items():
+            self._entries[symbol] = (expires_at, entry)
+            self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        now = time.monotonic()
+        held = self._locks.get(name)
+        if held is not None and held[0] > now:
+            return None
+        token = uuid.uuid4().hex
+        self._locks[name] = (now + ttl, token)
+        return token
+
+    async def release_lock(self, name: str, token: str):
+        held = self._locks.get(name)
+        if held is not None and held[1] == token:
+            del self._locks[name]
+
+    async def mark(self, name: str, ttl: float):
+        self._marks[name] = (time.monotonic() + ttl, time.time())
+
+    async def marked_at(self, name: str) -> Optional[float]:
+        held = self._marks.get(name)
+        if held is None or held[0] <= time.monotonic():
+            self._marks.pop(name, None)
+            return None
+        return held[1]
+
+    async def take_tokens(
+        self, name: str, rate: float, capacity: float, amount: float = 1.0, keep: float = 0.0
+    ) -> tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(name, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        granted = tokens - amount >= keep
+        if granted:
+            tokens = min(capacity, tokens - amount)
+        if tokens >= capacity:
+            self._buckets.pop(name, None)
+        else:
+            self._buckets[name] = (tokens, now)
+        return granted, tokens
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._locks.clear()
+        self._marks.clear()
+        self._buckets.clear()
+
+
+class RedisError(Exception):
+    """An error reply from the Redis server."""
+
+
+# Backend failures degrade to cache misses rather than failing requests
+BACKEND_ERRORS = (RedisError, OSError, asyncio.TimeoutError)
+
+
+# Delete the lock only if it still carries our token, so a lock that
+# expired and was taken by another worker is never released by us.
+RELEASE_LOCK_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+# Token bucket kept as "tokens updated" in one key and refilled on the
+# server's clock, so every worker spends the same budget. ARGV: rate per
+# second, capacity, amount, keep, key TTL in milliseconds.
+TAKE_TOKENS_SCRIPT = (
+    "local clock = redis.call('time') "
+    "local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000 "
+    "local rate, capacity = tonumber(ARGV[1]), tonumber(ARGV[2]) "
+    "local amount, keep = tonumber(ARGV[3]), tonumber(ARGV[4]) "
+    "local tokens, updated = capacity, now "
+    "local state = redis.call('get', KEYS[1]) "
+    "if state then "
+    "local sep = string.find(state, ' ') "
+    "tokens = tonumber(string.sub(state, 1, sep - 1)) "
+    "updated = tonumber(string.sub(state, sep + 1)) end "
+    "tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate) "
+    "local granted = 0 "
+    "if tokens - amount >= keep then tokens = math.min(capacity, tokens - amount) granted = 1 end "
+    "redis.call('set', KEYS[1], string.format('%.17g %.17g', tokens, now), 'PX', ARGV[5]) "
+    "return {granted, string.format('%.17g', tokens)}"
+)
+
+
+def _encode_command(args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Redis connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        # Returned rather than raised so the rest of a pipeline is still read
+        return RedisError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply {line!r}")
+
+
+class RedisClient:
+    """Minimal pooled RESP2 client over asyncio streams.
+
+    Supports what the quote cache needs: plain commands and pipelines.
+    Connections are opened on first use.
+    """
+
+    def __init__(self, url: str = REDIS_URL, pool_size: int = REDIS_POOL_SIZE, timeout: float = REDIS_TIMEOUT):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            writer.write(b"".join(_encode_command(args) for args in setup))
+            await writer.drain()
+            for _ in setup:
+                reply = await _read_reply(reader)
+                if isinstance(reply, RedisError):
+                    writer.close()
+                    raise reply
+        return reader, writer
+
+    async def pipeline(self, commands: list[tuple]) -> list:
+        """Send commands in one write and return their replies in order."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(self._connect(), self.timeout)
+                reader, writer = connection
+                writer.write(b"".join(_encode_command(args) for args in commands))
+                replies = await asyncio.wait_for(
+                    self._read_replies(reader, len(commands)), self.timeout
+                )
+            except BaseException:
+                # A connection left mid-reply cannot be reused
+                if connection is not None:
+                    connection[1].close()
+                raise
+            self._idle.append(connection)
+        return replies
+
+    async def _read_replies(self, reader, count: int) -> list:
+        return [await _read_reply(reader) for _ in range(count)]
+
+    async def execute(self, *args):
+        """Run one command, raising RedisError on an error reply."""
+        reply = (await self.pipeline([args]))[0]
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class RedisBackend(CacheBackend):
+    """Storage shared by every worker through a Redis-protocol server."""
+    name = "redis"
+    shared = True
+
+    def __init__(self, client: Optional[RedisClient] = None, prefix: str = REDIS_KEY_PREFIX):
+        self.client = client or RedisClient()
+        self.prefix = prefix
+
+    def _key(self, symbol: str) -> str:
+        return f"{self.prefix}quote:{symbol}"
+
+    async def get_many(self, symbols: list[str]) -> dict[str, Entry]:
+        if not symbols:
+            return {}
+        values = await self.client.execute("MGET", *(self._key(symbol) for symbol in symbols))
+        return {
+            symbol: decode_entry(symbol, value)
+            for symbol, value in zip(symbols, values)
+            if value is not None
+        }
+
+    async def set_many(self, entries: dict[str, Entry], ttl: float):
+        if not entries:
+            return
+        ttl_ms = max(1, int(ttl * 1000))
+        replies = await self.client.pipeline([
+            ("SET", self._key(symbol), encode_entry(entry), "PX", ttl_ms)
+            for symbol, entry in entries.items()
+        ])
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+
+    async def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        reply = await self.client.execute(
+            "SET", f"{self.prefix}lock:{name}", token, "NX", "PX", max(1, int(ttl * 1000))
+        )
+        return token if reply == "OK" else None
+
+    async def release_lock(self, name: str, token: str):
+        await self.client.execute("EVAL", RELEASE_LOCK_SCRIPT, 1, f"{self.prefix}lock:{name}", token)
+
+    async def mark(self, name: str, ttl: float):
+        await self.client.execute("SET", f"{self.prefix}mark:{name}", repr(time.time()), "PX", max(1, int(ttl * 1000)))
+
+    async def marked_at(self, name: str) -> Optional[float]:
+        value = await self.client.execute("GET", f"{self.prefix}mark:{name}")
+        return None if value is None else float(value)
+
+    async def take_tokens(
+        self, name: str, rate: float, capacity: float, amount: float = 1.0, keep: float = 0.0
+    ) -> tuple[bool, float]:
+        # A bucket left alone until it is full again is the same as no bucket
+        ttl_ms = int(capacity / rate * 1000) + 1000 if rate > 0 else 86_400_000
+        granted, tokens = await self.client.execute(
+            "EVAL", TAKE_TOKENS_SCRIPT, 1, f"{self.prefix}bucket:{name}",
+            repr(rate), repr(capacity), repr(amount), repr(keep), ttl_ms,
+        )
+        return bool(granted), float(tokens)
+
+    async def close(self):
+        await self.client.close()
+
+
+def create_backend(name: str = QUOTE_CACHE_BACKEND, max_size: int = 1024) -> CacheBackend:
+    """Build the backend selected by QUOTE_CACHE_BACKEND."""
+    if name == "memory":
+        return MemoryBackend(max_size)
+    if name == "redis":
+        return RedisBackend()
+    raise ValueError(f"Unknown QUOTE_CACHE_BACKEND {name!r}")
@@ -0,0 +1,140 @@
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("UPSTREAM_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_MIN_CALLS = int(os.getenv("UPSTREAM_BREAKER_MIN_CALLS", "20"))
+BREAKER_WINDOW = int(os.getenv("UPSTREAM_BREAKER_WINDOW", "50"))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("UPSTREAM_BREAKER_SLOW_SECONDS", "2"))
+BREAKER_OPEN_SECONDS = float(os.getenv("UPSTREAM_BREAKER_OPEN_SECONDS", "15"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("UPSTREAM_BREAKER_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency while the circuit is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fails fast when a dependency keeps erroring or answering slowly.
+
+    The circuit opens after failure_threshold consecutive failures, or
+    when at least min_calls of the last window calls have an error rate
+    of error_rate or more. Calls slower than slow_call_seconds count as
+    failures. After open_seconds the circuit lets half_open_probes calls
+    through; a successful probe closes it, a failed one reopens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        error_rate: float = BREAKER_ERROR_RATE,
+        min_calls: int = BREAKER_MIN_CALLS,
+        window: int = BREAKER_WINDOW,
+        slow_call_seconds: float = BREAKER_SLOW_CALL_SECONDS,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        half_open_probes: int = BREAKER_HALF_OPEN_PROBES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+        self._outcomes: deque = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        """Close the circuit and forget all outcomes."""
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._consecutive_failures = 0
+        self._probes_in_flight = 0
+        self._outcomes.clear()
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def _before_call(self):
+        state = self.state
+        if state == OPEN:
+            self.rejected += 1
+            raise CircuitOpen(self.open_seconds - (self.clock() - self._opened_at))
+        if state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self.rejected += 1
+                raise CircuitOpen(0.0)
+            self._probes_in_flight += 1
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self.times_opened += 1
+
+    def _record(self, failed: bool, probing: bool):
+        if probing:
+            self._probes_in_flight -= 1
+            if failed:
+                self._open()
+            else:
+                self._state = CLOSED
+                self._consecutive_failures = 0
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append(failed)
+        self._consecutive_failures = self._consecutive_failures + 1 if failed else 0
+        if self._state != CLOSED:
+            return
+        if self._consecutive_failures >= self.failure_threshold:
+            self._open()
+        elif len(self._outcomes) >= self.min_calls:
+            if sum(self._outcomes) / len(self._outcomes) >= self.error_rate:
+                self._open()
+
+    async def call(self, fn: Callable[..., Awaitable], *args, **kwargs):
+        """Run fn through the breaker, raising CircuitOpen if it is open."""
+        self._before_call()
+        probing = self._state == HALF_OPEN
+        started = self.clock()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self._record(True, probing)
+            raise
+        except BaseException:
+            # Cancelled callers say nothing about the dependency's health
+            if probing:
+                self._probes_in_flight -= 1
+            raise
+        self._record(self.clock() - started >= self.slow_call_seconds, probing)
+        return result
+
+    def stats(self) -> dict:
+        """Return state and counters for monitoring."""
+        outcomes = len(self._outcomes)
+        return {
+            "state": self.state,
+            "error_rate": round(sum(self._outcomes) / outcomes, 3) if outcomes else 0.0,
+            "recent_calls": outcomes,
+            "consecutive_failures": self._consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
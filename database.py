@@ -1,7 +1,14 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import time
+from functools import lru_cache
+
+from metrics import POOL_CHECKOUT_WAIT
 
 DATABASE_URL = os.getenv("DATABASE_URL", '')
 
@@ -9,16 +16,144 @@ DATABASE_URL = os.getenv("DATABASE_URL", '')
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg / aiosqlite)."""
+    if url.startswith("postgresql://"):
+        parsed = make_url(url).set(drivername="postgresql+asyncpg")
+        # asyncpg spells libpq's sslmode as ssl
+        if "sslmode" in parsed.query:
+            query = dict(parsed.query)
+            query["ssl"] = query.pop("sslmode")
+            parsed = parsed.set(query=query)
+        return parsed.render_as_string(hide_password=False)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+class _CheckoutTimingMixin:
+    """Records how long each connection checkout waits on the pool."""
+    metric_label = ""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.labels(self.metric_label).observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_CheckoutTimingMixin, QueuePool):
+    metric_label = "sync"
+
+
+class TimedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    metric_label = "async"
+
+
+def pool_options(url: str, poolclass=None) -> dict:
+    """Connection pool settings for server databases (SQLite keeps its defaults)."""
+    if url.startswith("sqlite"):
+        return {}
+    options = {"poolclass": poolclass} if poolclass is not None else {}
+    return {
+        **options,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+@lru_cache(maxsize=None)
+def get_engine():
+    """The sync engine, created on first use so importing this module never connects."""
+    return create_engine(DATABASE_URL, **pool_options(DATABASE_URL, TimedQueuePool))
+
+
+@lru_cache(maxsize=None)
+def get_async_engine():
+    """The async engine used by request handlers, created on first use."""
+    return create_async_engine(
+        async_database_url(DATABASE_URL), **pool_options(DATABASE_URL, TimedAsyncQueuePool)
+    )
+
+
+@lru_cache(maxsize=None)
+def get_sessionmaker():
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+@lru_cache(maxsize=None)
+def get_async_sessionmaker():
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Open a new async session."""
+    return get_async_sessionmaker()()
+
+
+def created_engines() -> dict:
+    """Engines that have been created so far, keyed by pool label."""
+    engines = {}
+    if get_engine.cache_info().currsize:
+        engines["sync"] = get_engine()
+    if get_async_engine.cache_info().currsize:
+        engines["async"] = get_async_engine()
+    return engines
+
+
+async def dispose_engines():
+    """Close pooled connections of every engine that was created."""
+    for label, created in created_engines().items():
+        if label == "async":
+            await created.dispose()
+        else:
+            created.dispose()
+
+
+def insert_ignoring_conflicts(table, dialect: str, index_elements: list[str]):
+    """INSERT into table that skips rows conflicting on index_elements.
+
+    Dialects without ON CONFLICT get a plain INSERT, where a conflicting
+    row fails the statement like any other constraint violation.
+    """
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table)
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
+
+def __getattr__(name):
+    # `database.engine` and friends still work, but only build the engine when used
+    lazy = {"engine": get_engine, "async_engine": get_async_engine, "SessionLocal": get_sessionmaker}
+    if name in lazy:
+        return lazy[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 Base = declarative_base()
 
 
 def get_db():
     """Dependency to get database session."""
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Dependency to get an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
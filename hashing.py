@@ -0,0 +1,76 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(os.cpu_count() or 1)))
+HASH_POOL_QUEUE_LIMIT = int(os.getenv("HASH_POOL_QUEUE_LIMIT", "32"))
+
+
+@lru_cache(maxsize=None)
+def get_password_hasher():
+    """The Argon2 hasher; pwdlib and argon2 are imported on first use."""
+    from pwdlib import PasswordHash
+
+    return PasswordHash.recommended()
+
+
+def __getattr__(name):
+    if name == "password_hash":
+        return get_password_hasher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class HashingPoolSaturated(Exception):
+    """Raised when too many hashing jobs are already waiting."""
+
+
+class PasswordHashPool:
+    """Bounded worker pool for Argon2 hashing and verification.
+
+    Argon2 releases the GIL while it works, so a thread pool sized to the
+    available cores keeps hashing off the event loop without the cost of
+    extra processes. Jobs beyond the workers plus queue_limit are rejected.
+    """
+
+    def __init__(self, workers: int = HASH_POOL_WORKERS, queue_limit: int = HASH_POOL_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="argon2"
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        # Only touched from the event loop thread, so no lock is needed.
+        if self.pending >= self.workers + self.queue_limit:
+            raise HashingPoolSaturated()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the pool."""
+        return await self._run(get_password_hasher().hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """Verify a password and return a new hash if its parameters are outdated."""
+        return await self._run(get_password_hasher().verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        """Stop the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_pool = PasswordHashPool()
@@ -1,23 +1,105 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Depends, HTTPException, Path, Query, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta, timezone
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 import jwt
 from jwt.exceptions import InvalidTokenError
-from pwdlib import PasswordHash
+import math
 import os
-import requests
+import zlib
 
-from database import get_db, engine
+from bootstrap import DB_AUTO_CREATE, create_schema
+from database import get_async_db, AsyncSessionLocal, created_engines, dispose_engines
 import models as models
 import schemas as schemas
+import upstream
+from metrics import STARTUP_SECONDS, Counter, Gauge, MetricsMiddleware, registry, stage
+from principal_cache import Principal, principal_cache
+from hashing import HashingPoolSaturated, get_password_hasher, password_pool
+from streaming import STREAM_MAX_SYMBOLS, QuoteHub, quote_events
+from prefetch import PREFETCH_TOP_N, HotSymbolPrefetcher, SymbolCounter
+from write_behind import QUOTE_WRITE_BEHIND, QuoteWriter, WriteBehindFull
+from quote_cache import quote_cache
+from maintenance import MAINTENANCE_INTERVAL, MaintenanceTask
+from rate_limit import RateLimited, background_priority, upstream_scheduler, user_limiter
+from tickers import (
+    MAX_TICKER_SEARCH_LIMIT, TICKER_REFRESH_INTERVAL, TICKER_SEARCH_LIMIT, TICKER_UNIVERSE_FILE,
+    TickerRefresher, ticker_universe
+)
+from serialization import (
+    RawJSONResponse, encode_portfolio, encode_quote_csv, encode_quote_ndjson, encode_quote_rows, encode_series,
+    select_quotes
+)
+from portfolio import value_portfolio
+from series import (
+    SERIES_DEFAULT_POINTS, SERIES_MAX_DAYS, SERIES_MAX_POINTS, downsample, series_cache, series_columns,
+    utc_today
+)
+from snapshots import quote_values, snapshot_store
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+quote_writer = QuoteWriter(AsyncSessionLocal)
 
-app = FastAPI(title="Stock Quote API", version="1.0.0")
+
+async def fetch_stream_quote(symbol: str):
+    """Snapshot values pushed to streaming subscribers."""
+    # Polling yields the upstream budget to interactive requests
+    with background_priority():
+        ticker = await quote_cache.get_or_fetch(symbol, upstream.fetch_snapshot)
+    return None if ticker is None else quote_values(ticker)
+
+
+quote_hub = QuoteHub(fetch_stream_quote)
+
+hot_symbols = SymbolCounter()
+prefetcher = HotSymbolPrefetcher(
+    quote_cache, hot_symbols, upstream.fetch_snapshots, upstream.UPSTREAM_BATCH_CHUNK_SIZE
+)
+ticker_refresher = TickerRefresher(ticker_universe, upstream.fetch_ticker_universe)
+maintenance_task = MaintenanceTask()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown."""
+    started = time.perf_counter()
+    if DB_AUTO_CREATE:
+        await create_schema()
+    if QUOTE_WRITE_BEHIND:
+        await quote_writer.start()
+    if PREFETCH_TOP_N > 0:
+        prefetcher.start()
+    if TICKER_UNIVERSE_FILE:
+        ticker_universe.load_file(TICKER_UNIVERSE_FILE)
+    if TICKER_REFRESH_INTERVAL > 0:
+        ticker_refresher.start()
+    if MAINTENANCE_INTERVAL > 0:
+        maintenance_task.start()
+    STARTUP_SECONDS.labels("lifespan").set(time.perf_counter() - started)
+    yield
+    await maintenance_task.stop()
+    await ticker_refresher.stop()
+    await prefetcher.stop()
+    await quote_hub.close()
+    await quote_writer.stop()
+    await upstream.close_client()
+    await quote_cache.close()
+    await dispose_engines()
+    password_pool.shutdown()
+
+
+app = FastAPI(title="Stock Quote API", version="1.0.0", lifespan=lifespan)
+
+app.add_middleware(MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,19 +113,21 @@ SECRET_KEY = os.getenv("SECRET_KEY", '')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-password_hash = PasswordHash.recommended()
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
-    return password_hash.verify(plain_password, hashed_password)
+    return get_password_hasher().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
-    return password_hash.hash(password)
+    return get_password_hasher().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -58,43 +142,130 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_user_by_email(db: Session, email: str):
+async def get_user_by_email(db: AsyncSession, email: str):
     """Get user by email."""
-    return db.query(models.User).filter(models.User.email == email).first()
+    result = await db.scalars(select(models.User).where(models.User.email == email))
+    return result.first()
+
 
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    """Authenticate user and return user object if valid.
 
-def authenticate_user(db: Session, email: str, password: str):
-    """Authenticate user and return user object if valid."""
-    user = get_user_by_email(db, email)
+    Hashes made with outdated Argon2 parameters are upgraded on success.
+    """
+    user = await get_user_by_email(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, updated_hash = await password_pool.verify_and_update(password, user.hashed_password)
+    if not valid:
         return False
+    if updated_hash:
+        user.hashed_password = updated_hash
+        await db.commit()
     return user
 
 
+async def load_principal(db: AsyncSession, email: str, user_id: Optional[int] = None):
+    """Load the principal for token claims, or None if the user is gone."""
+    if user_id is not None:
+        user = await db.get(models.User, user_id)
+        if user is not None and user.email != email:
+            user = None
+    else:
+        user = await get_user_by_email(db, email=email)
+    if user is None:
+        return None
+    return Principal(id=user.id, email=user.email, created_at=user.created_at)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get current user from JWT token."""
+    """Get current user from JWT token.
+
+    Verified tokens are cached briefly, so repeat requests skip both the
+    JWT decode and the users query.
+    """
+    principal = await principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with stage("jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
     except InvalidTokenError:
         raise credentials_exception
     
-    user = get_user_by_email(db, email=email)
-    if user is None:
+    with stage("user_lookup"):
+        principal = await load_principal(db, email=email, user_id=payload.get("uid"))
+    if principal is None:
         raise credentials_exception
-    return user
+    principal_cache.put(token, principal, token_exp=payload.get("exp"))
+    return principal
+
+
+async def get_rate_limited_user(current_user: Principal = Depends(get_current_user)) -> Principal:
+    """The current user, after spending one request from their rate limit."""
+    await user_limiter.check(current_user.id)
+    return current_user
+
+
+@app.exception_handler(HashingPoolSaturated)
+async def hashing_pool_saturated_handler(request, exc):
+    """Shed load when the password hashing queue is full."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+def upstream_unavailable(exc: upstream.UpstreamUnavailable) -> HTTPException:
+    """502 for a failing quote service (503 when its request budget is spent),
+    with Retry-After when it is known."""
+    headers = None
+    if exc.retry_after is not None:
+        headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    if isinstance(exc, upstream.UpstreamQuotaExhausted):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Quote request budget exhausted",
+            headers=headers,
+        )
+    return HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail="Quote service unavailable",
+        headers=headers,
+    )
+
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request, exc):
+    """Per-user request rate exceeded."""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many requests"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(WriteBehindFull)
+async def write_behind_full_handler(request, exc):
+    """Apply backpressure when the quote write queue is full."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
 
 
 @app.get("/")
@@ -103,25 +274,127 @@ async def root():
     return {"message": "Stock Quote API is running"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@registry.collector
+def collect_runtime_metrics():
+    """Pool usage and component counters, read at scrape time."""
+    pool = Gauge("db_pool_connections", "DB pool connections by state", ("pool", "state"))
+    for label, pooled_engine in created_engines().items():
+        engine_pool = pooled_engine.pool
+        if not hasattr(engine_pool, "checkedout"):
+            continue
+        pool.labels(label, "size").set(engine_pool.size())
+        pool.labels(label, "checked_out").set(engine_pool.checkedout())
+        pool.labels(label, "checked_in").set(engine_pool.checkedin())
+        pool.labels(label, "overflow").set(engine_pool.overflow())
+
+    cache = Counter("quote_cache_lookups_total", "Quote cache lookups by result", ("result",))
+    cache_stats = quote_cache.stats()
+    for result in ("hits", "misses", "coalesced", "stale_served", "negative_hits", "lock_waits"):
+        cache.labels(result).set(cache_stats[result])
+
+    writer_stats = quote_writer.stats()
+    writer = Gauge("write_behind_buffered_rows", "Quote rows waiting to be flushed")
+    writer.labels().set(writer_stats["buffered"])
+    dropped = Counter("write_behind_dropped_rows_total", "Buffered quote rows dropped after failed flushes")
+    dropped.labels().set(writer_stats["dropped_rows"])
+
+    streams = Gauge("stream_subscriptions", "Open streaming subscriptions")
+    streams.labels().set(quote_hub.stats()["subscriptions"])
+
+    breaker = Gauge("upstream_circuit_open", "1 when the quote service circuit is open or half-open")
+    breaker.labels().set(0 if upstream.breaker.state == "closed" else 1)
+    return [pool, cache, writer, dropped, streams, breaker]
+
+
+@app.get("/stats/quote-cache")
+async def quote_cache_stats():
+    """Quote cache hit/miss counters."""
+    return quote_cache.stats()
+
+
+@app.get("/stats/snapshots")
+async def snapshot_stats():
+    """Shared quote snapshot reuse counters."""
+    return snapshot_store.stats()
+
+
+@app.get("/stats/write-behind")
+async def write_behind_stats():
+    """Write-behind queue counters."""
+    return quote_writer.stats()
+
+
+@app.get("/stats/stream")
+async def stream_stats():
+    """Streaming poller and subscriber counts."""
+    return quote_hub.stats()
+
+
+@app.get("/stats/upstream")
+async def upstream_stats():
+    """Circuit breaker state for the quote service."""
+    return upstream.breaker.stats()
+
+
+@app.get("/stats/rate-limit")
+async def rate_limit_stats():
+    """Upstream budget and per-user rate limiting counters."""
+    return {"upstream": upstream_scheduler.stats(), "users": user_limiter.stats()}
+
+
+@app.get("/stats/series")
+async def series_stats():
+    """Aggregate bar cache size and hit counters."""
+    return series_cache.stats()
+
+
+@app.get("/stats/tickers")
+async def ticker_stats():
+    """Ticker universe size, age and rejected symbols."""
+    return {
+        **ticker_universe.stats(),
+        "refreshes": ticker_refresher.refreshes,
+        "refresh_failures": ticker_refresher.failures,
+    }
+
+
+@app.get("/stats/maintenance")
+async def maintenance_stats():
+    """Retention and rollup pass counters and the last pass's report."""
+    return maintenance_task.stats()
+
+
+@app.get("/stats/prefetch")
+async def prefetch_stats():
+    """Hot-symbol prefetcher counters."""
+    return prefetcher.stats()
+
+
 @app.post("/signup", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def signup(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
 
-    db_user = get_user_by_email(db, email=user.email)
+    db_user = await get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_pool.hash(user.password)
     db_user = models.User(
         email=user.email,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
@@ -129,10 +402,10 @@ async def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
 @app.post("/token", response_model=schemas.Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login endpoint - validates user credentials and returns JWT token."""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -142,31 +415,46 @@ async def login(
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @app.post("/logout")
-async def logout(current_user: models.User = Depends(get_current_user)):
+async def logout(current_user: Principal = Depends(get_current_user)):
     """Logout endpoint (client should discard token)."""
     return {"message": "Successfully logged out"}
 
 
 @app.delete("/users/me", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Delete the current user's account."""
-    db.delete(current_user)
-    db.commit()
+    """Delete the current user's account, quote history, holdings and watchlists.
+
+    Quotes are removed with one set-based DELETE instead of being loaded
+    through the ORM cascade, so memory use does not grow with history.
+    """
+    if quote_writer.running:
+        quote_writer.discard_user(current_user.id)
+    for table in (models.StockQuote, models.QuoteDailyRollup, models.Holding, models.Watchlist):
+        await db.execute(
+            delete(table).where(table.user_id == current_user.id),
+            execution_options={"synchronize_session": False},
+        )
+    await db.execute(
+        delete(models.User).where(models.User.id == current_user.id),
+        execution_options={"synchronize_session": False},
+    )
+    await db.commit()
+    await principal_cache.revoke_user(current_user.id)
     return None
 
 
 @app.get("/users/me", response_model=schemas.UserResponse)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
     """Get current user information."""
     return current_user
 
@@ -174,45 +462,463 @@ async def read_users_me(current_user: models.User = Depends(get_current_user)):
 @app.post("/stock-quote", response_model=schemas.StockQuoteResponse)
 async def get_stock_quote(
     quote_request: schemas.StockQuoteRequest,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    current_user: Principal = Depends(get_rate_limited_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get stock quote information (requires authentication)."""
-    symbol = quote_request.symbol.upper()
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML)"
-    }
-    API_KEY = os.getenv("MASSIVE")
-    url = f"https://api.massive.com/v2/snapshot/locale/us/markets/stocks/tickers/{symbol}?apiKey={API_KEY}"
-    response = requests.get(url=url, headers=headers)
+    """Get stock quote information (requires authentication).
+
+    If the quote service is failing, the last known snapshot is returned
+    with an `X-Quote-Stale: true` header while it is still recent enough.
+    """
+    # Unknown tickers are answered locally, without an upstream round trip
+    symbol = ticker_universe.resolve(quote_request.symbol)
+    if symbol is None:
+        raise HTTPException(status_code=404, detail="Ticker not found")
+    try:
+        ticker = await quote_cache.get_or_fetch(symbol, upstream.fetch_snapshot)
+    except upstream.UpstreamUnavailable as exc:
+        ticker = await quote_cache.get_stale(symbol)
+        if ticker is None:
+            raise upstream_unavailable(exc)
+        response.headers["X-Quote-Stale"] = "true"
+
+    if ticker is None:
+        raise HTTPException(status_code=404, detail="Ticker not found")
     
-    if response.status_code == 404:
+    hot_symbols.record(symbol)
+    snapshot_ids = await snapshot_store.resolve(db, {symbol: ticker}, commit=quote_writer.running)
+    values = {"user_id": current_user.id, "symbol": symbol, "snapshot_id": snapshot_ids[symbol]}
+    if quote_writer.running:
+        row = await quote_writer.submit(values)
+    else:
+        row = (await db.execute(
+            insert(models.StockQuote).returning(models.StockQuote.id, models.StockQuote.created_at),
+            values
+        )).mappings().one()
+        with stage("db_commit"):
+            await db.commit()
+    return {**row, "symbol": symbol, **quote_values(ticker)}
+
+
+@app.post("/stock-quotes/batch", response_model=schemas.StockQuoteBatchResponse)
+async def get_stock_quotes_batch(
+    batch_request: schemas.StockQuoteBatchRequest,
+    current_user: Principal = Depends(get_rate_limited_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get quotes for many symbols in one request (requires authentication)."""
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in batch_request.symbols))
+    known = [symbol for symbol in symbols if ticker_universe.resolve(symbol) is not None]
+    stale, unavailable = set(), set()
+    tickers = {}
+    try:
+        if known:
+            tickers = await quote_cache.get_or_fetch_many(known, upstream.fetch_snapshots)
+    except upstream.UpstreamUnavailable:
+        tickers = await quote_cache.get_stale_many(known)
+        stale = set(tickers)
+        unavailable = set(known) - stale
+
+    found = [symbol for symbol in symbols if tickers.get(symbol) is not None]
+    for symbol in found:
+        hot_symbols.record(symbol)
+    quotes = {}
+    if found:
+        snapshot_ids = await snapshot_store.resolve(
+            db, {symbol: tickers[symbol] for symbol in found}, commit=quote_writer.running
+        )
+        rows = [
+            {"user_id": current_user.id, "symbol": symbol, "snapshot_id": snapshot_ids[symbol]}
+            for symbol in found
+        ]
+        if quote_writer.running:
+            inserted = await quote_writer.submit_many(rows)
+        else:
+            inserted = (await db.execute(
+                insert(models.StockQuote).returning(
+                    models.StockQuote.id, models.StockQuote.created_at, sort_by_parameter_order=True
+                ),
+                rows
+            )).mappings().all()
+            await db.commit()
+        quotes = {
+            symbol: {**row, "symbol": symbol, **quote_values(tickers[symbol])}
+            for symbol, row in zip(found, inserted)
+        }
+
+    results = []
+    for symbol in symbols:
+        if symbol in quotes:
+            results.append({"symbol": symbol, "quote": quotes[symbol], "stale": symbol in stale})
+        elif symbol in unavailable:
+            results.append({"symbol": symbol, "error": "Quote service unavailable"})
+        else:
+            results.append({"symbol": symbol, "error": "Ticker not found"})
+    return {"results": results}
+
+
+@app.get("/stock-quotes/stream")
+async def stream_stock_quotes(
+    symbols: str = Query(..., description="Comma-separated ticker symbols"),
+    current_user: Principal = Depends(get_rate_limited_user)
+):
+    """Stream live quotes as Server-Sent Events (requires authentication).
+
+    Each symbol is polled once per worker no matter how many clients
+    watch it; clients that fall behind are disconnected.
+    """
+    requested = list(dict.fromkeys(
+        symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()
+    ))
+    if not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No symbols requested"
+        )
+    if len(requested) > STREAM_MAX_SYMBOLS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {STREAM_MAX_SYMBOLS} symbols per stream"
+        )
+    unknown = [symbol for symbol in requested if ticker_universe.resolve(symbol) is None]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Ticker not found: {', '.join(unknown)}"
+        )
+    return StreamingResponse(
+        quote_events(quote_hub, requested),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/stock-quotes/{symbol}/series", response_model=schemas.PriceSeriesResponse)
+async def get_price_series(
+    symbol: str,
+    timespan: str = Query("minute", pattern="^(minute|hour|day)$"),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    points: int = Query(SERIES_DEFAULT_POINTS, ge=2, le=SERIES_MAX_POINTS),
+    method: str = Query("lttb", pattern="^(lttb|minmax)$"),
+    current_user: Principal = Depends(get_rate_limited_user)
+):
+    """Get price bars for charting between two UTC days (requires authentication).
+
+    `from` and `to` default to today. Bars are downsampled to at most
+    `points` with LTTB or min/max bucketing on their close prices.
+    """
+    resolved = ticker_universe.resolve(symbol)
+    if resolved is None:
         raise HTTPException(status_code=404, detail="Ticker not found")
+    today = utc_today()
+    end = min(end or today, today)
+    start = start or end
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    if (end - start).days >= SERIES_MAX_DAYS[timespan]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {SERIES_MAX_DAYS[timespan]} days of {timespan} bars per request",
+        )
+    try:
+        bars = await series_cache.get_bars(resolved, timespan, start, end, upstream.fetch_aggregates)
+    except upstream.UpstreamUnavailable as exc:
+        raise upstream_unavailable(exc)
+    payload = {
+        "symbol": resolved,
+        "timespan": timespan,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "method": method,
+        "bars": len(bars),
+        **series_columns(downsample(bars, points, method)),
+    }
+    return RawJSONResponse(encode_series(payload))
 
-    ticker = response.json()["ticker"]
-    
-    db_quote = models.StockQuote(
-        user_id=current_user.id,
-        symbol=symbol,
-        price=ticker["min"]["c"],
-        change=ticker["todaysChange"],
-        change_percent=ticker["todaysChangePerc"]
-    )
-    db.add(db_quote)
-    db.commit()
-    db.refresh(db_quote)
-    
-    return db_quote
+
+@app.get("/tickers/search", response_model=schemas.TickerSearchResponse)
+async def search_tickers(
+    prefix: str = Query(..., min_length=1, max_length=16),
+    limit: int = Query(TICKER_SEARCH_LIMIT, ge=1, le=MAX_TICKER_SEARCH_LIMIT),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Autocomplete ticker symbols from the local ticker universe (requires authentication)."""
+    return {"prefix": prefix.strip().upper(), "symbols": ticker_universe.search(prefix, limit)}
+
+
+def resolve_symbols(symbols: list[str]) -> list[str]:
+    """Normalize symbols against the ticker universe, or 404 on the first unknown one."""
+    resolved = []
+    for symbol in symbols:
+        ticker = ticker_universe.resolve(symbol)
+        if ticker is None:
+            raise HTTPException(status_code=404, detail=f"Ticker not found: {symbol}")
+        resolved.append(ticker)
+    return resolved
+
+
+@app.get("/portfolio", response_model=schemas.PortfolioResponse)
+async def get_portfolio(
+    current_user: Principal = Depends(get_rate_limited_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Value the current user's holdings at current prices (requires authentication).
+
+    Holdings are loaded in one query and priced from one batched
+    snapshot pass. While the quote service is failing, recent snapshots
+    are used and the response is marked stale.
+    """
+    holding = models.Holding
+    rows = (await db.execute(
+        select(holding.symbol, holding.quantity, holding.cost_basis).where(holding.user_id == current_user.id)
+    )).all()
+    symbols = [row.symbol for row in rows]
+    stale = False
+    tickers = {}
+    try:
+        if symbols:
+            tickers = await quote_cache.get_or_fetch_many(symbols, upstream.fetch_snapshots)
+    except upstream.UpstreamUnavailable:
+        tickers = await quote_cache.get_stale_many(symbols)
+        stale = True
+    return RawJSONResponse(encode_portfolio({**value_portfolio(rows, tickers), "stale": stale}))
+
+
+@app.put("/portfolio/holdings", response_model=schemas.HoldingsResponse)
+async def replace_holdings(
+    update: schemas.HoldingsUpdate,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Replace the current user's holdings (requires authentication)."""
+    symbols = resolve_symbols([item.symbol for item in update.holdings])
+    duplicates = {symbol for symbol in symbols if symbols.count(symbol) > 1}
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate holdings: {', '.join(sorted(duplicates))}")
+    holdings = [
+        {"symbol": symbol, "quantity": item.quantity, "cost_basis": item.cost_basis}
+        for symbol, item in zip(symbols, update.holdings)
+    ]
+    await db.execute(
+        delete(models.Holding).where(models.Holding.user_id == current_user.id),
+        execution_options={"synchronize_session": False},
+    )
+    if holdings:
+        await db.execute(
+            insert(models.Holding), [{"user_id": current_user.id, **values} for values in holdings]
+        )
+    await db.commit()
+    return {"holdings": holdings}
+
+
+@app.get("/watchlists", response_model=list[schemas.WatchlistResponse])
+async def list_watchlists(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List the current user's watchlists by name (requires authentication)."""
+    watchlist = models.Watchlist
+    rows = (await db.execute(
+        select(watchlist.name, watchlist.symbols)
+        .where(watchlist.user_id == current_user.id)
+        .order_by(watchlist.name)
+    )).all()
+    return [{"name": name, "symbols": symbols.split(",") if symbols else []} for name, symbols in rows]
+
+
+@app.put("/watchlists/{name}", response_model=schemas.WatchlistResponse)
+async def put_watchlist(
+    update: schemas.WatchlistUpdate,
+    name: str = Path(..., min_length=1, max_length=64),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create or replace a watchlist (requires authentication)."""
+    symbols = list(dict.fromkeys(resolve_symbols(update.symbols)))
+    watchlist = models.Watchlist
+    await db.execute(
+        delete(watchlist).where(watchlist.user_id == current_user.id, watchlist.name == name),
+        execution_options={"synchronize_session": False},
+    )
+    await db.execute(
+        insert(watchlist), {"user_id": current_user.id, "name": name, "symbols": ",".join(symbols)}
+    )
+    await db.commit()
+    return {"name": name, "symbols": symbols}
+
+
+@app.delete("/watchlists/{name}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_watchlist(
+    name: str,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a watchlist (requires authentication)."""
+    watchlist = models.Watchlist
+    result = await db.execute(
+        delete(watchlist).where(watchlist.user_id == current_user.id, watchlist.name == name),
+        execution_options={"synchronize_session": False},
+    )
+    await db.commit()
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Watchlist not found")
+    return None
+
+
+def user_quotes_query(user_id: int):
+    """A user's quote rows as QUOTE_COLUMNS tuples, newest first."""
+    return select_quotes().where(
+        models.StockQuote.user_id == user_id
+    ).order_by(
+        models.StockQuote.created_at.desc(), models.StockQuote.id.desc()
+    )
 
 
 @app.get("/stock-quotes/history", response_model=list[schemas.StockQuoteResponse])
 async def get_quote_history(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    before: Optional[int] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get user's stock quote search history."""
-    quotes = db.query(models.StockQuote).filter(
-        models.StockQuote.user_id == current_user.id
-    ).order_by(models.StockQuote.created_at.desc()).limit(50).all()
-    
-    return quotes
\ No newline at end of file
+    """Get user's stock quote search history, newest first.
+
+    Pages are keyset-paginated: pass the X-Next-Cursor header of one page
+    as `before` to get the next one. Rows are selected as column tuples
+    and encoded directly, skipping ORM objects and response validation.
+    """
+    query = user_quotes_query(current_user.id)
+    if before is not None:
+        # Compare against the cursor row's stored created_at so the
+        # comparison never depends on how a driver formats timestamps.
+        cursor_created_at = select(models.StockQuote.created_at).where(
+            models.StockQuote.id == before,
+            models.StockQuote.user_id == current_user.id
+        ).scalar_subquery()
+        query = query.where(
+            tuple_(models.StockQuote.created_at, models.StockQuote.id)
+            < tuple_(cursor_created_at, before)
+        )
+    with stage("history_query"):
+        rows = (await db.execute(query.limit(limit + 1))).all()
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1].id)
+    with stage("history_encode"):
+        content = encode_quote_rows(rows)
+    return RawJSONResponse(content, headers=headers)
+
+
+def quote_stats_query(user_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """Per-symbol aggregates of a user's quotes as one grouped query.
+
+    Each symbol's latest change_percent is a correlated lookup of its
+    newest row, which is cheaper than ranking every row with a window.
+    """
+    quote, snapshot = models.StockQuote, models.QuoteSnapshot
+    newest, newest_snapshot = aliased(quote), aliased(snapshot)
+
+    def in_window(table, query):
+        query = query.where(table.user_id == user_id)
+        if since is not None:
+            query = query.where(table.created_at >= since)
+        if until is not None:
+            query = query.where(table.created_at < until)
+        return query
+
+    latest_change_percent = (
+        in_window(newest, select(
+            func.coalesce(newest_snapshot.change_percent, newest.change_percent)
+        ).select_from(newest).outerjoin(newest_snapshot, newest.snapshot_id == newest_snapshot.id))
+        .where(newest.symbol == quote.symbol)
+        .order_by(newest.created_at.desc(), newest.id.desc())
+        .limit(1)
+        .correlate(quote)
+        .scalar_subquery()
+    )
+    price = func.coalesce(snapshot.price, quote.price)
+    return in_window(quote, select(
+        quote.symbol,
+        func.count().label("count"),
+        func.min(quote.created_at).label("first_seen"),
+        func.max(quote.created_at).label("last_seen"),
+        func.min(price).label("min_price"),
+        func.max(price).label("max_price"),
+        func.avg(price).label("mean_price"),
+        latest_change_percent.label("latest_change_percent"),
+    ).select_from(quote).outerjoin(snapshot, quote.snapshot_id == snapshot.id)
+    ).group_by(quote.symbol).order_by(func.count().desc(), quote.symbol)
+
+
+@app.get("/stock-quotes/stats", response_model=schemas.StockQuoteStatsResponse)
+async def get_quote_stats(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Per-symbol lookup counts, first/last seen, price range and mean, and the
+    latest change percent for the current user, optionally within [since, until)."""
+    if since is not None and until is not None and since >= until:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="since must be before until"
+        )
+    with stage("stats_query"):
+        rows = (await db.execute(quote_stats_query(current_user.id, since, until))).mappings().all()
+    return {"since": since, "until": until, "symbols": rows}
+
+
+async def export_chunks(bind, query, export_format: str, compress: bool):
+    """Yield encoded (and optionally gzipped) export chunks from a server-side cursor."""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    # The request's session is closed before the body streams, so use our own
+    async with AsyncSession(bind=bind) as session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        first = True
+        async for rows in result.partitions():
+            if export_format == "csv":
+                chunk = encode_quote_csv(rows, header=first)
+            else:
+                chunk = encode_quote_ndjson(rows)
+            first = False
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if first and export_format == "csv":
+            chunk = encode_quote_csv([], header=True)
+            yield compressor.compress(chunk) if compressor is not None else chunk
+    if compressor is not None:
+        yield compressor.flush()
+
+
+@app.get("/stock-quotes/export")
+async def export_quote_history(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    current_user: Principal = Depends(get_rate_limited_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream the user's full quote history as NDJSON or CSV, newest first.
+
+    Rows are read through a server-side cursor EXPORT_CHUNK_ROWS at a time
+    and sent with chunked transfer encoding, so memory use does not grow
+    with the size of the history. Pass `gzip=true` for a gzip-encoded body.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="stock-quotes.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_chunks(db.bind, user_quotes_query(current_user.id), format, gzip),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+STARTUP_SECONDS.labels("import").set(time.perf_counter() - _import_started)
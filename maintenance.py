@@ -0,0 +1,384 @@
+"""Retention, daily rollups and partition upkeep for stock_quotes.
+
+Raw lookups older than QUOTE_RETENTION_DAYS are summarized per user,
+symbol and UTC day into quote_daily_rollups and then removed, together
+with the quote snapshots nothing references anymore. Run a pass with
+
+    python maintenance.py run
+
+or set MAINTENANCE_INTERVAL to run it from the application lifespan.
+
+On Postgres, stock_quotes can be converted once to monthly range
+partitions with
+
+    python maintenance.py partition
+
+after which expired months are rolled up, detached and dropped whole
+instead of deleted row by row, and each pass creates the partitions for
+the coming QUOTE_PARTITIONS_AHEAD months.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import Date, cast, delete, func, select, text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+import models
+from database import insert_ignoring_conflicts
+
+logger = logging.getLogger(__name__)
+
+QUOTE_RETENTION_DAYS = int(os.getenv("QUOTE_RETENTION_DAYS", "0"))
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", "0"))
+MAINTENANCE_DELETE_BATCH = int(os.getenv("MAINTENANCE_DELETE_BATCH", "5000"))
+QUOTE_PARTITIONS_AHEAD = int(os.getenv("QUOTE_PARTITIONS_AHEAD", "2"))
+
+# Session-level Postgres advisory lock so only one worker runs a pass at a time
+ADVISORY_LOCK_KEY = 0x53514D54
+
+_BOUND = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \('([^']+)'\)")
+
+
+def retention_cutoff(now: datetime, retention_days: int) -> datetime:
+    """Start of the oldest UTC day whose raw lookups are kept."""
+    today = now.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=retention_days)
+
+
+def _day(column, dialect: str):
+    """UTC calendar day of a timestamp column."""
+    if dialect == "postgresql":
+        return cast(func.timezone("UTC", column), Date)
+    # SQLite keeps timestamps as UTC text
+    return func.date(column)
+
+
+def rollup_statement(dialect: str, since: Optional[datetime], until: datetime):
+    """INSERT ... SELECT summarizing lookups in [since, until) into quote_daily_rollups.
+
+    Days that already have a rollup are left alone, so a pass that was
+    interrupted after rolling up can simply be repeated.
+    """
+    quote, snapshot, rollup = models.StockQuote, models.QuoteSnapshot, models.QuoteDailyRollup
+    price = func.coalesce(snapshot.price, quote.price)
+    day = _day(quote.created_at, dialect)
+    group = (quote.user_id, quote.symbol, day)
+    lookups = select(
+        quote.user_id,
+        quote.symbol,
+        day.label("day"),
+        price.label("price"),
+        func.first_value(price).over(
+            partition_by=group, order_by=(quote.created_at, quote.id)
+        ).label("open_price"),
+        func.first_value(price).over(
+            partition_by=group, order_by=(quote.created_at.desc(), quote.id.desc())
+        ).label("close_price"),
+    ).select_from(quote).outerjoin(
+        snapshot, quote.snapshot_id == snapshot.id
+    ).where(quote.created_at < until)
+    if since is not None:
+        lookups = lookups.where(quote.created_at >= since)
+    lookups = lookups.subquery()
+    # The WHERE keeps SQLite from reading the upsert's ON as a join's
+    summary = select(
+        lookups.c.user_id,
+        lookups.c.day,
+        lookups.c.symbol,
+        func.count(),
+        func.max(lookups.c.open_price),
+        func.max(lookups.c.price),
+        func.min(lookups.c.price),
+        func.max(lookups.c.close_price),
+    ).where(lookups.c.user_id.is_not(None)).group_by(
+        lookups.c.user_id, lookups.c.day, lookups.c.symbol
+    )
+    return insert_ignoring_conflicts(rollup, dialect, ["user_id", "day", "symbol"]).from_select(
+        ["user_id", "day", "symbol", "count", "open_price", "high_price", "low_price", "close_price"],
+        summary,
+    )
+
+
+async def _delete_expired(conn: AsyncConnection, cutoff: datetime, batch: int) -> int:
+    """Delete raw lookups older than cutoff in id-ordered batches of one transaction each."""
+    quote = models.StockQuote.__table__
+    deleted = 0
+    while True:
+        expired = select(quote.c.id).where(quote.c.created_at < cutoff).order_by(quote.c.id).limit(batch)
+        result = await conn.execute(delete(quote).where(quote.c.id.in_(expired)))
+        await conn.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch:
+            return deleted
+
+
+async def _prune_snapshots(conn: AsyncConnection, cutoff: datetime, fence: int) -> int:
+    """Delete snapshots taken before cutoff that no remaining lookup references.
+
+    Only ids up to fence (the newest id when the pass started) are
+    considered, so a snapshot a request stored moments ago, whose lookup
+    row is not written yet, is never removed under it.
+    """
+    quote, snapshot = models.StockQuote.__table__, models.QuoteSnapshot.__table__
+    referenced = select(quote.c.snapshot_id).where(quote.c.snapshot_id.is_not(None))
+    result = await conn.execute(delete(snapshot).where(
+        snapshot.c.as_of < cutoff, snapshot.c.id <= fence, snapshot.c.id.not_in(referenced)
+    ))
+    await conn.commit()
+    return result.rowcount
+
+
+def _parse_bound(value: str) -> datetime:
+    # Postgres prints offsets as +00, which older fromisoformat rejects
+    if re.search(r"[+-]\d\d$", value):
+        value += ":00"
+    return datetime.fromisoformat(value)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _month_bound(day: date) -> str:
+    return f"{day.isoformat()} 00:00:00+00"
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    """Whether stock_quotes is a partitioned Postgres table."""
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(await conn.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'stock_quotes')"
+    )))
+
+
+async def list_partitions(conn: AsyncConnection) -> list[tuple[str, Optional[datetime], Optional[datetime]]]:
+    """(name, lower, upper) of each stock_quotes partition; bounds are None when open or DEFAULT."""
+    rows = await conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'stock_quotes' ORDER BY c.relname"
+    ))
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND.search(bound)
+        if match is None:
+            partitions.append((name, None, None))
+        else:
+            lower, upper = match.groups()
+            partitions.append((name, lower and _parse_bound(lower), _parse_bound(upper)))
+    return partitions
+
+
+async def ensure_partitions(conn: AsyncConnection, today: date, ahead: int = QUOTE_PARTITIONS_AHEAD) -> list[str]:
+    """Create the monthly partitions from this month to ahead months out; return new names."""
+    ranges = [(lower, upper) for _, lower, upper in await list_partitions(conn) if upper is not None]
+    created = []
+    month = today.replace(day=1)
+    for _ in range(ahead + 1):
+        following = _next_month(month)
+        start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+        end = datetime(following.year, following.month, 1, tzinfo=timezone.utc)
+        # Months already covered, for example by the converted legacy table, are skipped
+        if not any((lower is None or lower < end) and upper > start for lower, upper in ranges):
+            name = f"stock_quotes_p{month:%Y%m}"
+            await conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF stock_quotes "
+                f"FOR VALUES FROM ('{_month_bound(month)}') TO ('{_month_bound(following)}')"
+            ))
+            ranges.append((start, end))
+            created.append(name)
+        month = following
+    await conn.commit()
+    return created
+
+
+async def partition_stock_quotes(conn: AsyncConnection, today: date) -> bool:
+    """Convert stock_quotes into a table range-partitioned by month on created_at.
+
+    The existing table becomes the partition for everything before next
+    month, so no rows are copied. Returns False if it is already
+    partitioned.
+    """
+    if conn.dialect.name != "postgresql":
+        raise RuntimeError("Partitioning stock_quotes needs Postgres")
+    if await is_partitioned(conn):
+        return False
+    boundary = _next_month(today)
+    sequence = await conn.scalar(text("SELECT pg_get_serial_sequence('stock_quotes', 'id')"))
+    # bootstrap creates the model's indexes by name on stock_quotes, so all
+    # of them move to the new parent and the legacy copies are renamed
+    indexes = sorted(models.StockQuote.__table__.indexes, key=lambda index: index.name)
+    for statement in (
+        "ALTER TABLE stock_quotes RENAME TO stock_quotes_legacy",
+        *(
+            f"ALTER INDEX {index.name} RENAME TO {index.name.replace('stock_quotes', 'stock_quotes_legacy', 1)}"
+            for index in indexes
+        ),
+        # The partition key must be NOT NULL and part of the primary key
+        "UPDATE stock_quotes_legacy SET created_at = now() WHERE created_at IS NULL",
+        "ALTER TABLE stock_quotes_legacy ALTER COLUMN created_at SET NOT NULL",
+        "CREATE TABLE stock_quotes (LIKE stock_quotes_legacy INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)",
+        "ALTER TABLE stock_quotes ADD PRIMARY KEY (id, created_at)",
+        "ALTER TABLE stock_quotes ADD FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE",
+        "ALTER TABLE stock_quotes ADD FOREIGN KEY (snapshot_id) REFERENCES quote_snapshots (id)",
+        *(str(CreateIndex(index).compile(dialect=conn.dialect)) for index in indexes),
+        # Keep handing out ids (and write-behind blocks) from the same sequence
+        f"ALTER SEQUENCE {sequence} OWNED BY stock_quotes.id",
+        "ALTER TABLE stock_quotes ATTACH PARTITION stock_quotes_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{_month_bound(boundary)}')",
+        # Catches rows for a month whose partition was not created in time
+        "CREATE TABLE stock_quotes_default PARTITION OF stock_quotes DEFAULT",
+    ):
+        await conn.execute(text(statement))
+    await conn.commit()
+    await ensure_partitions(conn, boundary)
+    return True
+
+
+async def _try_lock(conn: AsyncConnection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return True
+    locked = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+    await conn.commit()
+    return bool(locked)
+
+
+async def _unlock(conn: AsyncConnection):
+    if conn.dialect.name == "postgresql":
+        await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        await conn.commit()
+
+
+async def run_maintenance(
+    engine: Optional[AsyncEngine] = None,
+    retention_days: int = QUOTE_RETENTION_DAYS,
+    now: Optional[datetime] = None,
+    batch: int = MAINTENANCE_DELETE_BATCH,
+) -> Optional[dict]:
+    """Run one maintenance pass; None if another worker is already running one."""
+    from database import get_async_engine
+
+    engine = engine or get_async_engine()
+    now = now or datetime.now(timezone.utc)
+    report = {"rolled_up": 0, "deleted": 0, "dropped_partitions": [], "created_partitions": [],
+              "snapshots_pruned": 0, "cutoff": None}
+    async with engine.connect() as conn:
+        if not await _try_lock(conn):
+            return None
+        try:
+            dialect = conn.dialect.name
+            partitioned = await is_partitioned(conn)
+            if partitioned:
+                report["created_partitions"] = await ensure_partitions(conn, now.date())
+            if retention_days <= 0:
+                return report
+
+            cutoff = retention_cutoff(now, retention_days)
+            report["cutoff"] = cutoff.isoformat()
+            fence = await conn.scalar(select(func.coalesce(func.max(models.QuoteSnapshot.id), 0)))
+            if partitioned:
+                # Whole months only: a partition goes once all of it is past the cutoff
+                for name, lower, upper in await list_partitions(conn):
+                    if upper is None or upper > cutoff:
+                        continue
+                    result = await conn.execute(rollup_statement(dialect, lower, upper))
+                    report["rolled_up"] += result.rowcount
+                    await conn.execute(text(f"ALTER TABLE stock_quotes DETACH PARTITION {name}"))
+                    await conn.execute(text(f"DROP TABLE {name}"))
+                    await conn.commit()
+                    report["dropped_partitions"].append(name)
+            else:
+                result = await conn.execute(rollup_statement(dialect, None, cutoff))
+                await conn.commit()
+                report["rolled_up"] = result.rowcount
+                report["deleted"] = await _delete_expired(conn, cutoff, batch)
+            report["snapshots_pruned"] = await _prune_snapshots(conn, cutoff, fence)
+            return report
+        finally:
+            await _unlock(conn)
+
+
+class MaintenanceTask:
+    """Runs maintenance passes every interval seconds from the app lifespan."""
+
+    def __init__(self, interval: float = MAINTENANCE_INTERVAL):
+        self.interval = interval
+        self.runs = 0
+        self.failures = 0
+        self.last_report: Optional[dict] = None
+        self.last_run_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            try:
+                report = await run_maintenance()
+                if report is not None:
+                    self.runs += 1
+                    self.last_report = report
+                    self.last_run_seconds = round(time.perf_counter() - started, 3)
+            except Exception:
+                self.failures += 1
+                logger.warning("Quote maintenance failed", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start running passes in the background."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background passes."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "retention_days": QUOTE_RETENTION_DAYS,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_seconds": self.last_run_seconds,
+            "last_report": self.last_report,
+        }
+
+
+async def _main(args) -> int:
+    from database import dispose_engines, get_async_engine
+
+    try:
+        if args.command == "partition":
+            async with get_async_engine().connect() as conn:
+                converted = await partition_stock_quotes(conn, datetime.now(timezone.utc).date())
+            print("stock_quotes partitioned by month" if converted else "stock_quotes is already partitioned")
+        else:
+            report = await run_maintenance(retention_days=args.retention_days)
+            print(json.dumps(report) if report is not None else "Another maintenance pass is running")
+    finally:
+        await dispose_engines()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("run", "partition"))
+    parser.add_argument("--retention-days", type=int, default=QUOTE_RETENTION_DAYS)
+    return asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -13,19 +13,84 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationship to stock quotes
-    stock_quotes = relationship("StockQuote", back_populates="user", cascade="all, delete-orphan")
+    # The database deletes a user's quotes; they are never loaded just to be deleted
+    stock_quotes = relationship(
+        "StockQuote", back_populates="user", cascade="all, delete-orphan", passive_deletes=True
+    )
 
 
 class StockQuote(Base):
     __tablename__ = "stock_quotes"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     symbol = Column(String, nullable=False)
-    price = Column(Float, nullable=False)
+    snapshot_id = Column(Integer, ForeignKey("quote_snapshots.id"))
+    # Prices are copied only on rows written before quote_snapshots existed
+    price = Column(Float)
     change = Column(Float)
     change_percent = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationship to user
-    user = relationship("User", back_populates="stock_quotes")
\ No newline at end of file
+    user = relationship("User", back_populates="stock_quotes")
+    snapshot = relationship("QuoteSnapshot")
+
+    # Serves per-user history newest first, including keyset pages
+    __table_args__ = (
+        Index("ix_stock_quotes_user_created", user_id, created_at.desc(), id.desc()),
+    )
+
+
+class QuoteSnapshot(Base):
+    """One upstream snapshot of a symbol, shared by every lookup that saw it."""
+    __tablename__ = "quote_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String, nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    price = Column(Float, nullable=False)
+    change = Column(Float)
+    change_percent = Column(Float)
+    # Digest of the prices, so snapshots without an upstream time that share
+    # an as_of bucket but differ in price are kept apart
+    prices_hash = Column(BigInteger, nullable=False, server_default="0")
+
+    __table_args__ = (
+        UniqueConstraint(symbol, as_of, prices_hash, name="uq_quote_snapshots_symbol_as_of_prices"),
+    )
+
+
+class QuoteDailyRollup(Base):
+    """Per-user, per-symbol daily summary of lookups past the raw retention window."""
+    __tablename__ = "quote_daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    symbol = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False)
+    open_price = Column(Float)
+    high_price = Column(Float)
+    low_price = Column(Float)
+    close_price = Column(Float)
+
+
+class Holding(Base):
+    """A user's position in one symbol; the primary key serves the per-user load."""
+    __tablename__ = "holdings"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    symbol = Column(String, primary_key=True)
+    quantity = Column(Float, nullable=False)
+    # Total cost of the position, if the user tracks it
+    cost_basis = Column(Float)
+
+
+class Watchlist(Base):
+    """A named list of symbols, stored as one comma-separated row."""
+    __tablename__ = "watchlists"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String, primary_key=True)
+    symbols = Column(String, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
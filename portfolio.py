@@ -0,0 +1,63 @@
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from snapshots import quote_values
+
+if TYPE_CHECKING:
+    # Imported inside the valuation functions, so only a /portfolio request loads numpy
+    import numpy as np
+
+POSITION_FIELDS = (
+    "symbol", "quantity", "price", "market_value", "day_change", "day_change_percent",
+    "weight", "cost_basis", "unrealized_pnl",
+)
+
+
+def _percent(part: "np.ndarray", whole: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+
+    # Positions without a base (or without a price) have no percentage
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(whole != 0, 100 * part / whole, np.nan)
+
+
+def value_portfolio(holdings: Sequence[Sequence], tickers: dict[str, Optional[dict]]) -> dict:
+    """Value (symbol, quantity, cost_basis) holdings at their snapshot prices.
+
+    Every position's figures are computed as whole-array operations.
+    Positions without a snapshot have no price and are left out of the
+    totals and weights. Positions are ordered by market value, largest
+    first; missing values are NaN, which encodes as JSON null.
+    """
+    import numpy as np
+
+    symbols = [holding[0] for holding in holdings]
+    quantity = np.array([holding[1] for holding in holdings], dtype=np.float64)
+    # None becomes NaN in a float array
+    cost = np.array([holding[2] for holding in holdings], dtype=np.float64)
+    values = [quote_values(tickers[symbol]) if tickers.get(symbol) else {} for symbol in symbols]
+    price = np.array([value.get("price") for value in values], dtype=np.float64)
+    change = np.array([value.get("change") for value in values], dtype=np.float64)
+
+    market_value = quantity * price
+    day_change = quantity * change
+    unrealized = market_value - cost
+    total = np.nansum(market_value)
+    total_change = np.nansum(day_change)
+    priced = ~np.isnan(market_value)
+
+    order = np.argsort(np.where(priced, -market_value, np.inf), kind="stable")
+    columns = (
+        quantity, price, market_value, day_change,
+        _percent(day_change, market_value - day_change),
+        market_value / total if total else np.full(len(symbols), np.nan),
+        cost, unrealized,
+    )
+    positions = zip([symbols[index] for index in order], *(column[order].tolist() for column in columns))
+    return {
+        "market_value": float(total),
+        "day_change": float(total_change),
+        "day_change_percent": float(_percent(total_change, total - total_change)),
+        "cost_basis": float(np.nansum(np.where(priced, cost, np.nan))),
+        "unrealized_pnl": float(np.nansum(unrealized)),
+        "positions": [dict(zip(POSITION_FIELDS, position)) for position in positions],
+    }
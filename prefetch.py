@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from rate_limit import background_priority
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "0"))
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "4"))
+PREFETCH_BUDGET_PER_MINUTE = float(os.getenv("PREFETCH_BUDGET_PER_MINUTE", "30"))
+PREFETCH_DECAY = float(os.getenv("PREFETCH_DECAY", "0.8"))
+PREFETCH_MAX_TRACKED = 5000
+
+
+class SymbolCounter:
+    """Exponentially decayed request counts per symbol."""
+
+    def __init__(self, decay: float = PREFETCH_DECAY, max_tracked: int = PREFETCH_MAX_TRACKED):
+        self.decay = decay
+        self.max_tracked = max_tracked
+        self._counts: dict[str, float] = {}
+
+    def record(self, symbol: str, weight: float = 1.0):
+        """Count a request for symbol."""
+        self._counts[symbol] = self._counts.get(symbol, 0.0) + weight
+
+    def top(self, n: int) -> list[str]:
+        """Return the n most requested symbols, hottest first."""
+        return sorted(self._counts, key=self._counts.__getitem__, reverse=True)[:n]
+
+    def age(self):
+        """Decay all counts and forget symbols that have gone cold."""
+        self._counts = {
+            symbol: count * self.decay
+            for symbol, count in self._counts.items()
+            if count * self.decay >= 0.05
+        }
+        if len(self._counts) > self.max_tracked:
+            keep = self.top(self.max_tracked)
+            self._counts = {symbol: self._counts[symbol] for symbol in keep}
+
+    def clear(self):
+        """Forget all counts."""
+        self._counts.clear()
+
+
+class RequestBudget:
+    """Token bucket limiting how many upstream requests prefetching may make."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def take(self, wanted: int) -> int:
+        """Take up to wanted whole tokens and return how many were granted."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        granted = min(wanted, int(self.tokens))
+        self.tokens -= granted
+        return granted
+
+
+class HotSymbolPrefetcher:
+    """Keeps snapshots of the most requested symbols warm in the quote cache."""
+
+    def __init__(
+        self,
+        cache,
+        counter: SymbolCounter,
+        fetch_many: Callable[[list[str]], Awaitable[dict[str, dict]]],
+        chunk_size: int,
+        top_n: int = PREFETCH_TOP_N,
+        interval: float = PREFETCH_INTERVAL,
+        budget_per_minute: float = PREFETCH_BUDGET_PER_MINUTE,
+    ):
+        self.cache = cache
+        self.counter = counter
+        self.fetch_many = fetch_many
+        self.chunk_size = chunk_size
+        self.top_n = top_n
+        self.interval = interval
+        self.budget = RequestBudget(budget_per_minute)
+        self.upstream_requests = 0
+        self.refreshed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh_once(self):
+        """Refresh the current top-N symbols within the request budget."""
+        symbols = self.counter.top(self.top_n)
+        self.counter.age()
+        if not symbols:
+            return
+        chunks = math.ceil(len(symbols) / self.chunk_size)
+        granted = self.budget.take(chunks)
+        # Symbols are hottest first, so a short budget drops the coldest
+        for i in range(granted):
+            chunk = symbols[i * self.chunk_size:(i + 1) * self.chunk_size]
+            self.upstream_requests += 1
+            snapshots = await self.fetch_many(chunk)
+            await self.cache.put_many({symbol: snapshots.get(symbol) for symbol in chunk})
+            self.refreshed += len(snapshots)
+
+    async def _run(self):
+        while True:
+            try:
+                with background_priority():
+                    await self.refresh_once()
+            except Exception:
+                logger.warning("Hot symbol prefetch failed", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start refreshing in the background."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refresh."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        """Return counters for monitoring."""
+        return {
+            "running": self._task is not None,
+            "top_n": self.top_n,
+            "hot_symbols": self.counter.top(self.top_n),
+            "upstream_requests": self.upstream_requests,
+            "refreshed": self.refreshed,
+        }
@@ -0,0 +1,107 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from cache_backends import BACKEND_ERRORS, QUOTE_CACHE_BACKEND, CacheBackend
+from quote_cache import quote_cache
+
+# Without a shared backend a deletion reaches other workers only when
+# their entries expire, so the default TTL is kept short there
+PRINCIPAL_CACHE_TTL_SECONDS = float(
+    os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60" if QUOTE_CACHE_BACKEND == "redis" else "5")
+)
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by request handlers."""
+    id: int
+    email: str
+    created_at: Optional[datetime] = None
+
+
+class PrincipalCache:
+    """Short-lived LRU cache mapping verified tokens to principals.
+
+    An entry never outlives its token's exp claim. Entries are per
+    process; with a shared backend, revoke_user leaves a marker that
+    every worker checks on a cache hit, so a deleted account stops
+    working everywhere at once. Without one, other workers drop the
+    principal within the TTL.
+    """
+
+    def __init__(
+        self,
+        ttl: float = PRINCIPAL_CACHE_TTL_SECONDS,
+        max_size: int = PRINCIPAL_CACHE_MAX_SIZE,
+        backend: Optional[CacheBackend] = None,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.backend = backend
+        # token -> (expires_at, cached_at, principal)
+        self._entries: "OrderedDict[str, tuple[float, float, Principal]]" = OrderedDict()
+
+    async def get(self, token: str) -> Optional[Principal]:
+        """Return the cached principal for a token, or None."""
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires_at, cached_at, principal = entry
+        if expires_at <= time.time() or await self._revoked_since(principal.id, cached_at):
+            self._entries.pop(token, None)
+            return None
+        self._entries.move_to_end(token)
+        return principal
+
+    async def _revoked_since(self, user_id: int, cached_at: float) -> bool:
+        if self.backend is None or not self.backend.shared:
+            return False
+        try:
+            revoked_at = await self.backend.marked_at(f"revoked-user:{user_id}")
+        except BACKEND_ERRORS:
+            # Unable to tell, so make the caller check the database
+            logger.warning("Principal revocation check failed", exc_info=True)
+            return True
+        return revoked_at is not None and revoked_at >= cached_at
+
+    def put(self, token: str, principal: Principal, token_exp: Optional[float] = None):
+        """Cache a principal until the TTL or the token's expiry, whichever is first."""
+        now = time.time()
+        expires_at = now + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        self._entries[token] = (expires_at, now, principal)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token that resolves to user_id in this process."""
+        stale = [token for token, (_, _, principal) in self._entries.items() if principal.id == user_id]
+        for token in stale:
+            del self._entries[token]
+
+    async def revoke_user(self, user_id: int):
+        """Drop user_id's tokens here and tell other workers through the shared backend."""
+        self.invalidate_user(user_id)
+        if self.backend is not None and self.backend.shared:
+            try:
+                # Entries cached before the marker are at most ttl old
+                await self.backend.mark(f"revoked-user:{user_id}", self.ttl)
+            except BACKEND_ERRORS:
+                logger.warning("Publishing a principal revocation failed", exc_info=True)
+
+    def clear(self):
+        """Drop all entries."""
+        self._entries.clear()
+
+
+principal_cache = PrincipalCache(backend=quote_cache.backend)
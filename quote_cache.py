@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from cache_backends import BACKEND_ERRORS, CacheBackend, Entry, MemoryBackend, create_backend
+
+QUOTE_CACHE_TTL_SECONDS = float(os.getenv("QUOTE_CACHE_TTL_SECONDS", "5"))
+QUOTE_CACHE_MAX_SIZE = int(os.getenv("QUOTE_CACHE_MAX_SIZE", "1024"))
+QUOTE_STALE_SECONDS = float(os.getenv("QUOTE_STALE_SECONDS", "300"))
+QUOTE_CACHE_NEGATIVE_TTL = float(os.getenv("QUOTE_CACHE_NEGATIVE_TTL", "60"))
+QUOTE_CACHE_LOCK_TTL = float(os.getenv("QUOTE_CACHE_LOCK_TTL", "5"))
+QUOTE_CACHE_LOCK_WAIT = float(os.getenv("QUOTE_CACHE_LOCK_WAIT", "1"))
+LOCK_POLL_INTERVAL = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteCache:
+    """Symbol-keyed TTL cache of upstream snapshots and "not found" results.
+
+    Concurrent misses for the same symbol share a single in-flight
+    upstream request instead of each issuing their own. With a shared
+    backend, a per-symbol lock makes one worker refresh a symbol while
+    the others wait briefly for its result. Expired snapshots are kept
+    for a further stale_seconds so they can be served, marked stale,
+    while the upstream is failing.
+    """
+
+    def __init__(
+        self,
+        ttl: float = QUOTE_CACHE_TTL_SECONDS,
+        max_size: int = QUOTE_CACHE_MAX_SIZE,
+        stale_seconds: float = QUOTE_STALE_SECONDS,
+        negative_ttl: float = QUOTE_CACHE_NEGATIVE_TTL,
+        backend: Optional[CacheBackend] = None,
+        lock_ttl: float = QUOTE_CACHE_LOCK_TTL,
+        lock_wait: float = QUOTE_CACHE_LOCK_WAIT,
+    ):
+        self.ttl = ttl
+        self.stale_seconds = stale_seconds
+        self.negative_ttl = negative_ttl
+        self.backend = backend if backend is not None else MemoryBackend(max_size)
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.negative_hits = 0
+        self.lock_waits = 0
+        self.backend_errors = 0
+
+    def _fresh(self, entry: Entry) -> bool:
+        fetched_at, snapshot = entry
+        ttl = self.negative_ttl if snapshot is None else self.ttl
+        return fetched_at + ttl > time.time()
+
+    async def _lookup(self, symbols: list[str]) -> dict[str, Entry]:
+        try:
+            return await self.backend.get_many(symbols)
+        except BACKEND_ERRORS:
+            self.backend_errors += 1
+            logger.warning("Quote cache read failed", exc_info=True)
+            return {}
+
+    async def get(self, symbol: str) -> Optional[dict]:
+        """Return a fresh cached snapshot, or None."""
+        entry = (await self._lookup([symbol])).get(symbol)
+        if entry is None or not self._fresh(entry):
+            return None
+        return entry[1]
+
+    async def get_stale_many(self, symbols: list[str]) -> dict[str, Optional[dict]]:
+        """Return the last known snapshots that are within the staleness window."""
+        now = time.time()
+        results = {}
+        for symbol, (fetched_at, snapshot) in (await self._lookup(symbols)).items():
+            if snapshot is not None and fetched_at + self.ttl + self.stale_seconds > now:
+                self.stale_served += 1
+                results[symbol] = snapshot
+        return results
+
+    async def get_stale(self, symbol: str) -> Optional[dict]:
+        """Return the last known snapshot if it is within the staleness window."""
+        return (await self.get_stale_many([symbol])).get(symbol)
+
+    async def put_many(self, snapshots: dict[str, Optional[dict]]):
+        """Store snapshots; a None snapshot records that the ticker does not exist."""
+        now = time.time()
+        found = {symbol: (now, snapshot) for symbol, snapshot in snapshots.items() if snapshot is not None}
+        missing = {symbol: (now, None) for symbol, snapshot in snapshots.items() if snapshot is None}
+        try:
+            if found:
+                await self.backend.set_many(found, self.ttl + self.stale_seconds)
+            if missing:
+                await self.backend.set_many(missing, self.negative_ttl)
+        except BACKEND_ERRORS:
+            self.backend_errors += 1
+            logger.warning("Quote cache write failed", exc_info=True)
+
+    async def put(self, symbol: str, snapshot: Optional[dict]):
+        """Store one snapshot (or a not-found result)."""
+        await self.put_many({symbol: snapshot})
+
+    async def get_or_fetch(
+        self, symbol: str, loader: Callable[[str], Awaitable[Optional[dict]]]
+    ) -> Optional[dict]:
+        """Return the cached snapshot for symbol, loading it once on a miss."""
+        entry = (await self._lookup([symbol])).get(symbol)
+        if entry is not None and self._fresh(entry):
+            self._count_hit(entry)
+            return entry[1]
+
+        self.misses += 1
+        task = self._inflight.get(symbol)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._load(symbol, loader))
+            self._inflight[symbol] = task
+        # Shield so one cancelled caller does not cancel the shared fetch.
+        return await asyncio.shield(task)
+
+    async def get_or_fetch_many(
+        self, symbols: list[str], loader: Callable[[list[str]], Awaitable[dict[str, dict]]]
+    ) -> dict[str, Optional[dict]]:
+        """Return snapshots for many symbols, loading all misses in one call.
+
+        Symbols already being fetched by another request join that fetch;
+        the rest are handed to loader together.
+        """
+        entries = await self._lookup(symbols)
+        results: dict[str, Optional[dict]] = {}
+        pending: dict[str, asyncio.Task] = {}
+        missing = []
+        for symbol in symbols:
+            entry = entries.get(symbol)
+            if entry is not None and self._fresh(entry):
+                self._count_hit(entry)
+                results[symbol] = entry[1]
+                continue
+            self.misses += 1
+            task = self._inflight.get(symbol)
+            if task is not None:
+                self.coalesced += 1
+                pending[symbol] = task
+            else:
+                missing.append(symbol)
+
+        if missing:
+            batch = asyncio.ensure_future(self._load_many(missing, loader))
+            for symbol in missing:
+                task = asyncio.ensure_future(self._pick(batch, symbol))
+                self._inflight[symbol] = task
+                pending[symbol] = task
+
+        outcomes = await asyncio.gather(
+            *(asyncio.shield(task) for task in pending.values()), return_exceptions=True
+        )
+        for symbol, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                raise outcome
+            results[symbol] = outcome
+        return results
+
+    def _count_hit(self, entry: Entry):
+        self.hits += 1
+        if entry[1] is None:
+            self.negative_hits += 1
+
+    async def _claim(self, symbols: list[str]) -> tuple[dict[str, str], list[str]]:
+        """Take refresh locks; return our lock tokens and the symbols a peer is refreshing."""
+        if not self.backend.shared:
+            return {}, []
+        try:
+            tokens = await asyncio.gather(
+                *(self.backend.acquire_lock(symbol, self.lock_ttl) for symbol in symbols)
+            )
+        except BACKEND_ERRORS:
+            self.backend_errors += 1
+            logger.warning("Quote cache lock failed", exc_info=True)
+            return {}, []
+        owned = {symbol: token for symbol, token in zip(symbols, tokens) if token is not None}
+        return owned, [symbol for symbol in symbols if symbol not in owned]
+
+    async def _release(self, tokens: dict[str, str]):
+        try:
+            await asyncio.gather(
+                *(self.backend.release_lock(symbol, token) for symbol, token in tokens.items())
+            )
+        except BACKEND_ERRORS:
+            # The locks expire on their own after lock_ttl
+            self.backend_errors += 1
+
+    async def _wait_for_peers(self, symbols: list[str]) -> dict[str, Optional[dict]]:
+        """Wait up to lock_wait for another worker to store fresh entries."""
+        self.lock_waits += len(symbols)
+        found: dict[str, Optional[dict]] = {}
+        deadline = time.monotonic() + self.lock_wait
+        while True:
+            for symbol, entry in (await self._lookup(
+                [symbol for symbol in symbols if symbol not in found]
+            )).items():
+                if self._fresh(entry):
+                    found[symbol] = entry[1]
+            if len(found) == len(symbols) or time.monotonic() >= deadline:
+                return found
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+    async def _load_many(self, symbols, loader):
+        try:
+            tokens, refreshing = await self._claim(symbols)
+            try:
+                results = await self._wait_for_peers(refreshing) if refreshing else {}
+                # Peers that did not deliver in time are fetched here after all
+                fetch = [symbol for symbol in symbols if symbol not in results]
+                if fetch:
+                    snapshots = await loader(fetch)
+                    fetched = {symbol: snapshots.get(symbol) for symbol in fetch}
+                    await self.put_many(fetched)
+                    results.update(fetched)
+                return results
+            finally:
+                if tokens:
+                    await self._release(tokens)
+        finally:
+            for symbol in symbols:
+                self._inflight.pop(symbol, None)
+
+    async def _pick(self, batch, symbol):
+        snapshots = await asyncio.shield(batch)
+        return snapshots.get(symbol)
+
+    async def _load(self, symbol, loader):
+        try:
+            tokens, refreshing = await self._claim([symbol])
+            try:
+                if refreshing:
+                    found = await self._wait_for_peers(refreshing)
+                    if symbol in found:
+                        return found[symbol]
+                snapshot = await loader(symbol)
+                await self.put(symbol, snapshot)
+                return snapshot
+            finally:
+                if tokens:
+                    await self._release(tokens)
+        finally:
+            self._inflight.pop(symbol, None)
+
+    def stats(self) -> dict:
+        """Return counters used to tune TTL and size."""
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "negative_hits": self.negative_hits,
+            "lock_waits": self.lock_waits,
+            "backend_errors": self.backend_errors,
+            "size": self.backend.size(),
+            "max_size": getattr(self.backend, "max_size", None),
+            "ttl_seconds": self.ttl,
+            "stale_seconds": self.stale_seconds,
+            "negative_ttl_seconds": self.negative_ttl,
+        }
+
+    def clear(self):
+        """Drop locally held entries and reset counters."""
+        self.backend.clear()
+        self.hits = self.misses = self.coalesced = self.stale_served = 0
+        self.negative_hits = self.lock_waits = self.backend_errors = 0
+
+    async def close(self):
+        """Close the backend's connections."""
+        await self.backend.close()
+
+
+quote_cache = QuoteCache(backend=create_backend(max_size=QUOTE_CACHE_MAX_SIZE))
@@ -0,0 +1,292 @@
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from cache_backends import BACKEND_ERRORS, CacheBackend
+from quote_cache import quote_cache
+
+UPSTREAM_BUDGET_PER_MINUTE = float(os.getenv("UPSTREAM_BUDGET_PER_MINUTE", "0"))
+UPSTREAM_BUDGET_BURST = float(os.getenv("UPSTREAM_BUDGET_BURST", "0"))
+UPSTREAM_BACKGROUND_RESERVE = float(os.getenv("UPSTREAM_BACKGROUND_RESERVE", "0.2"))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "2"))
+USER_RATE_PER_MINUTE = float(os.getenv("USER_RATE_PER_MINUTE", "60"))
+USER_RATE_BURST = float(os.getenv("USER_RATE_BURST", "20"))
+USER_RATE_MAX_TRACKED = 10000
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """Mark upstream calls made inside the block (and tasks it starts) as background."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def _refill_time(tokens: float, needed: float, rate: float) -> float:
+    """Seconds until a bucket holding tokens, refilled at rate per second, holds needed."""
+    missing = needed - tokens
+    if missing <= 0:
+        return 0.0
+    return math.inf if rate <= 0 else missing / rate
+
+
+class TokenBucket:
+    """Classic token bucket: capacity tokens, refilled at rate per second."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def take(self, amount: float = 1.0, keep: float = 0.0) -> bool:
+        """Take amount tokens if that leaves at least keep in the bucket."""
+        self._refill()
+        if self.tokens - amount < keep:
+            return False
+        self.tokens -= amount
+        return True
+
+    def give_back(self, amount: float = 1.0):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def wait_time(self, amount: float = 1.0, keep: float = 0.0) -> float:
+        """Seconds until take(amount, keep) would succeed."""
+        self._refill()
+        return _refill_time(self.tokens, amount + keep, self.rate)
+
+
+class RateLimited(Exception):
+    """A user exceeded their request rate."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class UpstreamBudgetExhausted(Exception):
+    """No upstream request budget is left for this call."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Upstream request budget exhausted, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class UpstreamScheduler:
+    """Spends the Massive plan's request budget, interactive requests first.
+
+    Interactive calls queue for up to queue_timeout seconds for a token.
+    Background calls (prefetching, stream polling) never queue: they only
+    run when no interactive call is waiting and more than a
+    background_reserve fraction of the bucket is left.
+
+    With a shared backend the bucket is kept there, so all workers spend
+    one budget; queueing stays per worker. Should the backend fail, the
+    worker falls back to its own bucket.
+    """
+
+    def __init__(
+        self,
+        per_minute: float = UPSTREAM_BUDGET_PER_MINUTE,
+        burst: float = UPSTREAM_BUDGET_BURST,
+        background_reserve: float = UPSTREAM_BACKGROUND_RESERVE,
+        queue_timeout: float = UPSTREAM_QUEUE_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+        backend: Optional[CacheBackend] = None,
+    ):
+        self.enabled = per_minute > 0
+        capacity = burst or per_minute
+        self.bucket = TokenBucket(per_minute / 60.0, capacity, clock)
+        self.reserve = capacity * background_reserve
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self.backend = backend
+        # Tokens left in the shared bucket as of the last call to it
+        self.shared_tokens = capacity
+        self.waiting = 0
+        self.granted = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.rejected = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.backend_errors = 0
+
+    async def _take(self, amount: float = 1.0, keep: float = 0.0) -> bool:
+        if self.backend is not None:
+            try:
+                granted, self.shared_tokens = await self.backend.take_tokens(
+                    "upstream", self.bucket.rate, self.bucket.capacity, amount, keep
+                )
+                return granted
+            except BACKEND_ERRORS:
+                self.backend_errors += 1
+                logger.warning("Shared upstream budget unavailable, using this worker's", exc_info=True)
+        if amount < 0:
+            self.bucket.give_back(-amount)
+            return True
+        return self.bucket.take(amount, keep)
+
+    def _wait_time(self, keep: float = 0.0) -> float:
+        if self.backend is not None:
+            return _refill_time(self.shared_tokens, 1 + keep, self.bucket.rate)
+        return self.bucket.wait_time(keep=keep)
+
+    async def acquire(self, priority: Optional[str] = None):
+        """Wait for budget for one upstream request, or raise UpstreamBudgetExhausted."""
+        if not self.enabled:
+            return
+        priority = priority or current_priority()
+        if priority == BACKGROUND:
+            if self.waiting or not await self._take(keep=self.reserve):
+                self.rejected[BACKGROUND] += 1
+                raise UpstreamBudgetExhausted(self._wait_time(keep=self.reserve))
+            self.granted[BACKGROUND] += 1
+            return
+
+        if self.waiting == 0 and await self._take():
+            self.granted[INTERACTIVE] += 1
+            return
+        deadline = self.clock() + self.queue_timeout
+        self.waiting += 1
+        try:
+            while True:
+                # Tokens are claimed in arrival order only approximately;
+                # waiters simply retry when the next token is due.
+                delay = self._wait_time()
+                if self.clock() + delay > deadline:
+                    self.rejected[INTERACTIVE] += 1
+                    raise UpstreamBudgetExhausted(delay)
+                await asyncio.sleep(delay)
+                if await self._take():
+                    self.granted[INTERACTIVE] += 1
+                    return
+        finally:
+            self.waiting -= 1
+
+    async def release_unused(self):
+        """Return a token for a call that never reached the upstream."""
+        if self.enabled:
+            await self._take(-1.0)
+
+    def reset(self):
+        self.bucket.tokens = self.shared_tokens = self.bucket.capacity
+        self.bucket._updated = self.clock()
+        self.granted = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.rejected = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.backend_errors = 0
+
+    def stats(self) -> dict:
+        """Return budget usage for monitoring."""
+        return {
+            "enabled": self.enabled,
+            "shared": self.backend is not None,
+            "budget_per_minute": self.bucket.rate * 60,
+            "tokens": self._tokens() if self.enabled else None,
+            "waiting": self.waiting,
+            "granted": dict(self.granted),
+            "rejected": dict(self.rejected),
+            "backend_errors": self.backend_errors,
+        }
+
+    def _tokens(self) -> float:
+        return round(self.shared_tokens if self.backend is not None else self.bucket.available(), 2)
+
+
+class UserRateLimiter:
+    """Per-user token buckets keyed by user id, least recently seen evicted first.
+
+    With a shared backend each user's bucket is kept there, so the limit
+    holds across workers; the in-process buckets are used without one or
+    while it fails.
+    """
+
+    def __init__(
+        self,
+        per_minute: float = USER_RATE_PER_MINUTE,
+        burst: float = USER_RATE_BURST,
+        max_tracked: int = USER_RATE_MAX_TRACKED,
+        clock: Callable[[], float] = time.monotonic,
+        backend: Optional[CacheBackend] = None,
+    ):
+        self.enabled = per_minute > 0
+        self.rate = per_minute / 60.0
+        self.burst = burst or per_minute
+        self.max_tracked = max_tracked
+        self.clock = clock
+        self.backend = backend
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self.limited = 0
+        self.backend_errors = 0
+
+    async def check(self, user_id: int, cost: float = 1.0):
+        """Spend cost tokens for user_id or raise RateLimited."""
+        if not self.enabled:
+            return
+        if self.backend is not None:
+            try:
+                granted, tokens = await self.backend.take_tokens(f"user:{user_id}", self.rate, self.burst, cost)
+            except BACKEND_ERRORS:
+                self.backend_errors += 1
+                logger.warning("Shared rate limit unavailable, using this worker's", exc_info=True)
+            else:
+                if not granted:
+                    self.limited += 1
+                    raise RateLimited(_refill_time(tokens, cost, self.rate))
+                return
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst, self.clock)
+            while len(self._buckets) > self.max_tracked:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+        if not bucket.take(cost):
+            self.limited += 1
+            raise RateLimited(bucket.wait_time(cost))
+
+    def clear(self):
+        self._buckets.clear()
+        self.limited = self.backend_errors = 0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "shared": self.backend is not None,
+            "per_minute": self.rate * 60,
+            "burst": self.burst,
+            "tracked_users": len(self._buckets),
+            "limited": self.limited,
+            "backend_errors": self.backend_errors,
+        }
+
+
+# Budgets are shared by every worker when the quote cache backend is
+_shared_backend = quote_cache.backend if quote_cache.backend.shared else None
+upstream_scheduler = UpstreamScheduler(backend=_shared_backend)
+user_limiter = UserRateLimiter(backend=_shared_backend)
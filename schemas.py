@@ -1,7 +1,11 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field
+from datetime import date, datetime
 from typing import Optional
 
+MAX_BATCH_SYMBOLS = 100
+MAX_HOLDINGS = 1000
+MAX_WATCHLIST_SYMBOLS = 100
+
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -39,4 +43,101 @@ class StockQuoteResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class StockQuoteBatchRequest(BaseModel):
+    symbols: list[str] = Field(..., min_length=1, max_length=MAX_BATCH_SYMBOLS)
+
+
+class StockQuoteBatchItem(BaseModel):
+    symbol: str
+    quote: Optional[StockQuoteResponse] = None
+    error: Optional[str] = None
+    stale: bool = False
+
+
+class StockQuoteBatchResponse(BaseModel):
+    results: list[StockQuoteBatchItem]
+
+
+class SymbolStats(BaseModel):
+    symbol: str
+    count: int
+    first_seen: datetime
+    last_seen: datetime
+    min_price: float
+    max_price: float
+    mean_price: float
+    latest_change_percent: Optional[float] = None
+
+
+class StockQuoteStatsResponse(BaseModel):
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    symbols: list[SymbolStats]
+
+
+class TickerSearchResponse(BaseModel):
+    prefix: str
+    symbols: list[str]
+
+
+class PriceSeriesResponse(BaseModel):
+    symbol: str
+    timespan: str
+    start: date = Field(alias="from")
+    end: date = Field(alias="to")
+    method: str
+    bars: int
+    t: list[int]
+    o: list[float]
+    h: list[float]
+    l: list[float]
+    c: list[float]
+    v: list[float]
+
+
+class HoldingItem(BaseModel):
+    symbol: str
+    quantity: float = Field(..., gt=0)
+    cost_basis: Optional[float] = Field(None, ge=0)
+
+
+class HoldingsUpdate(BaseModel):
+    holdings: list[HoldingItem] = Field(..., max_length=MAX_HOLDINGS)
+
+
+class HoldingsResponse(BaseModel):
+    holdings: list[HoldingItem]
+
+
+class Position(BaseModel):
+    symbol: str
+    quantity: float
+    price: Optional[float] = None
+    market_value: Optional[float] = None
+    day_change: Optional[float] = None
+    day_change_percent: Optional[float] = None
+    weight: Optional[float] = None
+    cost_basis: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+
+
+class PortfolioResponse(BaseModel):
+    market_value: float
+    day_change: float
+    day_change_percent: Optional[float] = None
+    cost_basis: float
+    unrealized_pnl: float
+    stale: bool = False
+    positions: list[Position]
+
+
+class WatchlistUpdate(BaseModel):
+    symbols: list[str] = Field(..., max_length=MAX_WATCHLIST_SYMBOLS)
+
+
+class WatchlistResponse(BaseModel):
+    name: str
+    symbols: list[str]
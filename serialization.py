@@ -0,0 +1,76 @@
+import csv
+import io
+from typing import Iterable, Sequence
+
+import orjson
+from fastapi import Response
+from sqlalchemy import func, outerjoin, select
+
+import models
+
+# Field order of the column tuples selected for quote responses
+QUOTE_FIELDS = ("id", "symbol", "price", "change", "change_percent", "created_at")
+
+# Prices live on the shared snapshot; older rows still carry their own copy
+QUOTE_SOURCE = outerjoin(
+    models.StockQuote, models.QuoteSnapshot,
+    models.StockQuote.snapshot_id == models.QuoteSnapshot.id,
+)
+QUOTE_COLUMNS = tuple(
+    func.coalesce(getattr(models.QuoteSnapshot, field), getattr(models.StockQuote, field)).label(field)
+    if field in ("price", "change", "change_percent")
+    else getattr(models.StockQuote, field)
+    for field in QUOTE_FIELDS
+)
+
+
+def select_quotes():
+    """SELECT of QUOTE_COLUMNS tuples over stock_quotes joined to their snapshots."""
+    return select(*QUOTE_COLUMNS).select_from(QUOTE_SOURCE)
+
+
+def encode_quote_rows(rows: Iterable[Sequence]) -> bytes:
+    """Encode QUOTE_COLUMNS rows as a JSON array of StockQuoteResponse objects.
+
+    Rows come straight from the database, so they are not re-validated.
+    Datetimes are written the way Pydantic writes them (UTC as `Z`).
+    """
+    return orjson.dumps(
+        [dict(zip(QUOTE_FIELDS, row)) for row in rows], option=orjson.OPT_UTC_Z
+    )
+
+
+def encode_quote_ndjson(rows: Iterable[Sequence]) -> bytes:
+    """Encode QUOTE_COLUMNS rows as newline-delimited JSON objects."""
+    return b"".join(
+        orjson.dumps(dict(zip(QUOTE_FIELDS, row)), option=orjson.OPT_UTC_Z) + b"\n"
+        for row in rows
+    )
+
+
+def encode_quote_csv(rows: Iterable[Sequence], header: bool = False) -> bytes:
+    """Encode QUOTE_COLUMNS rows as CSV lines, optionally preceded by a header."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(QUOTE_FIELDS)
+    writer.writerows(
+        (id, symbol, price, change, change_percent, created_at.isoformat() if created_at else "")
+        for id, symbol, price, change, change_percent, created_at in rows
+    )
+    return buffer.getvalue().encode()
+
+
+def encode_series(payload: dict) -> bytes:
+    """Encode a price series whose columns are numpy arrays."""
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def encode_portfolio(payload: dict) -> bytes:
+    """Encode a portfolio valuation; NaN figures become null."""
+    return orjson.dumps(payload)
+
+
+class RawJSONResponse(Response):
+    """A response whose content is already encoded JSON bytes."""
+    media_type = "application/json"
@@ -0,0 +1,271 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+
+if TYPE_CHECKING:
+    # Only chart requests need numpy; each function below imports it itself
+    import numpy as np
+
+SERIES_CACHE_MAX_BYTES = int(os.getenv("SERIES_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SERIES_LIVE_TTL = float(os.getenv("SERIES_LIVE_TTL", "5"))
+# How long after a UTC day ends before its bars are treated as final
+SERIES_SETTLE_SECONDS = float(os.getenv("SERIES_SETTLE_SECONDS", "900"))
+SERIES_DEFAULT_POINTS = int(os.getenv("SERIES_DEFAULT_POINTS", "500"))
+SERIES_MAX_POINTS = int(os.getenv("SERIES_MAX_POINTS", "5000"))
+SERIES_MAX_DAYS = {"minute": 31, "hour": 366, "day": 3660}
+
+DAY_MS = 86_400_000
+# Bar columns: start time (ms), open, high, low, close, volume
+COLUMNS = ("t", "o", "h", "l", "c", "v")
+
+BarLoader = Callable[[str, str, int, int], Awaitable[list[dict]]]
+
+
+def empty_bars() -> "np.ndarray":
+    import numpy as np
+
+    return np.empty((0, len(COLUMNS)))
+
+
+def to_array(bars: list[dict]) -> "np.ndarray":
+    """Pack upstream bars into an (n, 6) float array, one row per bar."""
+    import numpy as np
+
+    if not bars:
+        return empty_bars()
+    return np.array([[bar[column] for column in COLUMNS] for bar in bars], dtype=np.float64)
+
+
+def day_start_ms(day: date) -> int:
+    return (day - date(1970, 1, 1)).days * DAY_MS
+
+
+def _runs(days: list[date]) -> list[tuple[date, date]]:
+    """Group sorted days into runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and runs[-1][1] + timedelta(days=1) == day:
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+class SeriesCache:
+    """Caches upstream aggregate bars by (symbol, timespan, UTC day).
+
+    Bars of settled days never change, so they are fetched once; runs of
+    missing days cost one upstream request each. Days still in progress
+    are refreshed incrementally, at most every live_ttl seconds, from
+    their last bar onwards, since only the current bar can still change.
+    Entries are evicted least recently used once their arrays exceed
+    max_bytes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = SERIES_CACHE_MAX_BYTES,
+        live_ttl: float = SERIES_LIVE_TTL,
+        settle_seconds: float = SERIES_SETTLE_SECONDS,
+    ):
+        self.max_bytes = max_bytes
+        self.live_ttl = live_ttl
+        self.settle_seconds = settle_seconds
+        # (symbol, timespan, day) -> (bars, complete, fetched_at)
+        self._days: "OrderedDict[tuple[str, str, date], tuple[np.ndarray, bool, float]]" = OrderedDict()
+        self._bytes = 0
+        # (symbol, timespan) -> [lock, coroutines holding or waiting for it]
+        self._locks: dict[tuple[str, str], list] = {}
+        self.hits = 0
+        self.days_fetched = 0
+        self.incremental_fetches = 0
+
+    def settled(self, day: date, now: Optional[float] = None) -> bool:
+        """Whether no more bars can arrive for a UTC day."""
+        now = time.time() if now is None else now
+        return now * 1000 >= day_start_ms(day) + DAY_MS + self.settle_seconds * 1000
+
+    async def get_bars(
+        self, symbol: str, timespan: str, first: date, last: date, loader: BarLoader
+    ) -> "np.ndarray":
+        """Return the bars of symbol for the UTC days first..last, oldest first."""
+        key = (symbol, timespan)
+        held = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        held[1] += 1
+        try:
+            async with held[0]:
+                return await self._get_bars(symbol, timespan, first, last, loader)
+        finally:
+            # Only forget the lock once nobody waits for it, or a newcomer
+            # would fetch alongside the waiters
+            held[1] -= 1
+            if not held[1]:
+                del self._locks[key]
+
+    async def _get_bars(self, symbol, timespan, first, last, loader) -> "np.ndarray":
+        import numpy as np
+
+        days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+        now = time.time()
+        missing = []
+        live = []
+        for day in days:
+            entry = self._days.get((symbol, timespan, day))
+            if entry is not None and (entry[1] or now - entry[2] < self.live_ttl):
+                self._days.move_to_end((symbol, timespan, day))
+                self.hits += 1
+            elif entry is None and self.settled(day, now):
+                missing.append(day)
+            else:
+                live.append(day)
+
+        await asyncio.gather(
+            *(self._fetch_run(symbol, timespan, start, end, loader, now) for start, end in _runs(missing)),
+            *(self._refresh(symbol, timespan, day, loader, now) for day in live),
+        )
+        parts = [self._days[(symbol, timespan, day)][0] for day in days if (symbol, timespan, day) in self._days]
+        self._evict()
+        return np.concatenate(parts) if parts else empty_bars()
+
+    async def _fetch_run(self, symbol, timespan, start: date, end: date, loader, now: float):
+        bars = to_array(await loader(symbol, timespan, day_start_ms(start), day_start_ms(end) + DAY_MS - 1))
+        # Split the run back into days; empty days are cached too
+        day_index = bars[:, 0] // DAY_MS
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            self._store(symbol, timespan, day, bars[day_index == day_start_ms(day) // DAY_MS], True, now)
+        self.days_fetched += (end - start).days + 1
+
+    async def _refresh(self, symbol, timespan, day: date, loader, now: float):
+        import numpy as np
+
+        entry = self._days.get((symbol, timespan, day))
+        known = entry[0] if entry is not None else empty_bars()
+        # The last known bar may still be updating, so fetch again from it
+        since = int(known[-1, 0]) if len(known) else day_start_ms(day)
+        fresh = to_array(await loader(symbol, timespan, since, day_start_ms(day) + DAY_MS - 1))
+        bars = np.concatenate([known[known[:, 0] < since], fresh])
+        self._store(symbol, timespan, day, bars, self.settled(day, now), now)
+        self.incremental_fetches += 1
+
+    def _store(self, symbol, timespan, day, bars: "np.ndarray", complete: bool, now: float):
+        key = (symbol, timespan, day)
+        old = self._days.pop(key, None)
+        if old is not None:
+            self._bytes -= old[0].nbytes
+        self._days[key] = (bars, complete, now)
+        self._bytes += bars.nbytes
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._days) > 1:
+            bars = self._days.popitem(last=False)[1][0]
+            self._bytes -= bars.nbytes
+
+    def clear(self):
+        """Drop cached bars and reset counters."""
+        self._days.clear()
+        self._bytes = 0
+        self.hits = self.days_fetched = self.incremental_fetches = 0
+
+    def stats(self) -> dict:
+        return {
+            "days": len(self._days),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "days_fetched": self.days_fetched,
+            "incremental_fetches": self.incremental_fetches,
+        }
+
+
+def lttb_indices(x: "np.ndarray", y: "np.ndarray", n: int) -> "np.ndarray":
+    """Indices of n points chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previous
+    pick and the next bucket's mean. Each bucket is scored as one array
+    operation, so the Python loop runs once per output point.
+    """
+    import numpy as np
+
+    size = len(y)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1][:max(n, 0)])
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:size - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:size - 1], edges[:-1]) / counts
+    # Each bucket looks ahead to the next bucket's mean, the last one to the final point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    picked = np.empty(n, dtype=np.int64)
+    picked[0], picked[-1] = 0, size - 1
+    a = 0
+    for bucket in range(n - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[bucket]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[bucket] - ay))
+        a = lo + int(np.argmax(area))
+        picked[bucket + 1] = a
+    return picked
+
+
+def minmax_indices(y: "np.ndarray", n: int) -> "np.ndarray":
+    """Indices of the lowest and highest point of each of (n - 2) // 2 equal buckets.
+
+    Extremes are never dropped, which suits price charts where spikes
+    matter. The first and last points are always kept and the buckets
+    cover the points between them, so the result has at most n points.
+    """
+    import numpy as np
+
+    size = len(y)
+    if n >= size:
+        return np.arange(size)
+    ends = np.array([0, size - 1])
+    buckets = (n - 2) // 2
+    if buckets < 1:
+        return ends[:max(n, 0)]
+    interior = y[1:-1]
+    bucket = np.arange(len(interior)) * buckets // len(interior)
+    # Sorting by (bucket, value) keeps each bucket's rows where they were,
+    # so a bucket's first and last sorted rows are its minimum and maximum
+    order = np.lexsort((interior, bucket))
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    lasts = np.append(starts[1:], len(interior)) - 1
+    return np.unique(np.concatenate((ends, order[starts] + 1, order[lasts] + 1)))
+
+
+DOWNSAMPLERS = {
+    "lttb": lambda bars, n: lttb_indices(bars[:, 0], bars[:, 4], n),
+    "minmax": lambda bars, n: minmax_indices(bars[:, 4], n),
+}
+
+
+def downsample(bars: "np.ndarray", points: int, method: str = "lttb") -> "np.ndarray":
+    """Reduce bars to at most points rows, judged by their close prices."""
+    if len(bars) <= points:
+        return bars
+    return bars[DOWNSAMPLERS[method](bars, points)]
+
+
+def series_columns(bars: "np.ndarray") -> dict:
+    """Bars as JSON-ready columns, with start times as integer milliseconds."""
+    import numpy as np
+
+    columns = {"t": bars[:, 0].astype(np.int64)}
+    for index, name in enumerate(COLUMNS[1:], start=1):
+        columns[name] = np.ascontiguousarray(bars[:, index])
+    return columns
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+series_cache = SeriesCache()
@@ -0,0 +1,136 @@
+import os
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy import event, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from database import insert_ignoring_conflicts
+
+QUOTE_SNAPSHOT_WINDOW = float(os.getenv("QUOTE_SNAPSHOT_WINDOW", "5"))
+SNAPSHOT_IDS_MAX_SIZE = 10000
+
+
+def quote_values(ticker: dict) -> dict:
+    """Extract the stored quote columns from an upstream ticker snapshot."""
+    return {
+        "price": ticker["min"]["c"],
+        "change": ticker["todaysChange"],
+        "change_percent": ticker["todaysChangePerc"],
+    }
+
+
+def snapshot_time(ticker: dict, window: float = QUOTE_SNAPSHOT_WINDOW) -> datetime:
+    """When the upstream took the snapshot.
+
+    Snapshots without an upstream timestamp fall into the current
+    window-second bucket, so lookups within one window share a row.
+    """
+    updated = ticker.get("updated")
+    if updated:
+        # Nanoseconds since the epoch
+        return datetime.fromtimestamp(updated / 1e9, timezone.utc)
+    now = time.time()
+    return datetime.fromtimestamp(now - now % window, timezone.utc)
+
+
+def prices_hash(values: dict) -> int:
+    """Signed 64-bit digest of quote_values, the last part of a snapshot's key."""
+    digest = hashlib.blake2b(repr(tuple(values.values())).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class SnapshotStore:
+    """Stores each distinct upstream snapshot once and remembers its row id.
+
+    Every lookup served the same cached snapshot references the same
+    quote_snapshots row, so history rows carry no price copies. Rows are
+    keyed by symbol, snapshot time and a hash of the prices, so workers
+    that saw different prices in one window store separate rows. The ids
+    of the latest snapshot per symbol are kept in process, so repeat
+    lookups need no extra database round trip.
+    """
+
+    def __init__(self, max_size: int = SNAPSHOT_IDS_MAX_SIZE):
+        self.max_size = max_size
+        # symbol -> ((as_of, prices_hash), id)
+        self._ids: "OrderedDict[str, tuple[tuple[datetime, int], int]]" = OrderedDict()
+        self.reused = 0
+        self.db_lookups = 0
+
+    async def resolve(self, db: AsyncSession, tickers: dict[str, dict], commit: bool = False) -> dict[str, int]:
+        """Return quote_snapshots ids for tickers, storing snapshots not seen before.
+
+        New snapshots join the caller's transaction, so one commit covers
+        them and the lookups that reference them. With commit=True they
+        are committed right away instead, for write-behind rows flushed
+        from other sessions. Ids are remembered once they are committed.
+        """
+        ids = {}
+        missing = {}
+        values = {}
+        for symbol, ticker in tickers.items():
+            values[symbol] = quote_values(ticker)
+            key = (snapshot_time(ticker), prices_hash(values[symbol]))
+            known = self._ids.get(symbol)
+            if known is not None and known[0] == key:
+                self._ids.move_to_end(symbol)
+                ids[symbol] = known[1]
+                self.reused += 1
+            else:
+                missing[symbol] = key
+        if not missing:
+            return ids
+
+        snapshot = models.QuoteSnapshot
+        await db.execute(
+            # Rows another worker already stored are skipped
+            insert_ignoring_conflicts(
+                models.QuoteSnapshot, db.bind.dialect.name, ["symbol", "as_of", "prices_hash"]
+            ),
+            [
+                {"symbol": symbol, "as_of": as_of, "prices_hash": digest, **values[symbol]}
+                for symbol, (as_of, digest) in missing.items()
+            ],
+        )
+        # Another worker may have stored some of them first, so read all ids back
+        stored = (await db.execute(
+            select(snapshot.symbol, snapshot.id).where(
+                tuple_(snapshot.symbol, snapshot.as_of, snapshot.prices_hash).in_(
+                    [(symbol, as_of, digest) for symbol, (as_of, digest) in missing.items()]
+                )
+            )
+        )).all()
+        self.db_lookups += len(missing)
+        ids.update(stored)
+
+        def remember(session=None):
+            for symbol, snapshot_id in stored:
+                self._remember(symbol, missing[symbol], snapshot_id)
+
+        if commit:
+            await db.commit()
+            remember()
+        else:
+            event.listen(db.sync_session, "after_commit", remember, once=True)
+        return ids
+
+    def _remember(self, symbol: str, key: tuple[datetime, int], snapshot_id: int):
+        self._ids[symbol] = (key, snapshot_id)
+        self._ids.move_to_end(symbol)
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+    def clear(self):
+        """Forget remembered ids and reset counters."""
+        self._ids.clear()
+        self.reused = self.db_lookups = 0
+
+    def stats(self) -> dict:
+        return {"remembered": len(self._ids), "reused": self.reused, "db_lookups": self.db_lookups}
+
+
+snapshot_store = SnapshotStore()
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import os
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "2"))
+STREAM_MAX_SYMBOLS = int(os.getenv("STREAM_MAX_SYMBOLS", "25"))
+STREAM_SEND_BUFFER = int(os.getenv("STREAM_SEND_BUFFER", "32"))
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("STREAM_KEEPALIVE_SECONDS", "15"))
+
+# Queued in place of an update when a subscriber is dropped for being slow
+DROPPED = object()
+# Queued after the last error event when none of a subscriber's symbols are left
+CLOSED = object()
+
+
+class Subscription:
+    """One streaming client and its bounded send buffer."""
+
+    def __init__(self, symbols: list[str], buffer_size: int = STREAM_SEND_BUFFER):
+        self.symbols = list(symbols)
+        self.queue: asyncio.Queue = asyncio.Queue(buffer_size)
+        self.dropped = False
+
+
+class QuoteHub:
+    """Fans out snapshot updates from one poller per symbol to all subscribers.
+
+    The latest update per symbol is kept, so clients joining a symbol
+    that is already polled get its current quote right away.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Optional[dict]]],
+        poll_interval: float = STREAM_POLL_INTERVAL,
+        buffer_size: int = STREAM_SEND_BUFFER,
+    ):
+        self.fetch = fetch
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._pollers: dict[str, asyncio.Task] = {}
+        self._latest: dict[str, dict] = {}
+
+    def subscribe(self, symbols: list[str]) -> Subscription:
+        """Register a subscriber, starting pollers for symbols nobody watches yet."""
+        subscription = Subscription(symbols, self.buffer_size)
+        for symbol in subscription.symbols:
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            if symbol not in self._pollers:
+                self._pollers[symbol] = asyncio.create_task(self._poll(symbol))
+            elif symbol in self._latest and not subscription.queue.full():
+                subscription.queue.put_nowait(self._latest[symbol])
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber and stop pollers nobody watches anymore."""
+        for symbol in subscription.symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[symbol]
+                self._latest.pop(symbol, None)
+                poller = self._pollers.pop(symbol, None)
+                if poller is not None:
+                    poller.cancel()
+
+    def publish(self, symbol: str, event: dict):
+        """Queue an event for every subscriber of symbol, dropping slow ones."""
+        for subscription in list(self._subscribers.get(symbol, ())):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription):
+        subscription.dropped = True
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(DROPPED)
+
+    async def _poll(self, symbol: str):
+        last = None
+        while True:
+            try:
+                snapshot = await self.fetch(symbol)
+            except Exception:
+                logger.warning("Snapshot poll failed for %s", symbol, exc_info=True)
+            else:
+                if snapshot is None:
+                    self._end(symbol, {"symbol": symbol, "error": "Ticker not found"})
+                    return
+                if snapshot != last:
+                    last = snapshot
+                    self._latest[symbol] = {"symbol": symbol, **snapshot}
+                    self.publish(symbol, self._latest[symbol])
+            await asyncio.sleep(self.poll_interval)
+
+    def _end(self, symbol: str, event: dict):
+        """Send a final error event for symbol and stop serving it.
+
+        Subscribers left without any symbol get their stream closed.
+        """
+        self._pollers.pop(symbol, None)
+        self._latest.pop(symbol, None)
+        self.publish(symbol, event)
+        for subscription in self._subscribers.pop(symbol, ()):
+            subscription.symbols.remove(symbol)
+            if not subscription.symbols:
+                try:
+                    subscription.queue.put_nowait(CLOSED)
+                except asyncio.QueueFull:
+                    self._drop(subscription)
+
+    def stats(self) -> dict:
+        """Return counters for monitoring."""
+        return {
+            "symbols": len(self._pollers),
+            "subscriptions": len({s for subs in self._subscribers.values() for s in subs}),
+        }
+
+    async def close(self):
+        """Cancel every poller."""
+        pollers = list(self._pollers.values())
+        self._pollers.clear()
+        self._subscribers.clear()
+        self._latest.clear()
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+
+
+def format_event(event: str, data: dict) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def quote_events(
+    hub: QuoteHub, symbols: list[str], keepalive: float = STREAM_KEEPALIVE_SECONDS
+) -> AsyncIterator[str]:
+    """Subscribe to symbols and yield SSE messages until dropped or disconnected."""
+    subscription = hub.subscribe(symbols)
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is DROPPED:
+                yield format_event("error", {"detail": "Client too slow, stream closed"})
+                return
+            if event is CLOSED:
+                return
+            yield format_event("error" if "error" in event else "quote", event)
+    finally:
+        hub.unsubscribe(subscription)
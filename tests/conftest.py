@@ -1,8 +1,12 @@
+import asyncio
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from database import Base, get_db
+from sqlalchemy.pool import NullPool
+from database import Base, get_db, get_async_db
 from main import app
 import models as models
 
@@ -11,7 +15,25 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The app writes through its own async session, so keep fixture objects
+# loaded after commit instead of re-reading rows the app may have deleted
+TestingSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+# Each TestClient runs its own event loop, so don't pool async connections
+async_engine = create_async_engine(
+    "sqlite+aiosqlite:///./test.db", poolclass=NullPool
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture
+def async_session_factory():
+    """Async session factory bound to the test database."""
+    return TestingAsyncSessionLocal
 
 
 @pytest.fixture(scope="function")
@@ -26,6 +48,38 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start every test with empty caches and symbol counters."""
+    from main import hot_symbols
+    from principal_cache import principal_cache
+    from quote_cache import quote_cache
+    from rate_limit import upstream_scheduler, user_limiter
+    from series import series_cache
+    from snapshots import snapshot_store
+    from tickers import ticker_universe
+    from upstream import breaker
+    quote_cache.clear()
+    principal_cache.clear()
+    hot_symbols.clear()
+    breaker.reset()
+    upstream_scheduler.reset()
+    user_limiter.clear()
+    ticker_universe.clear()
+    snapshot_store.clear()
+    series_cache.clear()
+    yield
+    quote_cache.clear()
+    principal_cache.clear()
+    hot_symbols.clear()
+    breaker.reset()
+    upstream_scheduler.reset()
+    user_limiter.clear()
+    ticker_universe.clear()
+    snapshot_store.clear()
+    series_cache.clear()
+
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """Create a test client with database override."""
@@ -35,7 +89,12 @@ def client(db_session):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -63,4 +122,52 @@ def auth_headers(client, test_user):
         data={"username": test_user.email, "password": "testpassword123"}
     )
     token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
+
+
+FAKE_TICKERS = {
+    "AAPL": {"min": {"c": 150.0}, "todaysChange": 2.5, "todaysChangePerc": 1.69},
+    "MSFT": {"min": {"c": 410.0}, "todaysChange": -1.2, "todaysChangePerc": -0.29},
+    "GOOGL": {"min": {"c": 140.0}, "todaysChange": 0.4, "todaysChangePerc": 0.29},
+}
+
+
+@pytest.fixture(autouse=True)
+def local_massive():
+    """Serve every upstream call from the local Massive stand-in."""
+    import httpx
+    import upstream
+    from bench.fake_massive import create_app
+
+    fake = create_app()
+    asyncio.run(upstream.set_transport(httpx.ASGITransport(app=fake)))
+    yield fake.state.stats
+    asyncio.run(upstream.set_transport(None))
+
+
+@pytest.fixture
+def fake_upstream(local_massive):
+    """Route Massive API calls to an in-memory stand-in and record them."""
+    import httpx
+    import upstream
+
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        symbol = request.url.path.rsplit("/", 1)[-1]
+        if symbol == "tickers":
+            symbols = request.url.params["tickers"].split(",")
+            tickers = [
+                dict(FAKE_TICKERS[symbol], ticker=symbol)
+                for symbol in symbols if symbol in FAKE_TICKERS
+            ]
+            return httpx.Response(200, json={"status": "OK", "tickers": tickers})
+        if symbol not in FAKE_TICKERS:
+            return httpx.Response(404, json={"status": "NOT_FOUND"})
+        ticker = dict(FAKE_TICKERS[symbol], ticker=symbol)
+        return httpx.Response(200, json={"status": "OK", "ticker": ticker})
+
+    asyncio.run(upstream.set_transport(httpx.MockTransport(handler)))
+    yield calls
+    asyncio.run(upstream.set_transport(None))
@@ -0,0 +1,86 @@
+import pytest
+
+
+class TestBatchStockQuotes:
+    def test_batch_success(self, client, auth_headers, fake_upstream):
+        """Test fetching several symbols in one multi-ticker call."""
+        response = client.post(
+            "/stock-quotes/batch",
+            headers=auth_headers,
+            json={"symbols": ["aapl", "MSFT", "GOOGL"]}
+        )
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [item["symbol"] for item in results] == ["AAPL", "MSFT", "GOOGL"]
+        assert all(item["error"] is None for item in results)
+        assert results[1]["quote"]["price"] == 410.0
+        assert len(fake_upstream) == 1
+
+    def test_batch_partial_not_found(self, client, auth_headers, fake_upstream):
+        """Test that unknown symbols fail individually."""
+        response = client.post(
+            "/stock-quotes/batch",
+            headers=auth_headers,
+            json={"symbols": ["AAPL", "INVALID"]}
+        )
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results[0]["quote"]["symbol"] == "AAPL"
+        assert results[1]["quote"] is None
+        assert "not found" in results[1]["error"].lower()
+
+    def test_batch_saves_rows(self, client, auth_headers, test_user, db_session, fake_upstream):
+        """Test that one row per found symbol is written."""
+        import models
+
+        client.post(
+            "/stock-quotes/batch",
+            headers=auth_headers,
+            json={"symbols": ["AAPL", "MSFT", "AAPL", "INVALID"]}
+        )
+        quotes = db_session.query(models.StockQuote).filter(
+            models.StockQuote.user_id == test_user.id
+        ).all()
+        assert sorted(quote.symbol for quote in quotes) == ["AAPL", "MSFT"]
+
+    def test_batch_is_chunked(self, client, auth_headers, fake_upstream, monkeypatch):
+        """Test that long symbol lists are split into several upstream calls."""
+        import upstream
+
+        monkeypatch.setattr(upstream, "UPSTREAM_BATCH_CHUNK_SIZE", 2)
+        response = client.post(
+            "/stock-quotes/batch",
+            headers=auth_headers,
+            json={"symbols": ["AAPL", "MSFT", "GOOGL", "INVALID", "OTHER"]}
+        )
+        assert response.status_code == 200
+        assert len(fake_upstream) == 3
+
+    def test_batch_uses_cache(self, client, auth_headers, fake_upstream):
+        """Test that cached symbols are not requested again."""
+        client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+        client.post(
+            "/stock-quotes/batch",
+            headers=auth_headers,
+            json={"symbols": ["AAPL", "MSFT"]}
+        )
+        assert len(fake_upstream) == 2
+        assert fake_upstream[1].url.params["tickers"] == "MSFT"
+
+    def test_batch_limits(self, client, auth_headers):
+        """Test that empty and oversized batches are rejected."""
+        from schemas import MAX_BATCH_SYMBOLS
+
+        response = client.post("/stock-quotes/batch", headers=auth_headers, json={"symbols": []})
+        assert response.status_code == 422
+        response = client.post(
+            "/stock-quotes/batch",
+            headers=auth_headers,
+            json={"symbols": [f"S{i}" for i in range(MAX_BATCH_SYMBOLS + 1)]}
+        )
+        assert response.status_code == 422
+
+    def test_batch_unauthenticated(self, client):
+        """Test batch quotes without authentication."""
+        response = client.post("/stock-quotes/batch", json={"symbols": ["AAPL"]})
+        assert response.status_code == 401
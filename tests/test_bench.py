@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+import httpx
+
+from bench.fake_massive import FakeMassiveConfig, create_app
+from bench.loadgen import compare, percentile
+
+SNAPSHOT = "/v2/snapshot/locale/us/markets/stocks/tickers"
+
+
+def _get(app, path, **params):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://fake") as client:
+            return await client.get(path, params=params)
+    return asyncio.run(run())
+
+
+class TestFakeMassive:
+    def test_known_and_unknown_tickers(self):
+        """Test that the stand-in serves known tickers and 404s the rest."""
+        app = create_app()
+        response = _get(app, f"{SNAPSHOT}/AAPL")
+        assert response.status_code == 200
+        assert response.json()["ticker"]["ticker"] == "AAPL"
+        assert _get(app, f"{SNAPSHOT}/INVALID").status_code == 404
+        assert app.state.stats.calls == 2
+
+    def test_multi_ticker_snapshot(self):
+        """Test that the multi-ticker endpoint omits unknown symbols."""
+        app = create_app()
+        response = _get(app, SNAPSHOT, tickers="AAPL,INVALID,MSFT")
+        assert [t["ticker"] for t in response.json()["tickers"]] == ["AAPL", "MSFT"]
+
+    def test_error_and_not_found_rates(self):
+        """Test that configured failure rates are applied."""
+        app = create_app(FakeMassiveConfig(error_rate=1.0))
+        assert _get(app, f"{SNAPSHOT}/AAPL").status_code == 503
+        app = create_app(FakeMassiveConfig(not_found_rate=1.0))
+        assert _get(app, f"{SNAPSHOT}/AAPL").status_code == 404
+
+
+class TestLoadgenReport:
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 0.50) == 50.0
+        assert percentile(values, 0.99) == 99.0
+        assert percentile([], 0.5) == 0.0
+
+    def test_compare_flags_regressions(self):
+        """Test that only metrics past the tolerance are reported."""
+        baseline = {"quote": {"rps": 100, "p95_ms": 10, "db_queries_per_request": 2}}
+        report = {"quote": {"rps": 95, "p95_ms": 20, "db_queries_per_request": 2}}
+        assert compare(report, baseline, tolerance=0.25) == ["quote.p95_ms: 10 -> 20"]
+        report["quote"]["rps"] = 50
+        assert "quote.rps: 100 -> 50" in compare(report, baseline, tolerance=0.25)
+
+
+class TestSerializationBenchmark:
+    def test_paths_produce_identical_output(self):
+        """Test that the benchmark compares two paths with the same output."""
+        from bench.serialization import run
+
+        report = asyncio.run(run(rows=20, iterations=2))
+        assert report["identical_output"] is True
+        assert report["tuples_orjson_us"] > 0
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from bootstrap import create_schema
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBootstrap:
+    def test_import_does_not_touch_database(self, tmp_path):
+        """Test that importing the app neither creates tables nor loads heavy modules."""
+        db_path = tmp_path / "cold.db"
+        code = (
+            "import json, sys, main, database;"
+            "print(json.dumps({'engines': list(database.created_engines()),"
+            " 'loaded': [m for m in ('httpx', 'pwdlib', 'aiosqlite', 'numpy') if m in sys.modules]}))"
+        )
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+        output = subprocess.run(
+            [sys.executable, "-c", code], env=env, cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        assert json.loads(output.strip().splitlines()[-1]) == {"engines": [], "loaded": []}
+        assert not db_path.exists()
+
+    def test_create_schema(self, tmp_path):
+        """Test that the bootstrap command creates tables and indexes."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'boot.db'}")
+
+        async def run():
+            await create_schema(engine)
+            async with engine.connect() as conn:
+                return await conn.run_sync(
+                    lambda sync_conn: (
+                        inspect(sync_conn).get_table_names(),
+                        [index["name"] for index in inspect(sync_conn).get_indexes("stock_quotes")],
+                    )
+                )
+
+        try:
+            tables, indexes = asyncio.run(run())
+        finally:
+            asyncio.run(engine.dispose())
+        assert {"users", "stock_quotes"} <= set(tables)
+        assert "ix_stock_quotes_user_created" in indexes
+
+    def test_startup_time_is_recorded(self, client):
+        """Test that import and lifespan startup times are exported."""
+        body = client.get("/metrics").text
+        assert 'stockquote_startup_seconds{phase="import"}' in body
+        assert 'stockquote_startup_seconds{phase="lifespan"}' in body
+
+    def test_create_schema_adds_missing_index(self, tmp_path):
+        """Test that bootstrapping an older schema adds indexes it lacks."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+
+        async def run():
+            await create_schema(engine)
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql("DROP INDEX ix_stock_quotes_user_created")
+            await create_schema(engine)
+            async with engine.connect() as conn:
+                return await conn.run_sync(
+                    lambda sync_conn: [index["name"] for index in inspect(sync_conn).get_indexes("stock_quotes")]
+                )
+
+        try:
+            indexes = asyncio.run(run())
+        finally:
+            asyncio.run(engine.dispose())
+        assert "ix_stock_quotes_user_created" in indexes
@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+
+from bench.fake_massive import ticker_snapshot
+from bench.fake_redis import FakeRedis
+from cache_backends import (
+    CacheBackend, MemoryBackend, RedisBackend, RedisClient, create_backend, decode_entry, encode_entry
+)
+from quote_cache import QuoteCache
+
+
+def with_redis(test):
+    """Run test(url, fake) against a fresh fake Redis server."""
+    async def run():
+        fake = FakeRedis()
+        port = await fake.start()
+        try:
+            return await test(f"redis://127.0.0.1:{port}/0", fake)
+        finally:
+            await fake.stop()
+    return asyncio.run(run())
+
+
+class TestEntryCodec:
+    def test_snapshot_round_trip(self):
+        """Test that snapshots pack into a small record and keep the fields the service reads."""
+        snapshot = ticker_snapshot("AAPL")
+        data = encode_entry((1700000000.5, snapshot))
+        assert len(data) == 41
+        fetched_at, decoded = decode_entry("AAPL", data)
+        assert fetched_at == 1700000000.5
+        assert decoded["ticker"] == "AAPL"
+        assert decoded["min"]["c"] == snapshot["min"]["c"]
+        assert decoded["todaysChange"] == snapshot["todaysChange"]
+        assert decoded["todaysChangePerc"] == snapshot["todaysChangePerc"]
+        assert decoded["updated"] == snapshot["updated"]
+
+    def test_not_found_and_missing_fields(self):
+        """Test negative entries and snapshots without change values."""
+        assert decode_entry("X", encode_entry((5.0, None))) == (5.0, None)
+        _, decoded = decode_entry("X", encode_entry((5.0, {"min": {"c": 1.0}})))
+        assert decoded["todaysChange"] is None
+        assert decoded["todaysChangePerc"] is None
+
+    def test_create_backend(self):
+        """Test that the configured backend name selects the implementation."""
+        assert isinstance(create_backend("memory"), MemoryBackend)
+        assert isinstance(create_backend("redis"), RedisBackend)
+        with pytest.raises(ValueError):
+            create_backend("memcached")
+
+
+class TestBackendInterface:
+    def test_incomplete_backend_cannot_be_built(self):
+        """Test that a backend missing part of the interface fails on construction."""
+        class GetOnly(CacheBackend):
+            async def get_many(self, symbols):
+                return {}
+
+        with pytest.raises(TypeError):
+            GetOnly()
+
+
+class TestRedisBackend:
+    def test_set_get_and_expiry(self):
+        """Test that entries round-trip through Redis and expire."""
+        async def test(url, fake):
+            backend = RedisBackend(RedisClient(url))
+            await backend.set_many({"AAPL": (1.0, ticker_snapshot("AAPL")), "BAD": (1.0, None)}, ttl=60)
+            await backend.set_many({"MSFT": (1.0, ticker_snapshot("MSFT"))}, ttl=0.01)
+            await asyncio.sleep(0.02)
+            found = await backend.get_many(["AAPL", "BAD", "MSFT", "NVDA"])
+            await backend.close()
+            return found
+
+        found = with_redis(test)
+        assert set(found) == {"AAPL", "BAD"}
+        assert found["BAD"] == (1.0, None)
+
+    def test_lock_is_exclusive_and_token_checked(self):
+        """Test that only one holder gets a lock and only its owner can release it."""
+        async def test(url, fake):
+            backend = RedisBackend(RedisClient(url))
+            first = await backend.acquire_lock("AAPL", ttl=5)
+            second = await backend.acquire_lock("AAPL", ttl=5)
+            await backend.release_lock("AAPL", "not-the-owner")
+            still_held = await backend.acquire_lock("AAPL", ttl=5)
+            await backend.release_lock("AAPL", first)
+            after_release = await backend.acquire_lock("AAPL", ttl=5)
+            await backend.close()
+            return first, second, still_held, after_release
+
+        first, second, still_held, after_release = with_redis(test)
+        assert first is not None
+        assert second is None
+        assert still_held is None
+        assert after_release is not None
+
+    @pytest.mark.parametrize("shared", [False, True])
+    def test_token_bucket(self, shared):
+        """Test that token buckets empty, keep a reserve, take tokens back and refill."""
+        async def test(url, fake):
+            backend = RedisBackend(RedisClient(url)) if shared else MemoryBackend(max_size=1)
+            taken = [await backend.take_tokens("b", rate=0.001, capacity=3) for _ in range(2)]
+            taken.append(await backend.take_tokens("b", rate=0.001, capacity=3, keep=1))
+            taken.append(await backend.take_tokens("b", rate=0.001, capacity=3, amount=-1))
+            taken.append(await backend.take_tokens("fast", rate=1000, capacity=1))
+            await asyncio.sleep(0.01)
+            taken.append(await backend.take_tokens("fast", rate=1000, capacity=1))
+            await backend.close()
+            return taken
+
+        taken = with_redis(test)
+        assert [granted for granted, _ in taken] == [True, True, False, True, True, True]
+        assert [round(tokens) for _, tokens in taken[:4]] == [2, 1, 1, 2]
+
+
+class TestSharedQuoteCache:
+    def test_workers_share_one_upstream_fetch(self):
+        """Test that two workers missing the same symbol fetch it from upstream once."""
+        calls = []
+
+        async def loader(symbol):
+            calls.append(symbol)
+            await asyncio.sleep(0.05)
+            return ticker_snapshot(symbol)
+
+        async def test(url, fake):
+            workers = [
+                QuoteCache(ttl=60, backend=RedisBackend(RedisClient(url)), lock_wait=1)
+                for _ in range(2)
+            ]
+            results = await asyncio.gather(*(worker.get_or_fetch("AAPL", loader) for worker in workers))
+            waits = sum(worker.stats()["lock_waits"] for worker in workers)
+            for worker in workers:
+                await worker.close()
+            return results, waits
+
+        results, waits = with_redis(test)
+        assert calls == ["AAPL"]
+        assert results[0]["min"]["c"] == results[1]["min"]["c"]
+        assert waits == 1
+
+    def test_batch_waits_for_peer_refresh(self):
+        """Test that a batch only fetches symbols no other worker is refreshing."""
+        calls = []
+
+        async def loader(symbols):
+            calls.append(sorted(symbols))
+            await asyncio.sleep(0.05)
+            return {symbol: ticker_snapshot(symbol) for symbol in symbols if symbol != "INVALID"}
+
+        async def test(url, fake):
+            first = QuoteCache(ttl=60, backend=RedisBackend(RedisClient(url)))
+            second = QuoteCache(ttl=60, backend=RedisBackend(RedisClient(url)))
+            results = await asyncio.gather(
+                first.get_or_fetch_many(["AAPL", "MSFT"], loader),
+                second.get_or_fetch_many(["MSFT", "INVALID"], loader),
+            )
+            await first.close()
+            await second.close()
+            return results
+
+        first, second = with_redis(test)
+        # Whichever worker locked MSFT first fetches it; the other waits for it
+        assert sorted(symbol for call in calls for symbol in call) == ["AAPL", "INVALID", "MSFT"]
+        assert second["MSFT"] is not None
+        assert second["INVALID"] is None
+
+    def test_unreachable_redis_degrades_to_upstream(self):
+        """Test that cache backend failures fall back to fetching from upstream."""
+        async def loader(symbol):
+            return ticker_snapshot(symbol)
+
+        async def run():
+            cache = QuoteCache(
+                ttl=60, backend=RedisBackend(RedisClient("redis://127.0.0.1:1/0", timeout=0.2))
+            )
+            snapshot = await cache.get_or_fetch("AAPL", loader)
+            return snapshot, cache.stats()
+
+        snapshot, stats = asyncio.run(run())
+        assert snapshot["ticker"] == "AAPL"
+        assert stats["backend_errors"] >= 1
@@ -0,0 +1,193 @@
+import asyncio
+
+import httpx
+import pytest
+
+import upstream
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from quote_cache import QuoteCache, quote_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def ok():
+    return "ok"
+
+
+async def boom():
+    raise RuntimeError("upstream down")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def failing_upstream():
+    run(upstream.set_transport(httpx.MockTransport(lambda request: httpx.Response(503))))
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        """Test that the circuit opens after the failure threshold and then fails fast."""
+        breaker = CircuitBreaker(failure_threshold=3, clock=FakeClock())
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                run(breaker.call(boom))
+        assert breaker.state == OPEN
+
+        with pytest.raises(CircuitOpen):
+            run(breaker.call(ok))
+        assert breaker.stats()["rejected"] == 1
+
+    def test_opens_on_error_rate(self):
+        """Test that a high error rate over the window opens the circuit."""
+        breaker = CircuitBreaker(failure_threshold=100, error_rate=0.5, min_calls=4, clock=FakeClock())
+        for fn in (ok, boom, ok, boom):
+            try:
+                run(breaker.call(fn))
+            except RuntimeError:
+                pass
+        assert breaker.state == OPEN
+
+    def test_slow_calls_count_as_failures(self):
+        """Test that calls slower than the slow-call threshold count as failures."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=1, clock=clock)
+
+        async def slow():
+            clock.now += 5
+            return "late"
+
+        assert run(breaker.call(slow)) == "late"
+        assert run(breaker.call(slow)) == "late"
+        assert breaker.state == OPEN
+
+    def test_half_open_probe_closes_circuit(self):
+        """Test that a successful probe after the open period closes the circuit."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, open_seconds=10, clock=clock)
+        with pytest.raises(RuntimeError):
+            run(breaker.call(boom))
+        clock.now = 10
+        assert breaker.state == HALF_OPEN
+        assert run(breaker.call(ok)) == "ok"
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_failure_reopens(self):
+        """Test that a failed probe reopens the circuit for another open period."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, open_seconds=10, clock=clock)
+        with pytest.raises(RuntimeError):
+            run(breaker.call(boom))
+        clock.now = 10
+        with pytest.raises(RuntimeError):
+            run(breaker.call(boom))
+        assert breaker.state == OPEN
+        assert breaker.stats()["times_opened"] == 2
+
+    def test_half_open_limits_probes(self):
+        """Test that only half_open_probes calls are let through at once."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, open_seconds=10, half_open_probes=1, clock=clock)
+        with pytest.raises(RuntimeError):
+            run(breaker.call(boom))
+        clock.now = 10
+
+        async def probe_and_call():
+            release = asyncio.Event()
+
+            async def wait():
+                await release.wait()
+                return "probe"
+
+            probe = asyncio.ensure_future(breaker.call(wait))
+            await asyncio.sleep(0)
+            with pytest.raises(CircuitOpen):
+                await breaker.call(ok)
+            release.set()
+            return await probe
+
+        assert run(probe_and_call()) == "probe"
+        assert breaker.state == CLOSED
+
+
+class TestStaleCache:
+    def test_stale_entry_outlives_ttl(self):
+        """Test that expired entries stay available as stale within the window."""
+        cache = QuoteCache(ttl=0, stale_seconds=60)
+
+        async def run():
+            await cache.put("AAPL", {"ticker": "AAPL"})
+            return await cache.get("AAPL"), await cache.get_stale("AAPL")
+
+        assert asyncio.run(run()) == (None, {"ticker": "AAPL"})
+        assert cache.stats()["stale_served"] == 1
+
+    def test_stale_window_is_bounded(self):
+        """Test that nothing is served once the staleness window has passed."""
+        cache = QuoteCache(ttl=0, stale_seconds=0)
+
+        async def run():
+            await cache.put("AAPL", {"ticker": "AAPL"})
+            return await cache.get_stale("AAPL")
+
+        assert asyncio.run(run()) is None
+
+
+class TestUpstreamFallback:
+    def test_serves_stale_quote_when_upstream_fails(self, client, auth_headers, fake_upstream, monkeypatch):
+        """Test that a failing upstream falls back to the last known snapshot."""
+        monkeypatch.setattr(quote_cache, "ttl", 0)
+        assert client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"}).status_code == 200
+
+        failing_upstream()
+        response = client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+        assert response.status_code == 200
+        assert response.headers["X-Quote-Stale"] == "true"
+        assert response.json()["price"] == 150.0
+
+    def test_open_circuit_skips_upstream(self, client, auth_headers, monkeypatch):
+        """Test that an open circuit fails fast with Retry-After instead of calling upstream."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        run(upstream.set_transport(httpx.MockTransport(handler)))
+        monkeypatch.setattr(upstream.breaker, "failure_threshold", 2)
+        for _ in range(2):
+            client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+        assert len(calls) == 2
+
+        response = client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+        assert response.status_code == 502
+        assert "Retry-After" in response.headers
+        assert len(calls) == 2
+
+    def test_batch_marks_stale_quotes(self, client, auth_headers, fake_upstream, monkeypatch):
+        """Test that batch items served from the stale cache are flagged."""
+        monkeypatch.setattr(quote_cache, "ttl", 0)
+        client.post("/stock-quotes/batch", headers=auth_headers, json={"symbols": ["AAPL"]})
+
+        failing_upstream()
+        response = client.post(
+            "/stock-quotes/batch", headers=auth_headers, json={"symbols": ["AAPL", "MSFT"]}
+        )
+        assert response.status_code == 200
+        aapl, msft = response.json()["results"]
+        assert aapl["stale"] is True
+        assert aapl["quote"]["price"] == 150.0
+        assert msft["error"] == "Quote service unavailable"
+
+    def test_breaker_stats_endpoint(self, client):
+        """Test that breaker state is exposed for monitoring."""
+        response = client.get("/stats/upstream")
+        assert response.status_code == 200
+        assert response.json()["state"] == "closed"
@@ -0,0 +1,85 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+
+
+def seed(db_session, user, count):
+    start = datetime(2024, 1, 1)
+    db_session.add_all(
+        models.StockQuote(
+            user_id=user.id,
+            symbol=f"S{i}",
+            price=float(i),
+            change=None if i % 2 else 0.5,
+            created_at=start + timedelta(seconds=i),
+        )
+        for i in range(count)
+    )
+    db_session.commit()
+
+
+class TestQuoteExport:
+    def test_ndjson_streams_full_history(self, client, auth_headers, test_user, db_session, monkeypatch):
+        """Test that the export returns every row, newest first, across cursor batches."""
+        import main
+
+        monkeypatch.setattr(main, "EXPORT_CHUNK_ROWS", 7)
+        seed(db_session, test_user, 60)
+        response = client.get("/stock-quotes/export", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["symbol"] for row in rows] == [f"S{i}" for i in reversed(range(60))]
+        assert rows[0]["change"] is None
+        assert set(rows[0]) == {"id", "symbol", "price", "change", "change_percent", "created_at"}
+
+    def test_csv_export(self, client, auth_headers, test_user, db_session):
+        """Test that CSV exports have a header and one line per quote."""
+        seed(db_session, test_user, 3)
+        response = client.get("/stock-quotes/export", headers=auth_headers, params={"format": "csv"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        lines = list(csv.reader(io.StringIO(response.text)))
+        assert lines[0] == ["id", "symbol", "price", "change", "change_percent", "created_at"]
+        assert [line[1] for line in lines[1:]] == ["S2", "S1", "S0"]
+
+    def test_empty_csv_has_header(self, client, auth_headers):
+        """Test that an empty history still exports a CSV header."""
+        response = client.get("/stock-quotes/export", headers=auth_headers, params={"format": "csv"})
+        assert response.text.splitlines() == ["id,symbol,price,change,change_percent,created_at"]
+
+    def test_gzip_export(self, client, auth_headers, test_user, db_session):
+        """Test that gzip exports decompress to the plain export."""
+        seed(db_session, test_user, 20)
+        plain = client.get("/stock-quotes/export", headers=auth_headers).content
+        response = client.get(
+            "/stock-quotes/export", headers=auth_headers, params={"gzip": "true"}
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        # httpx decodes Content-Encoding transparently; check the raw stream too
+        assert response.content == plain
+        with client.stream("GET", "/stock-quotes/export", headers=auth_headers, params={"gzip": "true"}) as raw:
+            body = b"".join(raw.iter_raw())
+        assert gzip.decompress(body) == plain
+
+    def test_export_only_own_quotes(self, client, auth_headers, db_session):
+        """Test that other users' quotes are not exported."""
+        from main import get_password_hash
+
+        other = models.User(email="other@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(other)
+        db_session.commit()
+        seed(db_session, other, 5)
+        response = client.get("/stock-quotes/export", headers=auth_headers)
+        assert response.text == ""
+
+    def test_invalid_format(self, client, auth_headers):
+        """Test that unknown formats are rejected."""
+        response = client.get("/stock-quotes/export", headers=auth_headers, params={"format": "xml"})
+        assert response.status_code == 422
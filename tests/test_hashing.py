@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+
+from hashing import HashingPoolSaturated, PasswordHashPool
+
+
+class TestPasswordHashPool:
+    def test_hash_and_verify(self):
+        """Test hashing and verifying through the pool."""
+        pool = PasswordHashPool(workers=2, queue_limit=2)
+
+        async def run():
+            hashed = await pool.hash("secret")
+            return await pool.verify_and_update("secret", hashed), await pool.verify_and_update("wrong", hashed)
+
+        try:
+            (valid, updated), (invalid, _) = asyncio.run(run())
+        finally:
+            pool.shutdown()
+        assert valid is True
+        assert updated is None
+        assert invalid is False
+
+    def test_saturated_pool_rejects(self):
+        """Test that jobs beyond workers plus queue limit are rejected."""
+        pool = PasswordHashPool(workers=1, queue_limit=0)
+        pool.pending = 1
+        with pytest.raises(HashingPoolSaturated):
+            asyncio.run(pool.hash("secret"))
+
+
+class TestHashingEndpoints:
+    def test_login_returns_503_when_saturated(self, client, test_user, monkeypatch):
+        """Test that a full hashing queue sheds load with 503."""
+        from hashing import password_pool
+
+        monkeypatch.setattr(password_pool, "pending", password_pool.workers + password_pool.queue_limit)
+        response = client.post(
+            "/token",
+            data={"username": test_user.email, "password": "testpassword123"}
+        )
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+    def test_login_rehashes_outdated_hash(self, client, db_session):
+        """Test that outdated Argon2 parameters are upgraded on login."""
+        from pwdlib.hashers.argon2 import Argon2Hasher
+        import models
+
+        old_hash = Argon2Hasher(time_cost=1, memory_cost=8192).hash("password123")
+        user = models.User(email="legacy@example.com", hashed_password=old_hash)
+        db_session.add(user)
+        db_session.commit()
+
+        response = client.post(
+            "/token",
+            data={"username": "legacy@example.com", "password": "password123"}
+        )
+        assert response.status_code == 200
+
+        db_session.expire_all()
+        user = db_session.query(models.User).filter_by(email="legacy@example.com").first()
+        assert user.hashed_password != old_hash
+        assert not Argon2Hasher().check_needs_rehash(user.hashed_password)
@@ -0,0 +1,150 @@
+import asyncio
+import re
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import models
+from maintenance import partition_stock_quotes, retention_cutoff, run_maintenance
+
+NOW = datetime(2024, 3, 10, 15, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def history(db_session, test_user):
+    """Lookups on three days: two expired days (one with a shared snapshot) and today."""
+    snapshot = models.QuoteSnapshot(
+        symbol="AAPL", as_of=datetime(2024, 3, 1, 9, 0), price=101.0, change=1.0, change_percent=1.0
+    )
+    unused = models.QuoteSnapshot(
+        symbol="MSFT", as_of=datetime(2024, 3, 1, 9, 0), price=400.0, change=0.0, change_percent=0.0
+    )
+    db_session.add_all([snapshot, unused])
+    db_session.commit()
+    rows = [
+        ("AAPL", 100.0, None, datetime(2024, 3, 1, 9, 30)),
+        ("AAPL", None, snapshot.id, datetime(2024, 3, 1, 10, 0)),
+        ("AAPL", 98.0, None, datetime(2024, 3, 1, 11, 0)),
+        ("AAPL", 99.5, None, datetime(2024, 3, 1, 12, 0)),
+        ("MSFT", 410.0, None, datetime(2024, 3, 2, 8, 0)),
+        ("AAPL", 105.0, None, datetime(2024, 3, 10, 9, 0)),
+    ]
+    db_session.add_all(
+        models.StockQuote(
+            user_id=test_user.id, symbol=symbol, price=price, snapshot_id=snapshot_id, created_at=created_at
+        )
+        for symbol, price, snapshot_id, created_at in rows
+    )
+    db_session.commit()
+    return snapshot, unused
+
+
+def _run(**kwargs):
+    from tests.conftest import async_engine
+
+    return asyncio.run(run_maintenance(async_engine, now=NOW, **kwargs))
+
+
+class TestRetention:
+    def test_cutoff_is_start_of_day(self):
+        """Test that retention keeps whole UTC days."""
+        assert retention_cutoff(NOW, 7) == datetime(2024, 3, 3, tzinfo=timezone.utc)
+
+    def test_rollup_and_prune(self, db_session, test_user, history):
+        """Test that expired lookups become daily OHLC rollups and are deleted."""
+        report = _run(retention_days=7, batch=2)
+        assert report["rolled_up"] == 2
+        assert report["deleted"] == 5
+
+        rollups = {
+            (rollup.day, rollup.symbol): rollup
+            for rollup in db_session.query(models.QuoteDailyRollup).all()
+        }
+        aapl = rollups[(date(2024, 3, 1), "AAPL")]
+        assert aapl.user_id == test_user.id
+        assert aapl.count == 4
+        assert (aapl.open_price, aapl.high_price, aapl.low_price, aapl.close_price) == (100.0, 101.0, 98.0, 99.5)
+        assert rollups[(date(2024, 3, 2), "MSFT")].count == 1
+
+        remaining = db_session.query(models.StockQuote).all()
+        assert [quote.created_at.day for quote in remaining] == [10]
+
+    def test_unreferenced_snapshots_are_pruned(self, db_session, history):
+        """Test that snapshots no kept lookup references are removed."""
+        report = _run(retention_days=7)
+        assert report["snapshots_pruned"] == 2
+        assert db_session.query(models.QuoteSnapshot).count() == 0
+
+    def test_repeat_pass_is_harmless(self, db_session, history):
+        """Test that a second pass neither duplicates rollups nor deletes kept rows."""
+        _run(retention_days=7)
+        report = _run(retention_days=7)
+        assert (report["rolled_up"], report["deleted"]) == (0, 0)
+        assert db_session.query(models.QuoteDailyRollup).count() == 2
+        assert db_session.query(models.StockQuote).count() == 1
+
+    def test_disabled_by_default(self, db_session, history):
+        """Test that nothing is pruned without a retention window."""
+        report = _run(retention_days=0)
+        assert report["cutoff"] is None
+        assert db_session.query(models.StockQuote).count() == 6
+
+    def test_partitioning_needs_postgres(self):
+        """Test that converting to partitions is refused on SQLite."""
+        from tests.conftest import async_engine
+
+        async def run():
+            async with async_engine.connect() as conn:
+                await partition_stock_quotes(conn, NOW.date())
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(run())
+
+    def test_account_deletion_removes_rollups(self, client, auth_headers, db_session, history):
+        """Test that deleting the account also deletes its rollups."""
+        _run(retention_days=7)
+        assert client.delete("/users/me", headers=auth_headers).status_code == 204
+        assert db_session.query(models.QuoteDailyRollup).count() == 0
+
+
+class RecordingConnection:
+    """Stands in for a Postgres connection and records the statements it is sent."""
+    dialect = postgresql.dialect()
+
+    def __init__(self):
+        self.statements = []
+
+    async def scalar(self, statement, *args):
+        return "public.stock_quotes_id_seq" if "pg_get_serial_sequence" in str(statement) else False
+
+    async def execute(self, statement, *args):
+        self.statements.append(str(statement))
+        return []
+
+    async def commit(self):
+        pass
+
+
+class TestPartitionMigration:
+    def test_bootstrap_after_partitioning(self):
+        """Test that every model index ends up on the partitioned parent under its own name."""
+        conn = RecordingConnection()
+        assert asyncio.run(partition_stock_quotes(conn, NOW.date()))
+
+        # Replay the DDL as index name -> table, the way bootstrap's checkfirst sees it
+        indexes = {index.name: "stock_quotes" for index in models.StockQuote.__table__.indexes}
+        for statement in conn.statements:
+            if match := re.match(r"ALTER TABLE (\w+) RENAME TO (\w+)", statement):
+                indexes = {name: match[2] if table == match[1] else table for name, table in indexes.items()}
+            elif match := re.match(r"ALTER INDEX (\w+) RENAME TO (\w+)", statement):
+                assert match[2] not in indexes
+                indexes[match[2]] = indexes.pop(match[1])
+            elif match := re.match(r"CREATE INDEX (\w+) ON (\w+)", statement):
+                assert match[1] not in indexes, f"{match[1]} already exists"
+                indexes[match[1]] = match[2]
+
+        for index in models.StockQuote.__table__.indexes:
+            assert indexes[index.name] == "stock_quotes"
+        assert indexes["ix_stock_quotes_legacy_id"] == "stock_quotes_legacy"
+
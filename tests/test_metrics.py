@@ -0,0 +1,41 @@
+import pytest
+
+from metrics import Histogram, Registry
+
+
+class TestMetricsRegistry:
+    def test_histogram_rendering(self):
+        """Test Prometheus text output for a labelled histogram."""
+        registry = Registry()
+        latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        latency.labels("/a").observe(0.05)
+        latency.labels("/a").observe(0.5)
+        latency.labels("/a").observe(5)
+        text = registry.render()
+        assert "# TYPE latency_seconds histogram" in text
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{route="/a"} 3' in text
+
+    def test_timer(self):
+        """Test that the timer context records one observation."""
+        histogram = Histogram("stage_seconds", "Stage")
+        with histogram.labels().time():
+            pass
+        assert histogram.labels().count == 1
+
+
+class TestMetricsEndpoint:
+    def test_metrics_after_quote(self, client, auth_headers):
+        """Test that route latency and hot-path stages are exported."""
+        client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        text = response.text
+        assert 'http_request_duration_seconds_count{method="POST",route="/stock-quote",status="200"}' in text
+        for stage in ("jwt_decode", "user_lookup", "upstream", "db_commit"):
+            assert f'stockquote_stage_duration_seconds_count{{stage="{stage}"}}' in text
+        assert "http_requests_in_flight" in text
+        assert 'quote_cache_lookups_total{result="misses"}' in text
+        assert "write_behind_dropped_rows_total 0" in text
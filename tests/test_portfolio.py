@@ -0,0 +1,137 @@
+import math
+
+import pytest
+from sqlalchemy import event
+
+import models
+from portfolio import value_portfolio
+from tickers import ticker_universe
+
+TICKERS = {
+    "AAPL": {"min": {"c": 150.0}, "todaysChange": 1.5, "todaysChangePerc": 1.0},
+    "MSFT": {"min": {"c": 400.0}, "todaysChange": -4.0, "todaysChangePerc": -1.0},
+}
+
+
+def _holdings(client, headers, holdings):
+    return client.put("/portfolio/holdings", headers=headers, json={"holdings": holdings})
+
+
+class TestValuation:
+    def test_values_and_weights(self):
+        """Test market value, day change, weights and P&L across positions."""
+        portfolio = value_portfolio([("AAPL", 10, 1000.0), ("MSFT", 1, None)], TICKERS)
+        assert portfolio["market_value"] == 1900.0
+        assert portfolio["day_change"] == 11.0
+        assert portfolio["day_change_percent"] == pytest.approx(100 * 11 / 1889)
+        assert portfolio["cost_basis"] == 1000.0
+        assert portfolio["unrealized_pnl"] == 500.0
+
+        aapl, msft = portfolio["positions"]
+        assert (aapl["symbol"], aapl["market_value"], aapl["day_change"]) == ("AAPL", 1500.0, 15.0)
+        assert aapl["weight"] == pytest.approx(1500 / 1900)
+        assert aapl["unrealized_pnl"] == 500.0
+        assert math.isnan(msft["unrealized_pnl"])
+
+    def test_unpriced_positions_are_left_out(self):
+        """Test that positions without a snapshot are listed last and not counted."""
+        portfolio = value_portfolio([("NOPE", 5, 100.0), ("AAPL", 1, None)], TICKERS)
+        assert portfolio["market_value"] == 150.0
+        assert portfolio["cost_basis"] == 0.0
+        assert [position["symbol"] for position in portfolio["positions"]] == ["AAPL", "NOPE"]
+        assert math.isnan(portfolio["positions"][1]["weight"])
+
+    def test_empty_portfolio(self):
+        """Test that an empty portfolio is worth nothing."""
+        portfolio = value_portfolio([], {})
+        assert (portfolio["market_value"], portfolio["positions"]) == (0.0, [])
+
+
+class TestPortfolioEndpoint:
+    def test_portfolio(self, client, auth_headers, fake_upstream):
+        """Test valuing stored holdings at current snapshot prices."""
+        response = _holdings(client, auth_headers, [
+            {"symbol": "msft", "quantity": 2},
+            {"symbol": "AAPL", "quantity": 10, "cost_basis": 1000},
+        ])
+        assert response.status_code == 200
+        assert [holding["symbol"] for holding in response.json()["holdings"]] == ["MSFT", "AAPL"]
+
+        body = client.get("/portfolio", headers=auth_headers).json()
+        assert body["stale"] is False
+        assert body["market_value"] == pytest.approx(sum(p["market_value"] for p in body["positions"]))
+        assert sum(p["weight"] for p in body["positions"]) == pytest.approx(1.0)
+        assert {p["symbol"]: p["cost_basis"] for p in body["positions"]} == {"AAPL": 1000.0, "MSFT": None}
+        assert len(fake_upstream) == 1
+
+    def test_large_portfolio_is_one_query(self, client, auth_headers, local_massive):
+        """Test that 500 positions take one DB statement and one upstream call per chunk."""
+        from tests.conftest import async_engine
+
+        holdings = [{"symbol": f"T{i:04d}", "quantity": i + 1} for i in range(500)]
+        assert _holdings(client, auth_headers, holdings).status_code == 200
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            response = client.get("/portfolio", headers=auth_headers)
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+        body = response.json()
+        assert len(body["positions"]) == 500
+        assert all(position["price"] is not None for position in body["positions"])
+        assert len(statements) == 1
+        assert local_massive.multi_calls == 10
+
+    def test_replacing_holdings(self, client, auth_headers, db_session):
+        """Test that a new holdings list replaces the previous one."""
+        _holdings(client, auth_headers, [{"symbol": "AAPL", "quantity": 1}, {"symbol": "MSFT", "quantity": 1}])
+        _holdings(client, auth_headers, [{"symbol": "AMD", "quantity": 3}])
+        assert [h.symbol for h in db_session.query(models.Holding).all()] == ["AMD"]
+
+    def test_invalid_holdings(self, client, auth_headers):
+        """Test that unknown, duplicate or non-positive holdings are rejected."""
+        ticker_universe.replace(["AAPL"], source="test")
+        assert _holdings(client, auth_headers, [{"symbol": "NOPE", "quantity": 1}]).status_code == 404
+        duplicate = [{"symbol": "AAPL", "quantity": 1}, {"symbol": "aapl", "quantity": 2}]
+        assert _holdings(client, auth_headers, duplicate).status_code == 400
+        assert _holdings(client, auth_headers, [{"symbol": "AAPL", "quantity": 0}]).status_code == 422
+
+    def test_requires_auth(self, client):
+        """Test that the portfolio requires authentication."""
+        assert client.get("/portfolio").status_code == 401
+
+
+class TestWatchlists:
+    def test_watchlist_lifecycle(self, client, auth_headers):
+        """Test creating, listing, replacing and deleting watchlists."""
+        response = client.put("/watchlists/tech", headers=auth_headers, json={"symbols": ["aapl", "MSFT", "AAPL"]})
+        assert response.json() == {"name": "tech", "symbols": ["AAPL", "MSFT"]}
+        client.put("/watchlists/chips", headers=auth_headers, json={"symbols": ["AMD"]})
+        client.put("/watchlists/tech", headers=auth_headers, json={"symbols": ["AMZN"]})
+        assert client.get("/watchlists", headers=auth_headers).json() == [
+            {"name": "chips", "symbols": ["AMD"]},
+            {"name": "tech", "symbols": ["AMZN"]},
+        ]
+        assert client.delete("/watchlists/tech", headers=auth_headers).status_code == 204
+        assert client.delete("/watchlists/tech", headers=auth_headers).status_code == 404
+        assert [w["name"] for w in client.get("/watchlists", headers=auth_headers).json()] == ["chips"]
+
+    def test_unknown_symbol(self, client, auth_headers):
+        """Test that watchlists only accept known tickers."""
+        ticker_universe.replace(["AAPL"], source="test")
+        response = client.put("/watchlists/x", headers=auth_headers, json={"symbols": ["AAPL", "NOPE"]})
+        assert response.status_code == 404
+        assert "NOPE" in response.json()["detail"]
+
+    def test_account_deletion_removes_holdings_and_watchlists(self, client, auth_headers, db_session):
+        """Test that deleting the account deletes its holdings and watchlists."""
+        _holdings(client, auth_headers, [{"symbol": "AAPL", "quantity": 1}])
+        client.put("/watchlists/tech", headers=auth_headers, json={"symbols": ["AAPL"]})
+        assert client.delete("/users/me", headers=auth_headers).status_code == 204
+        assert db_session.query(models.Holding).count() == 0
+        assert db_session.query(models.Watchlist).count() == 0
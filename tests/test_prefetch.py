@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+
+from prefetch import HotSymbolPrefetcher, RequestBudget, SymbolCounter
+from quote_cache import QuoteCache
+
+
+class TestSymbolCounter:
+    def test_top_symbols(self):
+        """Test that the most requested symbols rank first."""
+        counter = SymbolCounter()
+        for symbol, count in [("AAPL", 5), ("MSFT", 3), ("GOOGL", 1)]:
+            for _ in range(count):
+                counter.record(symbol)
+        assert counter.top(2) == ["AAPL", "MSFT"]
+
+    def test_cold_symbols_are_forgotten(self):
+        """Test that aging drops symbols nobody asks for anymore."""
+        counter = SymbolCounter(decay=0.1)
+        counter.record("AAPL")
+        counter.age()
+        counter.age()
+        assert counter.top(5) == []
+
+
+class TestHotSymbolPrefetcher:
+    def _prefetcher(self, budget_per_minute, top_n=4, chunk_size=2):
+        calls = []
+
+        async def fetch_many(symbols):
+            calls.append(list(symbols))
+            return {symbol: {"symbol": symbol} for symbol in symbols}
+
+        counter = SymbolCounter()
+        for weight, symbol in enumerate(["E", "D", "C", "B", "A"], start=1):
+            counter.record(symbol, weight)
+        prefetcher = HotSymbolPrefetcher(
+            QuoteCache(ttl=60, max_size=10), counter, fetch_many,
+            chunk_size=chunk_size, top_n=top_n, budget_per_minute=budget_per_minute
+        )
+        return prefetcher, calls
+
+    def test_refresh_warms_top_symbols(self):
+        """Test that the top-N symbols land in the cache."""
+        prefetcher, calls = self._prefetcher(budget_per_minute=60)
+        asyncio.run(prefetcher.refresh_once())
+        assert calls == [["A", "B"], ["C", "D"]]
+        assert asyncio.run(prefetcher.cache.get("A")) is not None
+        assert asyncio.run(prefetcher.cache.get("E")) is None
+
+    def test_refresh_respects_budget(self):
+        """Test that prefetching never exceeds its upstream request budget."""
+        prefetcher, calls = self._prefetcher(budget_per_minute=1)
+        asyncio.run(prefetcher.refresh_once())
+        asyncio.run(prefetcher.refresh_once())
+        assert calls == [["A", "B"]]
+        assert prefetcher.upstream_requests == 1
+
+    def test_budget_refills_over_time(self):
+        """Test that the request budget is a token bucket."""
+        budget = RequestBudget(per_minute=60)
+        assert budget.take(100) == 60
+        budget._updated -= 2
+        assert budget.take(100) == 2
+
+
+class TestPrefetchTracking:
+    def test_lookups_are_counted(self, client, auth_headers, fake_upstream):
+        """Test that found quote lookups feed the hot-symbol counter."""
+        from main import hot_symbols
+
+        for symbol in ["AAPL", "AAPL", "MSFT", "INVALID"]:
+            client.post("/stock-quote", headers=auth_headers, json={"symbol": symbol})
+        assert hot_symbols.top(5) == ["AAPL", "MSFT"]
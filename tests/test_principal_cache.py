@@ -0,0 +1,93 @@
+import asyncio
+import time
+import pytest
+
+from bench.fake_redis import FakeRedis
+from cache_backends import MemoryBackend, RedisBackend, RedisClient
+from principal_cache import Principal, PrincipalCache
+
+
+class TestPrincipalCache:
+    def test_entry_expires_with_token(self):
+        """Test that an entry never outlives the token's exp claim."""
+        cache = PrincipalCache(ttl=60, max_size=10)
+        cache.put("token", Principal(id=1, email="a@example.com"), token_exp=time.time() - 1)
+        assert asyncio.run(cache.get("token")) is None
+
+    def test_invalidate_user(self):
+        """Test that all tokens for a user are dropped."""
+        cache = PrincipalCache(ttl=60, max_size=10)
+        cache.put("t1", Principal(id=1, email="a@example.com"))
+        cache.put("t2", Principal(id=1, email="a@example.com"))
+        cache.put("t3", Principal(id=2, email="b@example.com"))
+        cache.invalidate_user(1)
+        assert asyncio.run(cache.get("t1")) is None
+        assert asyncio.run(cache.get("t2")) is None
+        assert asyncio.run(cache.get("t3")) is not None
+
+    def test_bounded_size(self):
+        """Test that the oldest entries are evicted."""
+        cache = PrincipalCache(ttl=60, max_size=2)
+        for i in range(3):
+            cache.put(f"t{i}", Principal(id=i, email=f"{i}@example.com"))
+        assert asyncio.run(cache.get("t0")) is None
+        assert asyncio.run(cache.get("t2")) is not None
+
+    def test_revocation_reaches_other_workers(self):
+        """Test that revoking a user on one worker evicts its tokens on another sharing the backend."""
+        async def run():
+            fake = FakeRedis()
+            port = await fake.start()
+            try:
+                url = f"redis://127.0.0.1:{port}/0"
+                workers = [PrincipalCache(ttl=60, backend=RedisBackend(RedisClient(url))) for _ in range(2)]
+                for worker in workers:
+                    worker.put("t1", Principal(id=1, email="a@example.com"))
+                    worker.put("t2", Principal(id=2, email="b@example.com"))
+                await workers[0].revoke_user(1)
+                return await workers[1].get("t1"), await workers[1].get("t2")
+            finally:
+                await fake.stop()
+
+        revoked, other = asyncio.run(run())
+        assert revoked is None
+        assert other is not None
+
+    def test_revocation_is_local_without_shared_backend(self):
+        """Test that a per-process backend only evicts tokens in the revoking worker."""
+        cache = PrincipalCache(ttl=60, backend=MemoryBackend(10))
+        cache.put("t1", Principal(id=1, email="a@example.com"))
+        asyncio.run(cache.revoke_user(1))
+        assert asyncio.run(cache.get("t1")) is None
+
+
+class TestCachedAuthentication:
+    def test_token_carries_user_id(self, client, auth_headers, test_user):
+        """Test that issued tokens include the user id claim."""
+        import jwt
+        from main import SECRET_KEY, ALGORITHM
+
+        token = auth_headers["Authorization"].split()[1]
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        assert payload["uid"] == test_user.id
+        assert payload["sub"] == test_user.email
+
+    def test_cached_token_skips_database(self, client, auth_headers, test_user, monkeypatch):
+        """Test that a cached token resolves without loading the user."""
+        import main
+
+        assert client.get("/users/me", headers=auth_headers).status_code == 200
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("user lookup should be cached")
+
+        monkeypatch.setattr(main, "load_principal", fail)
+        response = client.get("/users/me", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["email"] == test_user.email
+
+    def test_delete_invalidates_cached_token(self, client, auth_headers):
+        """Test that deleting the account evicts its cached tokens."""
+        assert client.get("/users/me", headers=auth_headers).status_code == 200
+        assert client.delete("/users/me", headers=auth_headers).status_code == 204
+        assert client.get("/users/me", headers=auth_headers).status_code == 401
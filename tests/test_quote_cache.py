@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+
+from quote_cache import QuoteCache
+
+
+class TestQuoteCache:
+    def test_concurrent_misses_share_one_fetch(self):
+        """Test that concurrent misses for one symbol coalesce."""
+        cache = QuoteCache(ttl=60, max_size=10)
+        calls = []
+
+        async def loader(symbol):
+            calls.append(symbol)
+            await asyncio.sleep(0.01)
+            return {"symbol": symbol}
+
+        async def run():
+            return await asyncio.gather(
+                *(cache.get_or_fetch("AAPL", loader) for _ in range(20))
+            )
+
+        results = asyncio.run(run())
+        assert calls == ["AAPL"]
+        assert all(result == {"symbol": "AAPL"} for result in results)
+        assert cache.stats()["coalesced"] == 19
+
+    def test_hit_after_fetch(self):
+        """Test that a fetched snapshot is served from cache."""
+        cache = QuoteCache(ttl=60, max_size=10)
+
+        async def loader(symbol):
+            return {"symbol": symbol}
+
+        async def run():
+            await cache.get_or_fetch("AAPL", loader)
+            await cache.get_or_fetch("AAPL", loader)
+
+        asyncio.run(run())
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_expired_entries_are_refetched(self):
+        """Test that entries past their TTL are not served."""
+        cache = QuoteCache(ttl=0, max_size=10)
+
+        async def run():
+            await cache.put("AAPL", {"symbol": "AAPL"})
+            return await cache.get("AAPL")
+
+        assert asyncio.run(run()) is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used symbol is evicted."""
+        cache = QuoteCache(ttl=60, max_size=2)
+
+        async def run():
+            await cache.put("AAPL", {})
+            await cache.put("MSFT", {})
+            await cache.get("AAPL")
+            await cache.put("GOOGL", {})
+            return await cache.get("MSFT"), await cache.get("AAPL")
+
+        msft, aapl = asyncio.run(run())
+        assert msft is None
+        assert aapl is not None
+
+    def test_not_found_is_cached_briefly(self):
+        """Test that missing tickers are remembered for the negative TTL only."""
+        calls = []
+
+        async def loader(symbol):
+            calls.append(symbol)
+            return None
+
+        async def lookup_twice(cache):
+            await cache.get_or_fetch("INVALID", loader)
+            return await cache.get_or_fetch("INVALID", loader)
+
+        cache = QuoteCache(ttl=60, max_size=10, negative_ttl=60)
+        assert asyncio.run(lookup_twice(cache)) is None
+        assert calls == ["INVALID"]
+        assert cache.stats()["negative_hits"] == 1
+
+        cache = QuoteCache(ttl=60, max_size=10, negative_ttl=0)
+        asyncio.run(lookup_twice(cache))
+        assert calls == ["INVALID"] * 3
+
+
+class TestQuoteCacheEndpoint:
+    def test_repeat_lookups_hit_cache(self, client, auth_headers, test_user, db_session, fake_upstream):
+        """Test that repeat lookups skip upstream but still record history."""
+        import models
+
+        for _ in range(3):
+            response = client.post(
+                "/stock-quote",
+                headers=auth_headers,
+                json={"symbol": "AAPL"}
+            )
+            assert response.status_code == 200
+
+        assert len(fake_upstream) == 1
+        quotes = db_session.query(models.StockQuote).filter(
+            models.StockQuote.user_id == test_user.id
+        ).all()
+        assert len(quotes) == 3
+
+        stats = client.get("/stats/quote-cache").json()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+
+START = datetime(2024, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def seeded(db_session, test_user):
+    rows = [
+        ("AAPL", 100.0, 1.0, 0),
+        ("AAPL", 110.0, 2.0, 60),
+        ("AAPL", 120.0, -0.5, 120),
+        ("MSFT", 400.0, 0.25, 30),
+    ]
+    db_session.add_all(
+        models.StockQuote(
+            user_id=test_user.id,
+            symbol=symbol,
+            price=price,
+            change_percent=change_percent,
+            created_at=START + timedelta(seconds=offset),
+        )
+        for symbol, price, change_percent, offset in rows
+    )
+    db_session.commit()
+
+
+class TestQuoteStats:
+    def test_per_symbol_aggregates(self, client, auth_headers, seeded):
+        """Test counts, first/last seen, price range, mean and latest change percent."""
+        response = client.get("/stock-quotes/stats", headers=auth_headers)
+        assert response.status_code == 200
+        aapl, msft = response.json()["symbols"]
+        assert aapl["symbol"] == "AAPL"
+        assert aapl["count"] == 3
+        assert aapl["first_seen"].startswith("2024-03-01T12:00:00")
+        assert aapl["last_seen"].startswith("2024-03-01T12:02:00")
+        assert (aapl["min_price"], aapl["max_price"]) == (100.0, 120.0)
+        assert aapl["mean_price"] == pytest.approx(110.0)
+        assert aapl["latest_change_percent"] == -0.5
+        assert msft["count"] == 1
+        assert msft["latest_change_percent"] == 0.25
+
+    def test_time_window(self, client, auth_headers, seeded):
+        """Test that since/until restrict the rows that are aggregated."""
+        response = client.get(
+            "/stock-quotes/stats",
+            headers=auth_headers,
+            params={"since": "2024-03-01T12:00:30", "until": "2024-03-01T12:02:00"},
+        )
+        symbols = {item["symbol"]: item for item in response.json()["symbols"]}
+        assert symbols["AAPL"]["count"] == 1
+        assert symbols["AAPL"]["latest_change_percent"] == 2.0
+        assert symbols["MSFT"]["count"] == 1
+
+    def test_invalid_window(self, client, auth_headers):
+        """Test that an empty window is rejected."""
+        response = client.get(
+            "/stock-quotes/stats",
+            headers=auth_headers,
+            params={"since": "2024-03-02T00:00:00", "until": "2024-03-01T00:00:00"},
+        )
+        assert response.status_code == 400
+
+    def test_single_query_and_own_quotes_only(self, client, db_session, seeded):
+        """Test that stats are one SQL statement and ignore other users' quotes."""
+        from sqlalchemy import event
+        from main import get_password_hash
+        from tests.conftest import async_engine
+
+        other = models.User(email="stats-other@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(other)
+        db_session.commit()
+        token = client.post(
+            "/token", data={"username": "stats-other@example.com", "password": "password123"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        client.get("/users/me", headers=headers)
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+        try:
+            response = client.get("/stock-quotes/stats", headers=headers)
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+        assert response.json()["symbols"] == []
+        assert len([s for s in statements if "stock_quotes" in s]) == 1
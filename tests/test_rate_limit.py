@@ -0,0 +1,189 @@
+import asyncio
+
+import pytest
+
+import upstream
+from bench.fake_redis import FakeRedis
+from cache_backends import RedisBackend, RedisClient
+from rate_limit import (
+    BACKGROUND, INTERACTIVE, RateLimited, TokenBucket, UpstreamBudgetExhausted,
+    UpstreamScheduler, UserRateLimiter, background_priority, current_priority,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    def test_take_and_refill(self):
+        """Test that the bucket empties and refills at its rate."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+        assert bucket.take() and bucket.take()
+        assert not bucket.take()
+        assert bucket.wait_time() == pytest.approx(1.0)
+        clock.now = 1.0
+        assert bucket.take()
+
+
+class TestUserRateLimiter:
+    def test_limits_each_user_separately(self):
+        """Test that one user's burst does not limit another user."""
+        limiter = UserRateLimiter(per_minute=60, burst=2, clock=FakeClock())
+        asyncio.run(limiter.check(1))
+        asyncio.run(limiter.check(1))
+        with pytest.raises(RateLimited) as exc:
+            asyncio.run(limiter.check(1))
+        assert exc.value.retry_after == pytest.approx(1.0)
+        asyncio.run(limiter.check(2))
+
+    def test_tracked_users_are_bounded(self):
+        """Test that the least recently seen users are forgotten."""
+        limiter = UserRateLimiter(per_minute=60, burst=1, max_tracked=2, clock=FakeClock())
+        for user_id in (1, 2, 3):
+            asyncio.run(limiter.check(user_id))
+        assert limiter.stats()["tracked_users"] == 2
+        asyncio.run(limiter.check(1))
+
+
+class TestUpstreamScheduler:
+    def test_background_keeps_reserve_for_interactive(self):
+        """Test that background calls cannot dip into the interactive reserve."""
+        scheduler = UpstreamScheduler(per_minute=60, burst=5, background_reserve=0.4, clock=FakeClock())
+
+        async def run():
+            granted = 0
+            for _ in range(5):
+                try:
+                    await scheduler.acquire(BACKGROUND)
+                    granted += 1
+                except UpstreamBudgetExhausted:
+                    pass
+            await scheduler.acquire(INTERACTIVE)
+            await scheduler.acquire(INTERACTIVE)
+            return granted
+
+        assert asyncio.run(run()) == 3
+        assert scheduler.stats()["rejected"][BACKGROUND] == 2
+
+    def test_interactive_waits_for_a_token(self):
+        """Test that interactive calls queue briefly, and background calls yield to them."""
+        scheduler = UpstreamScheduler(per_minute=600, burst=1, queue_timeout=1)
+
+        async def run():
+            await scheduler.acquire(INTERACTIVE)
+            waiter = asyncio.ensure_future(scheduler.acquire(INTERACTIVE))
+            await asyncio.sleep(0)
+            with pytest.raises(UpstreamBudgetExhausted):
+                await scheduler.acquire(BACKGROUND)
+            await waiter
+
+        asyncio.run(run())
+        assert scheduler.stats()["granted"][INTERACTIVE] == 2
+
+    def test_interactive_gives_up_after_queue_timeout(self):
+        """Test that an exhausted budget fails fast with a retry hint."""
+        scheduler = UpstreamScheduler(per_minute=1, burst=1, queue_timeout=0.1)
+
+        async def run():
+            await scheduler.acquire(INTERACTIVE)
+            await scheduler.acquire(INTERACTIVE)
+
+        with pytest.raises(UpstreamBudgetExhausted) as exc:
+            asyncio.run(run())
+        assert exc.value.retry_after > 50
+
+    def test_background_priority_context(self):
+        """Test that the priority follows the calling context."""
+        assert current_priority() == INTERACTIVE
+        with background_priority():
+            assert current_priority() == BACKGROUND
+        assert current_priority() == INTERACTIVE
+
+
+class TestSharedBudgets:
+    def test_workers_share_user_limits_and_budget(self):
+        """Test that workers sharing a backend spend one per-user limit and one upstream budget."""
+        async def run():
+            fake = FakeRedis()
+            port = await fake.start()
+            try:
+                backends = [RedisBackend(RedisClient(f"redis://127.0.0.1:{port}/0")) for _ in range(2)]
+                limiters = [UserRateLimiter(per_minute=1, burst=2, backend=backend) for backend in backends]
+                await limiters[0].check(1)
+                await limiters[1].check(1)
+                with pytest.raises(RateLimited) as exc:
+                    await limiters[0].check(1)
+                await limiters[1].check(2)
+
+                schedulers = [
+                    UpstreamScheduler(per_minute=1, burst=2, queue_timeout=0, backend=backend)
+                    for backend in backends
+                ]
+                await schedulers[0].acquire(INTERACTIVE)
+                await schedulers[1].acquire(INTERACTIVE)
+                with pytest.raises(UpstreamBudgetExhausted):
+                    await schedulers[0].acquire(INTERACTIVE)
+                await schedulers[1].release_unused()
+                await schedulers[0].acquire(INTERACTIVE)
+                return exc.value.retry_after, schedulers[0].stats()
+            finally:
+                await fake.stop()
+
+        retry_after, stats = asyncio.run(run())
+        assert retry_after == pytest.approx(60, rel=0.01)
+        assert stats["shared"] is True
+        assert stats["granted"][INTERACTIVE] == 2
+        assert stats["rejected"][INTERACTIVE] == 1
+
+    def test_unreachable_backend_falls_back_to_local_buckets(self):
+        """Test that a failing shared backend leaves limiting to each worker."""
+        backend = RedisBackend(RedisClient("redis://127.0.0.1:1/0", timeout=0.2))
+        limiter = UserRateLimiter(per_minute=60, burst=1, clock=FakeClock(), backend=backend)
+        asyncio.run(limiter.check(1))
+        with pytest.raises(RateLimited):
+            asyncio.run(limiter.check(1))
+        assert limiter.stats()["backend_errors"] == 2
+
+
+class TestRateLimitEndpoints:
+    def test_user_over_limit_gets_429(self, client, auth_headers, fake_upstream, monkeypatch):
+        """Test that a user past their burst gets 429 with Retry-After."""
+        from rate_limit import user_limiter
+
+        monkeypatch.setattr(user_limiter, "burst", 2)
+        for _ in range(2):
+            response = client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+            assert response.status_code == 200
+        response = client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+    def test_exhausted_budget_serves_stale_or_503(self, client, auth_headers, fake_upstream, monkeypatch):
+        """Test that a spent upstream budget falls back to stale quotes, else 503."""
+        from quote_cache import quote_cache
+
+        monkeypatch.setattr(quote_cache, "ttl", 0)
+        monkeypatch.setattr(
+            upstream, "upstream_scheduler", UpstreamScheduler(per_minute=1, burst=1, queue_timeout=0)
+        )
+        assert client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"}).status_code == 200
+
+        response = client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+        assert response.status_code == 200
+        assert response.headers["X-Quote-Stale"] == "true"
+
+        response = client.post("/stock-quote", headers=auth_headers, json={"symbol": "MSFT"})
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+        assert len(fake_upstream) == 1
+
+    def test_rate_limit_stats(self, client):
+        """Test that budget and limiter counters are exposed."""
+        body = client.get("/stats/rate-limit").json()
+        assert set(body) == {"upstream", "users"}
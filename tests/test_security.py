@@ -7,20 +7,20 @@ from main import SECRET_KEY, ALGORITHM
 class TestPasswordSecurity:
     def test_passwords_are_hashed(self, client, db_session):
         """Test that passwords are hashed in database."""
-        from main import get_user_by_email
+        import models
         
         email = "test@example.com"
         password = "testpassword123"
         
         client.post("/signup", json={"email": email, "password": password})
         
-        user = get_user_by_email(db_session, email)
+        user = db_session.query(models.User).filter_by(email=email).first()
         assert user.hashed_password != password
         assert len(user.hashed_password) > 50  # Hashed passwords are long
 
     def test_different_passwords_different_hashes(self, client, db_session):
         """Test that same password for different users has different hashes."""
-        from main import get_user_by_email
+        import models
         
         email1 = "user1@example.com"
         email2 = "user2@example.com"
@@ -29,8 +29,8 @@ class TestPasswordSecurity:
         client.post("/signup", json={"email": email1, "password": password})
         client.post("/signup", json={"email": email2, "password": password})
         
-        user1 = get_user_by_email(db_session, email1)
-        user2 = get_user_by_email(db_session, email2)
+        user1 = db_session.query(models.User).filter_by(email=email1).first()
+        user2 = db_session.query(models.User).filter_by(email=email2).first()
         
         # Even same passwords should have different hashes due to salt
         assert user1.hashed_password != user2.hashed_password
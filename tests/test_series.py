@@ -0,0 +1,187 @@
+import asyncio
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from series import DAY_MS, SeriesCache, day_start_ms, downsample, lttb_indices, minmax_indices, series_cache
+from tickers import ticker_universe
+
+
+def _series(client, headers, symbol="AAPL", **params):
+    return client.get(f"/stock-quotes/{symbol}/series", headers=headers, params=params)
+
+
+class TestDownsampling:
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        """Test that LTTB returns n points, including both ends and an outlier."""
+        x = np.arange(1000, dtype=float)
+        y = np.sin(x / 50)
+        y[400] = 10.0
+        picked = lttb_indices(x, y, 50)
+        assert len(picked) == 50
+        assert picked[0] == 0 and picked[-1] == 999
+        assert 400 in picked
+        assert np.all(np.diff(picked) > 0)
+
+    def test_minmax_keeps_bucket_extremes(self):
+        """Test that min/max bucketing keeps the global extremes in time order."""
+        y = np.random.default_rng(0).normal(size=5000)
+        picked = minmax_indices(y, 100)
+        assert len(picked) <= 100
+        assert {int(np.argmin(y)), int(np.argmax(y)), 0, 4999} <= set(picked.tolist())
+        assert np.all(np.diff(picked) > 0)
+
+    @pytest.mark.parametrize("method", ["lttb", "minmax"])
+    @pytest.mark.parametrize("points", [2, 3, 4, 5, 7])
+    def test_small_point_budgets_keep_endpoints(self, method, points):
+        """Test that tiny point budgets still keep both ends, in order, within budget."""
+        rng = np.random.default_rng(points)
+        for size in (points + 1, points + 2, 50, 1000):
+            bars = np.column_stack([np.arange(size, dtype=float)] + [rng.normal(size=size)] * 5)
+            picked = downsample(bars, points, method)[:, 0]
+            assert len(picked) <= points
+            assert picked[0] == 0 and picked[-1] == size - 1
+            assert np.all(np.diff(picked) > 0)
+
+    def test_short_series_is_untouched(self):
+        """Test that series shorter than the point budget are returned whole."""
+        bars = np.ones((10, 6))
+        assert downsample(bars, 20) is bars
+        assert len(lttb_indices(np.arange(3.0), np.arange(3.0), 2)) == 2
+
+
+class TestSeriesCache:
+    def test_settled_days_are_fetched_once(self):
+        """Test that runs of missing settled days cost one fetch and are then cached."""
+        calls = []
+
+        async def loader(symbol, timespan, start_ms, end_ms):
+            calls.append((start_ms, end_ms))
+            return [
+                {"t": t, "o": 1, "h": 1, "l": 1, "c": 1, "v": 1}
+                for t in range(start_ms, end_ms, 3_600_000)
+            ]
+
+        cache = SeriesCache()
+        first, last = date(2024, 3, 1), date(2024, 3, 4)
+        bars = asyncio.run(cache.get_bars("AAPL", "hour", first, last, loader))
+        assert len(bars) == 4 * 24
+        assert calls == [(day_start_ms(first), day_start_ms(last) + DAY_MS - 1)]
+
+        # A wider range only fetches the days it adds
+        bars = asyncio.run(cache.get_bars("AAPL", "hour", first, last + timedelta(days=1), loader))
+        assert len(bars) == 5 * 24
+        assert calls[1][0] == day_start_ms(last + timedelta(days=1))
+        assert cache.stats()["days_fetched"] == 5
+
+    def test_live_day_fetches_from_last_bar(self):
+        """Test that the current day is refreshed from its last bar onwards."""
+        calls = []
+        now_ms = int(time.time() * 1000)
+
+        async def loader(symbol, timespan, start_ms, end_ms):
+            calls.append(start_ms)
+            return [{"t": t, "o": 1, "h": 1, "l": 1, "c": 1, "v": 1} for t in range(start_ms, now_ms, 60_000)]
+
+        cache = SeriesCache(live_ttl=0)
+        today = date.fromordinal(now_ms // DAY_MS + date(1970, 1, 1).toordinal())
+        first = asyncio.run(cache.get_bars("AAPL", "minute", today, today, loader))
+        second = asyncio.run(cache.get_bars("AAPL", "minute", today, today, loader))
+        assert calls[0] == day_start_ms(today)
+        assert calls[1] == int(first[-1, 0])
+        assert len(second) == len(first)
+        assert cache.stats()["incremental_fetches"] == 2
+
+    def test_loads_of_one_symbol_never_overlap(self):
+        """Test that a request arriving while others wait still queues behind them."""
+        active, overlaps = [], []
+
+        async def loader(symbol, timespan, start_ms, end_ms):
+            active.append(1)
+            overlaps.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+            return []
+
+        async def run():
+            cache = SeriesCache(live_ttl=0)
+            today = date.fromordinal(int(time.time() * 1000) // DAY_MS + date(1970, 1, 1).toordinal())
+
+            def get():
+                return cache.get_bars("AAPL", "minute", today, today, loader)
+
+            waiting = [asyncio.ensure_future(get()) for _ in range(3)]
+            await waiting[0]
+            # The others still wait for the lock the first one released
+            await asyncio.gather(get(), *waiting[1:])
+            return cache
+
+        cache = asyncio.run(run())
+        assert max(overlaps) == 1
+        assert cache._locks == {}
+
+    def test_eviction_bounds_memory(self):
+        """Test that least recently used days are evicted beyond max_bytes."""
+        async def loader(symbol, timespan, start_ms, end_ms):
+            return [{"t": start_ms, "o": 1, "h": 1, "l": 1, "c": 1, "v": 1}]
+
+        cache = SeriesCache(max_bytes=48 * 2)
+        for symbol in ("AAPL", "MSFT", "AMD"):
+            asyncio.run(cache.get_bars(symbol, "day", date(2024, 3, 1), date(2024, 3, 1), loader))
+        assert cache.stats()["days"] == 2
+        assert cache.stats()["bytes"] <= 96
+
+
+class TestSeriesEndpoint:
+    def test_series(self, client, auth_headers, local_massive):
+        """Test that past minute bars are downsampled to the requested point count."""
+        response = _series(client, auth_headers, **{"from": "2024-03-01", "to": "2024-03-02", "points": 200})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["symbol"] == "AAPL"
+        assert (body["from"], body["to"], body["method"]) == ("2024-03-01", "2024-03-02", "lttb")
+        assert body["bars"] == 2 * 1440
+        assert len(body["t"]) == len(body["c"]) == 200
+        assert body["t"] == sorted(body["t"])
+        assert local_massive.aggs_calls == 1
+
+    def test_completed_days_are_cached(self, client, auth_headers, local_massive):
+        """Test that repeated charts of past days make no further upstream calls."""
+        params = {"from": "2024-03-01", "to": "2024-03-05", "timespan": "hour", "method": "minmax"}
+        first = _series(client, auth_headers, **params).json()
+        second = _series(client, auth_headers, **params).json()
+        assert first == second
+        assert local_massive.aggs_calls == 1
+        assert client.get("/stats/series").json()["hits"] == 5
+
+    def test_today_is_fetched_incrementally(self, client, auth_headers, local_massive, monkeypatch):
+        """Test that refreshing today's chart only asks for bars since the last one."""
+        monkeypatch.setattr(series_cache, "live_ttl", 0)
+        first = _series(client, auth_headers, points=5000).json()
+        _series(client, auth_headers, points=5000)
+        assert local_massive.aggs_calls == 2
+        _, _, start_ms, _ = local_massive.aggs_ranges[1]
+        if first["t"]:
+            assert start_ms == first["t"][-1]
+
+    def test_unknown_symbol(self, client, auth_headers, local_massive):
+        """Test that symbols outside the universe are a 404 without an upstream call."""
+        ticker_universe.replace(["AAPL"], source="test")
+        assert _series(client, auth_headers, symbol="NOPE").status_code == 404
+        assert local_massive.aggs_calls == 0
+
+    @pytest.mark.parametrize("params", [
+        {"from": "2024-03-05", "to": "2024-03-01"},
+        {"from": "2024-01-01", "to": "2024-03-01"},
+        {"timespan": "second"},
+        {"points": 1},
+    ])
+    def test_invalid_ranges(self, client, auth_headers, params):
+        """Test that reversed, oversized or malformed requests are rejected."""
+        assert _series(client, auth_headers, **params).status_code in (400, 422)
+
+    def test_requires_auth(self, client):
+        """Test that charts require authentication."""
+        assert client.get("/stock-quotes/AAPL/series").status_code == 401
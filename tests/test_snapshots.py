@@ -0,0 +1,200 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import models
+from snapshots import SnapshotStore, prices_hash, snapshot_time
+
+
+@pytest.fixture
+def second_user_headers(client, db_session):
+    """Auth headers for a second user."""
+    from main import get_password_hash
+
+    db_session.add(models.User(email="second@example.com", hashed_password=get_password_hash("password123")))
+    db_session.commit()
+    token = client.post(
+        "/token", data={"username": "second@example.com", "password": "password123"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TestSnapshotTime:
+    def test_uses_upstream_timestamp(self):
+        """Test that the upstream's nanosecond update time keys the snapshot."""
+        as_of = snapshot_time({"updated": 1_700_000_000_500_000_000})
+        assert as_of == datetime(2023, 11, 14, 22, 13, 20, 500000, tzinfo=timezone.utc)
+
+    def test_buckets_snapshots_without_timestamp(self):
+        """Test that snapshots without an update time share a window bucket."""
+        as_of = snapshot_time({}, window=60)
+        assert as_of.second == 0 and as_of.microsecond == 0
+
+    def test_prices_hash(self):
+        """Test that the prices hash is stable, fits a signed BIGINT and tells prices apart."""
+        first = prices_hash({"price": 150.0, "change": 1.0, "change_percent": 0.5})
+        assert first == prices_hash({"price": 150.0, "change": 1.0, "change_percent": 0.5})
+        assert first != prices_hash({"price": 151.0, "change": 2.0, "change_percent": 1.0})
+        assert -2 ** 63 <= first < 2 ** 63
+
+
+class TestSharedSnapshots:
+    def test_users_share_one_snapshot(self, client, auth_headers, second_user_headers, db_session):
+        """Test that lookups of the same snapshot store its prices once."""
+        for headers in (auth_headers, second_user_headers, auth_headers):
+            response = client.post("/stock-quote", headers=headers, json={"symbol": "AAPL"})
+            assert response.status_code == 200
+            assert response.json()["price"] > 0
+
+        snapshots = db_session.query(models.QuoteSnapshot).all()
+        quotes = db_session.query(models.StockQuote).all()
+        assert len(snapshots) == 1
+        assert len(quotes) == 3
+        assert {quote.snapshot_id for quote in quotes} == {snapshots[0].id}
+        assert all(quote.price is None for quote in quotes)
+
+    def test_history_reads_snapshot_prices(self, client, auth_headers, test_user, db_session):
+        """Test that history keeps its shape for snapshot-backed and older rows."""
+        db_session.add(models.StockQuote(
+            user_id=test_user.id, symbol="MSFT", price=400.0, change=1.0, change_percent=0.25,
+            created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        ))
+        db_session.commit()
+        quote = client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"}).json()
+
+        history = client.get("/stock-quotes/history", headers=auth_headers).json()
+        assert history[0] == quote
+        assert history[1]["symbol"] == "MSFT"
+        assert history[1]["price"] == 400.0
+        assert set(history[0]) == set(history[1])
+
+    def test_batch_reuses_snapshots(self, client, auth_headers, db_session):
+        """Test that a repeated batch adds history rows but no new snapshots."""
+        body = {"symbols": ["AAPL", "MSFT"]}
+        first = client.post("/stock-quotes/batch", headers=auth_headers, json=body).json()
+        second = client.post("/stock-quotes/batch", headers=auth_headers, json=body).json()
+        assert [item["quote"]["price"] for item in first["results"]] == [
+            item["quote"]["price"] for item in second["results"]
+        ]
+        assert db_session.query(models.QuoteSnapshot).count() == 2
+        assert db_session.query(models.StockQuote).count() == 4
+
+    def test_new_snapshots_share_the_lookup_commit(self, client, auth_headers):
+        """Test that storing new snapshots adds no commit of its own without write-behind."""
+        from snapshots import snapshot_store
+        from tests.conftest import async_engine
+
+        commits = []
+
+        def record(conn):
+            commits.append(conn)
+
+        event.listen(async_engine.sync_engine, "commit", record)
+        try:
+            response = client.post("/stock-quotes/batch", headers=auth_headers, json={"symbols": ["AAPL", "MSFT"]})
+        finally:
+            event.remove(async_engine.sync_engine, "commit", record)
+        assert response.status_code == 200
+        assert len(commits) == 1
+        assert snapshot_store.stats()["remembered"] == 2
+
+    def test_rolled_back_snapshots_are_not_remembered(self, async_session_factory, db_session):
+        """Test that ids of snapshots whose transaction rolled back are not reused."""
+        ticker = {"min": {"c": 150.0}, "todaysChange": 1.0, "todaysChangePerc": 0.5, "updated": 10 ** 18}
+        store = SnapshotStore()
+
+        async def resolve_and_roll_back():
+            async with async_session_factory() as db:
+                await store.resolve(db, {"AAPL": ticker})
+                await db.rollback()
+
+        asyncio.run(resolve_and_roll_back())
+        assert store.stats()["remembered"] == 0
+
+    def test_snapshot_stored_by_another_worker(self, async_session_factory, db_session):
+        """Test that a snapshot another process stored is found, not duplicated."""
+        ticker = {"min": {"c": 150.0}, "todaysChange": 1.0, "todaysChangePerc": 0.5, "updated": 10 ** 18}
+
+        async def resolve_in_fresh_store():
+            async with async_session_factory() as db:
+                ids = await SnapshotStore().resolve(db, {"AAPL": ticker})
+                await db.commit()
+                return ids
+
+        first = asyncio.run(resolve_in_fresh_store())
+        second = asyncio.run(resolve_in_fresh_store())
+        assert first == second
+        assert db_session.query(models.QuoteSnapshot).count() == 1
+
+    def test_untimed_snapshots_with_different_prices(self, async_session_factory, db_session, monkeypatch):
+        """Test that workers seeing different prices in one window do not share a row."""
+        monkeypatch.setattr("snapshots.time.time", lambda: 1_700_000_000.0)
+        tickers = [
+            {"min": {"c": price}, "todaysChange": price - 149, "todaysChangePerc": 0.5}
+            for price in (150.0, 151.0, 150.0)
+        ]
+
+        async def resolve_in_fresh_store(ticker):
+            async with async_session_factory() as db:
+                ids = await SnapshotStore().resolve(db, {"AAPL": ticker})
+                await db.commit()
+                return ids["AAPL"]
+
+        ids = [asyncio.run(resolve_in_fresh_store(ticker)) for ticker in tickers]
+        assert ids[0] == ids[2] != ids[1]
+        rows = {row.id: row for row in db_session.query(models.QuoteSnapshot)}
+        assert [rows[snapshot_id].price for snapshot_id in ids] == [150.0, 151.0, 150.0]
+        # Both rows keep the real bucket time
+        assert len({row.as_of for row in rows.values()}) == 1
+
+
+class TestSnapshotSchemaUpgrade:
+    def test_adds_snapshot_column(self, tmp_path):
+        """Test that bootstrapping a pre-snapshot schema adds stock_quotes.snapshot_id."""
+        from bootstrap import create_schema
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql(
+                    "CREATE TABLE stock_quotes (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL,"
+                    " symbol VARCHAR NOT NULL, price FLOAT, change FLOAT, change_percent FLOAT,"
+                    " created_at DATETIME)"
+                )
+            await create_schema(engine)
+            async with engine.connect() as conn:
+                return await conn.run_sync(
+                    lambda sync_conn: [column["name"] for column in inspect(sync_conn).get_columns("stock_quotes")]
+                )
+
+        try:
+            columns = asyncio.run(run())
+        finally:
+            asyncio.run(engine.dispose())
+        assert "snapshot_id" in columns
+
+    def test_old_snapshot_key_needs_recreating_on_sqlite(self, tmp_path):
+        """Test that a quote_snapshots table without prices_hash is reported on SQLite."""
+        from bootstrap import create_schema
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql(
+                    "CREATE TABLE quote_snapshots (id INTEGER PRIMARY KEY, symbol VARCHAR NOT NULL,"
+                    " as_of DATETIME NOT NULL, price FLOAT NOT NULL, change FLOAT, change_percent FLOAT,"
+                    " CONSTRAINT uq_quote_snapshots_symbol_as_of UNIQUE (symbol, as_of))"
+                )
+            await create_schema(engine)
+
+        try:
+            with pytest.raises(RuntimeError, match="prices_hash"):
+                asyncio.run(run())
+        finally:
+            asyncio.run(engine.dispose())
+
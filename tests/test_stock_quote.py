@@ -159,4 +159,85 @@ class TestStockQuoteHistory:
         data = response.json()
         
         assert len(data) == 1
-        assert data[0]["symbol"] == "AAPL"
\ No newline at end of file
+        assert data[0]["symbol"] == "AAPL"
+
+
+class TestStockQuoteHistoryPagination:
+    def _seed(self, db_session, user, count):
+        from datetime import datetime, timedelta
+        import models
+
+        start = datetime(2024, 1, 1)
+        quotes = [
+            models.StockQuote(
+                user_id=user.id,
+                symbol=f"S{i}",
+                price=float(i),
+                # pairs of rows share a timestamp to exercise the id tiebreak
+                created_at=start + timedelta(minutes=i // 2)
+            )
+            for i in range(count)
+        ]
+        db_session.add_all(quotes)
+        db_session.commit()
+
+    def test_default_page_size(self, client, auth_headers, test_user, db_session):
+        """Test that history returns 50 rows by default with a cursor."""
+        self._seed(db_session, test_user, 60)
+        response = client.get("/stock-quotes/history", headers=auth_headers)
+        assert response.status_code == 200
+        assert len(response.json()) == 50
+        assert "X-Next-Cursor" in response.headers
+
+    def test_pages_cover_history_once(self, client, auth_headers, test_user, db_session):
+        """Test that following cursors walks every row exactly once, newest first."""
+        self._seed(db_session, test_user, 25)
+        seen = []
+        params = {"limit": 7}
+        while True:
+            response = client.get("/stock-quotes/history", headers=auth_headers, params=params)
+            assert response.status_code == 200
+            seen.extend(quote["symbol"] for quote in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            params = {"limit": 7, "before": cursor}
+        assert seen == [f"S{i}" for i in reversed(range(25))]
+
+    def test_limit_bounds(self, client, auth_headers):
+        """Test that out-of-range limits are rejected."""
+        response = client.get("/stock-quotes/history", headers=auth_headers, params={"limit": 0})
+        assert response.status_code == 422
+        response = client.get("/stock-quotes/history", headers=auth_headers, params={"limit": 1000})
+        assert response.status_code == 422
+
+
+class TestQuoteSerialization:
+    def test_history_matches_response_model(self, client, auth_headers):
+        """Test that the fast history path produces what the response model would."""
+        import schemas
+
+        client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+        response = client.get("/stock-quotes/history", headers=auth_headers)
+        assert response.headers["content-type"] == "application/json"
+        body = response.json()
+        expected = [
+            schemas.StockQuoteResponse.model_validate(item).model_dump(mode="json")
+            for item in body
+        ]
+        assert body == expected
+
+    def test_utc_datetimes_use_z_suffix(self):
+        """Test that aware UTC timestamps are encoded like Pydantic encodes them."""
+        import json
+        from datetime import datetime, timezone
+        import schemas
+        from serialization import encode_quote_rows
+
+        created_at = datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+        row = (1, "AAPL", 150.0, 1.5, 1.01, created_at)
+        encoded = json.loads(encode_quote_rows([row]))
+        model = schemas.StockQuoteResponse(
+            id=1, symbol="AAPL", price=150.0, change=1.5, change_percent=1.01, created_at=created_at
+        )
+        assert encoded == [json.loads(model.model_dump_json())]
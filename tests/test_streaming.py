@@ -0,0 +1,148 @@
+import asyncio
+import json
+import pytest
+
+from streaming import DROPPED, QuoteHub, quote_events
+
+
+class TestQuoteHub:
+    def test_one_poller_per_symbol(self):
+        """Test that subscribers of one symbol share a single poller."""
+        calls = []
+
+        async def fetch(symbol):
+            calls.append(symbol)
+            return {"price": 1.0}
+
+        async def run():
+            hub = QuoteHub(fetch, poll_interval=60)
+            first = hub.subscribe(["AAPL"])
+            second = hub.subscribe(["AAPL"])
+            events = [await first.queue.get(), await second.queue.get()]
+            stats = hub.stats()
+            await hub.close()
+            return events, stats
+
+        events, stats = asyncio.run(run())
+        assert calls == ["AAPL"]
+        assert events == [{"symbol": "AAPL", "price": 1.0}] * 2
+        assert stats == {"symbols": 1, "subscriptions": 2}
+
+    def test_poller_stops_without_subscribers(self):
+        """Test that the last unsubscribe cancels the poller."""
+
+        async def fetch(symbol):
+            return {"price": 1.0}
+
+        async def run():
+            hub = QuoteHub(fetch, poll_interval=60)
+            subscription = hub.subscribe(["AAPL", "MSFT"])
+            hub.unsubscribe(subscription)
+            return hub.stats()
+
+        assert asyncio.run(run()) == {"symbols": 0, "subscriptions": 0}
+
+    def test_slow_consumer_dropped(self):
+        """Test that a subscriber with a full buffer is disconnected."""
+
+        async def fetch(symbol):
+            return None
+
+        async def run():
+            hub = QuoteHub(fetch, poll_interval=60, buffer_size=2)
+            slow = hub.subscribe(["AAPL"])
+            fast = hub.subscribe(["AAPL"])
+            for price in range(3):
+                hub.publish("AAPL", {"price": price})
+                if fast.queue.full():
+                    fast.queue.get_nowait()
+            await hub.close()
+            return slow, fast
+
+        slow, fast = asyncio.run(run())
+        assert slow.dropped
+        assert slow.queue.get_nowait() is DROPPED
+        assert not fast.dropped
+
+    def test_late_subscriber_gets_latest_quote(self):
+        """Test that joining an already polled symbol sends its current quote at once."""
+        calls = []
+
+        async def fetch(symbol):
+            calls.append(symbol)
+            return {"price": 1.0}
+
+        async def run():
+            hub = QuoteHub(fetch, poll_interval=60)
+            first = hub.subscribe(["AAPL"])
+            await first.queue.get()
+            late = hub.subscribe(["AAPL"])
+            event = late.queue.get_nowait()
+            await hub.close()
+            return event
+
+        assert asyncio.run(run()) == {"symbol": "AAPL", "price": 1.0}
+        assert calls == ["AAPL"]
+
+    def test_unknown_symbol_ends_its_subscriptions(self):
+        """Test that a symbol found missing is reported and removed from its subscribers."""
+
+        async def fetch(symbol):
+            return None if symbol == "GONE" else {"price": 1.0}
+
+        async def run():
+            hub = QuoteHub(fetch, poll_interval=60)
+            only_gone = quote_events(hub, ["GONE"])
+            messages = [message async for message in only_gone]
+            mixed = hub.subscribe(["AAPL", "GONE"])
+            events = [await mixed.queue.get(), await mixed.queue.get()]
+            stats = hub.stats()
+            await hub.close()
+            return messages, events, mixed, stats
+
+        messages, events, mixed, stats = asyncio.run(run())
+        assert len(messages) == 1 and messages[0].startswith("event: error")
+        assert {"symbol": "GONE", "error": "Ticker not found"} in events
+        assert mixed.symbols == ["AAPL"]
+        assert stats == {"symbols": 1, "subscriptions": 1}
+
+
+class TestQuoteEvents:
+    def test_events_are_sse_encoded(self):
+        """Test that updates are sent as SSE quote events."""
+
+        async def fetch(symbol):
+            return {"price": 150.0}
+
+        async def run():
+            hub = QuoteHub(fetch, poll_interval=60)
+            stream = quote_events(hub, ["AAPL"])
+            message = await stream.__anext__()
+            await stream.aclose()
+            return message, hub.stats()
+
+        message, stats = asyncio.run(run())
+        event, data = message.strip().split("\n")
+        assert event == "event: quote"
+        assert json.loads(data[len("data: "):]) == {"symbol": "AAPL", "price": 150.0}
+        assert stats["symbols"] == 0
+
+
+class TestStreamEndpoint:
+    def test_stream_unauthenticated(self, client):
+        """Test streaming without authentication."""
+        response = client.get("/stock-quotes/stream", params={"symbols": "AAPL"})
+        assert response.status_code == 401
+
+    def test_stream_symbol_limit(self, client, auth_headers):
+        """Test that too many symbols are rejected."""
+        from streaming import STREAM_MAX_SYMBOLS
+
+        symbols = ",".join(f"S{i}" for i in range(STREAM_MAX_SYMBOLS + 1))
+        response = client.get("/stock-quotes/stream", headers=auth_headers, params={"symbols": symbols})
+        assert response.status_code == 400
+
+    def test_stream_requires_symbols(self, client, auth_headers):
+        """Test that an empty symbol list is rejected."""
+        response = client.get("/stock-quotes/stream", headers=auth_headers, params={"symbols": " , "})
+        assert response.status_code == 400
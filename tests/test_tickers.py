@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from tickers import TickerRefresher, TickerUniverse, normalize_symbol, ticker_universe
+
+
+@pytest.fixture
+def universe():
+    """Load a small ticker universe into the app."""
+    ticker_universe.replace(["AAPL", "AMD", "AMZN", "BRK.B", "MSFT"], source="test")
+    return ticker_universe
+
+
+class TestTickerUniverse:
+    def test_normalize_symbol(self):
+        """Test that symbols are trimmed and upper-cased, and junk is rejected."""
+        assert normalize_symbol(" brk.b ") == "BRK.B"
+        assert normalize_symbol("AAPL/../x") is None
+        assert normalize_symbol("") is None
+        assert normalize_symbol("A" * 20) is None
+
+    def test_everything_passes_until_loaded(self):
+        """Test that any well-formed symbol resolves while no universe is loaded."""
+        universe = TickerUniverse()
+        assert universe.resolve("zzzz") == "ZZZZ"
+        assert universe.resolve("no spaces") is None
+
+    def test_resolve_against_universe(self):
+        """Test that only known tickers resolve once a universe is loaded."""
+        universe = TickerUniverse()
+        universe.replace(["aapl", "MSFT"], source="test")
+        assert universe.resolve("aapl") == "AAPL"
+        assert universe.resolve("INVALID") is None
+        assert universe.stats()["rejected"] == 1
+
+    def test_prefix_search(self):
+        """Test that prefix search returns sorted matches up to the limit."""
+        universe = TickerUniverse()
+        universe.replace(["AMZN", "AAPL", "AMD", "MSFT", "A"], source="test")
+        assert universe.search("am") == ["AMD", "AMZN"]
+        assert universe.search("A", limit=2) == ["A", "AAPL"]
+        assert universe.search("X") == []
+
+    def test_load_file(self, tmp_path):
+        """Test loading a universe from a plain or CSV ticker file."""
+        path = tmp_path / "tickers.csv"
+        path.write_text("# ticker,name\nAAPL,Apple Inc.\n\nmsft,Microsoft\n")
+        universe = TickerUniverse()
+        universe.load_file(str(path))
+        assert universe.search("") == ["AAPL", "MSFT"]
+        assert universe.stats()["source"] == str(path)
+
+
+class TestTickerRefresher:
+    def test_refresh_from_upstream(self):
+        """Test that every page of the reference listing is loaded."""
+        import upstream
+
+        universe = TickerUniverse()
+        refresher = TickerRefresher(universe, lambda: upstream.fetch_ticker_universe(page_size=100))
+        asyncio.run(refresher.refresh_once())
+        assert universe.stats()["size"] == 510
+        assert universe.resolve("AAPL") == "AAPL"
+        assert universe.resolve("T0499") == "T0499"
+
+    def test_empty_listing_keeps_previous_universe(self):
+        """Test that an empty upstream listing does not wipe the universe."""
+        async def fetch():
+            return []
+
+        universe = TickerUniverse()
+        universe.replace(["AAPL"], source="test")
+        with pytest.raises(ValueError):
+            asyncio.run(TickerRefresher(universe, fetch).refresh_once())
+        assert universe.resolve("AAPL") == "AAPL"
+
+
+class TestSymbolValidation:
+    def test_unknown_symbol_skips_upstream(self, client, auth_headers, fake_upstream, universe):
+        """Test that a symbol outside the universe is a 404 without an upstream call."""
+        response = client.post("/stock-quote", headers=auth_headers, json={"symbol": "INVALID"})
+        assert response.status_code == 404
+        assert "not found" in response.json()["detail"].lower()
+        assert fake_upstream == []
+
+    def test_malformed_symbol_skips_upstream(self, client, auth_headers, fake_upstream):
+        """Test that malformed symbols are rejected even without a universe."""
+        response = client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL/../v3"})
+        assert response.status_code == 404
+        assert fake_upstream == []
+
+    def test_known_symbol_is_fetched(self, client, auth_headers, fake_upstream, universe):
+        """Test that known symbols still go to the upstream, normalized."""
+        response = client.post("/stock-quote", headers=auth_headers, json={"symbol": " aapl "})
+        assert response.status_code == 200
+        assert response.json()["symbol"] == "AAPL"
+        assert len(fake_upstream) == 1
+
+    def test_batch_filters_unknown_symbols(self, client, auth_headers, fake_upstream, universe):
+        """Test that batch lookups only send known symbols upstream."""
+        response = client.post(
+            "/stock-quotes/batch", headers=auth_headers, json={"symbols": ["AAPL", "NOPE"]}
+        )
+        results = {item["symbol"]: item for item in response.json()["results"]}
+        assert results["AAPL"]["quote"]["price"] == 150.0
+        assert results["NOPE"]["error"] == "Ticker not found"
+        assert fake_upstream[0].url.params["tickers"] == "AAPL"
+
+    def test_batch_of_unknown_symbols_makes_no_call(self, client, auth_headers, fake_upstream, universe):
+        """Test that a batch with no known symbols never reaches the upstream."""
+        response = client.post("/stock-quotes/batch", headers=auth_headers, json={"symbols": ["NOPE"]})
+        assert response.json()["results"] == [{"symbol": "NOPE", "quote": None, "error": "Ticker not found", "stale": False}]
+        assert fake_upstream == []
+
+    def test_stream_rejects_unknown_symbols(self, client, auth_headers, universe):
+        """Test that streams for unknown symbols are refused up front."""
+        response = client.get(
+            "/stock-quotes/stream", headers=auth_headers, params={"symbols": "AAPL,NOPE"}
+        )
+        assert response.status_code == 404
+        assert "NOPE" in response.json()["detail"]
+
+
+class TestTickerSearch:
+    def test_search(self, client, auth_headers, universe):
+        """Test prefix autocomplete over the ticker universe."""
+        response = client.get("/tickers/search", headers=auth_headers, params={"prefix": "am"})
+        assert response.status_code == 200
+        assert response.json() == {"prefix": "AM", "symbols": ["AMD", "AMZN"]}
+
+    def test_search_limit(self, client, auth_headers, universe):
+        """Test that the number of suggestions is capped."""
+        response = client.get(
+            "/tickers/search", headers=auth_headers, params={"prefix": "a", "limit": 2}
+        )
+        assert response.json()["symbols"] == ["AAPL", "AMD"]
+
+    def test_search_requires_auth(self, client):
+        """Test that autocomplete requires authentication."""
+        assert client.get("/tickers/search", params={"prefix": "A"}).status_code == 401
+
+    def test_stats(self, client, universe):
+        """Test that the universe is reported in the stats endpoint."""
+        stats = client.get("/stats/tickers").json()
+        assert stats["loaded"] is True
+        assert stats["size"] == 5
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+
+class TestUpstreamClient:
+    def test_quote_uses_shared_client(self, client, auth_headers, fake_upstream):
+        """Test that quote lookups go through the pooled upstream client."""
+        response = client.post(
+            "/stock-quote",
+            headers=auth_headers,
+            json={"symbol": "aapl"}
+        )
+        assert response.status_code == 200
+        assert response.json()["price"] == 150.0
+        assert len(fake_upstream) == 1
+        assert fake_upstream[0].url.path.endswith("/tickers/AAPL")
+        assert "apiKey" in fake_upstream[0].url.params
+
+    def test_quote_unknown_symbol(self, client, auth_headers, fake_upstream):
+        """Test that an upstream 404 maps to Ticker not found."""
+        response = client.post(
+            "/stock-quote",
+            headers=auth_headers,
+            json={"symbol": "INVALID"}
+        )
+        assert response.status_code == 404
+        assert "not found" in response.json()["detail"].lower()
+
+    def test_upstream_error_returns_502(self, client, auth_headers):
+        """Test that upstream failures surface as 502 instead of crashing."""
+        import httpx
+        import upstream
+
+        asyncio.run(upstream.set_transport(httpx.MockTransport(lambda request: httpx.Response(503))))
+        try:
+            response = client.post(
+                "/stock-quote",
+                headers=auth_headers,
+                json={"symbol": "AAPL"}
+            )
+        finally:
+            asyncio.run(upstream.set_transport(None))
+        assert response.status_code == 502
+
+    def test_client_closed_on_shutdown(self, fake_upstream):
+        """Test that the lifespan closes the shared client."""
+        from fastapi.testclient import TestClient
+        from main import app
+        import upstream
+
+        with TestClient(app):
+            shared = upstream.get_client()
+        assert shared.is_closed
+
+    def test_set_transport_closes_previous_client(self, fake_upstream):
+        """Test that switching transports closes the client built on the old one."""
+        import httpx
+        import upstream
+
+        previous = upstream.get_client()
+        asyncio.run(upstream.set_transport(httpx.MockTransport(lambda request: httpx.Response(200))))
+        assert previous.is_closed
+        assert upstream.get_client() is not previous
@@ -32,8 +32,8 @@ class TestDeleteUser:
         assert response.status_code == 204
         
         # Verify user is deleted from database
-        from main import get_user_by_email
-        user = get_user_by_email(db_session, test_user.email)
+        import models
+        user = db_session.query(models.User).filter_by(email=test_user.email).first()
         assert user is None
 
     def test_delete_user_unauthenticated(self, client):
@@ -66,6 +66,32 @@ class TestDeleteUser:
         ).all()
         assert len(quotes) == 0
 
+    def test_delete_user_does_not_load_quotes(self, client, auth_headers, test_user, db_session):
+        """Test that quotes are deleted set-based, without selecting them first."""
+        import models
+        from sqlalchemy import event
+        from tests.conftest import async_engine
+
+        db_session.add_all(
+            models.StockQuote(user_id=test_user.id, symbol="AAPL", price=150.0)
+            for _ in range(500)
+        )
+        db_session.commit()
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            response = client.delete("/users/me", headers=auth_headers)
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+        assert response.status_code == 204
+        assert not [s for s in statements if s.startswith("SELECT") and "stock_quotes" in s]
+        assert db_session.query(models.StockQuote).count() == 0
+
     def test_cannot_use_token_after_deletion(self, client, auth_headers):
         """Test that token is invalid after user deletion."""
         # Delete user
@@ -0,0 +1,145 @@
+import asyncio
+import pytest
+from sqlalchemy import delete
+
+from write_behind import QuoteWriter, WriteBehindFull
+
+
+def _row(user_id, symbol="AAPL"):
+    return {"user_id": user_id, "symbol": symbol, "price": 150.0, "change": 1.0, "change_percent": 0.5}
+
+
+class TestQuoteWriter:
+    def test_rows_flushed_in_bulk(self, db_session, test_user, async_session_factory):
+        """Test that many rows are written with few commits."""
+        import models
+
+        async def run():
+            writer = QuoteWriter(async_session_factory, batch_size=50, flush_interval=0.05)
+            await writer.start()
+            rows = [await writer.submit(_row(test_user.id)) for _ in range(120)]
+            await writer.stop()
+            return writer, rows
+
+        writer, rows = asyncio.run(run())
+        assert len({row["id"] for row in rows}) == 120
+        assert all(row["created_at"] is not None for row in rows)
+        assert writer.flushed_rows == 120
+        assert writer.flushes <= 4
+        assert db_session.query(models.StockQuote).count() == 120
+
+    def test_stop_drains_buffer(self, db_session, test_user, async_session_factory):
+        """Test that shutdown writes rows that have not been flushed yet."""
+        import models
+
+        async def run():
+            writer = QuoteWriter(async_session_factory, batch_size=1000, flush_interval=60)
+            await writer.start()
+            for _ in range(5):
+                await writer.submit(_row(test_user.id))
+            await writer.stop()
+
+        asyncio.run(run())
+        assert db_session.query(models.StockQuote).count() == 5
+
+    def test_full_queue_applies_backpressure(self, db_session, test_user, async_session_factory):
+        """Test that submit fails once the queue stays full."""
+
+        async def run():
+            writer = QuoteWriter(
+                async_session_factory, batch_size=1000, flush_interval=60,
+                queue_size=2, enqueue_timeout=0.01
+            )
+            await writer.start()
+            await writer.submit(_row(test_user.id))
+            await writer.submit(_row(test_user.id))
+            try:
+                with pytest.raises(WriteBehindFull):
+                    await writer.submit(_row(test_user.id))
+            finally:
+                await writer.stop()
+
+        asyncio.run(run())
+
+    def test_discard_user(self, db_session, test_user, async_session_factory):
+        """Test that a deleted user's buffered rows are dropped and free their slots."""
+        import models
+
+        async def run():
+            writer = QuoteWriter(
+                async_session_factory, batch_size=1000, flush_interval=60, queue_size=3
+            )
+            await writer.start()
+            await writer.submit(_row(test_user.id))
+            await writer.submit(_row(test_user.id + 1))
+            await writer.submit(_row(test_user.id))
+            discarded = writer.discard_user(test_user.id + 1)
+            # The freed slot takes a new row without waiting
+            await writer.submit(_row(test_user.id))
+            await writer.stop()
+            return discarded
+
+        assert asyncio.run(run()) == 1
+        assert db_session.query(models.StockQuote).count() == 3
+
+    def test_bad_row_is_isolated(self, db_session, test_user, async_session_factory):
+        """Test that a row the database rejects is dropped without the rest of its batch."""
+        import models
+
+        async def run():
+            writer = QuoteWriter(async_session_factory, batch_size=1000, flush_interval=60)
+            await writer.start()
+            for index in range(7):
+                await writer.submit(_row(test_user.id, symbol=None if index == 4 else "AAPL"))
+            await writer.stop()
+            return writer
+
+        writer = asyncio.run(run())
+        assert (writer.flushed_rows, writer.dropped_rows) == (6, 1)
+        assert db_session.query(models.StockQuote).count() == 6
+
+    def test_rows_of_deleted_user_are_skipped(self, db_session, test_user, async_session_factory):
+        """Test that rows submitted after their user was deleted elsewhere are skipped, not orphaned."""
+        import models
+
+        gone = models.User(email="gone@example.com", hashed_password="x")
+        db_session.add(gone)
+        db_session.commit()
+        gone_id = gone.id
+
+        async def run():
+            writer = QuoteWriter(async_session_factory, batch_size=1000, flush_interval=60)
+            await writer.start()
+            await writer.submit(_row(gone_id))
+            # Another worker deletes the account; this writer's buffer is untouched
+            async with async_session_factory() as db:
+                await db.execute(delete(models.User).where(models.User.id == gone_id))
+                await db.commit()
+            await writer.submit(_row(gone_id))
+            await writer.submit(_row(test_user.id))
+            await writer.stop()
+            return writer
+
+        writer = asyncio.run(run())
+        assert writer.dropped_rows == 0
+        assert [quote.user_id for quote in db_session.query(models.StockQuote).all()] == [test_user.id]
+
+
+class TestWriteBehindEndpoint:
+    def test_quote_written_behind(self, client, auth_headers, test_user, db_session,
+                                  async_session_factory, fake_upstream, monkeypatch):
+        """Test that /stock-quote returns before its row is committed."""
+        import main
+        import models
+
+        writer = QuoteWriter(async_session_factory, batch_size=1000, flush_interval=60)
+        monkeypatch.setattr(main, "quote_writer", writer)
+        client.portal.call(writer.start)
+
+        response = client.post("/stock-quote", headers=auth_headers, json={"symbol": "AAPL"})
+        assert response.status_code == 200
+        quote_id = response.json()["id"]
+        assert db_session.query(models.StockQuote).count() == 0
+
+        client.portal.call(writer.stop)
+        assert db_session.get(models.StockQuote, quote_id).symbol == "AAPL"
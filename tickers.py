@@ -0,0 +1,152 @@
+import asyncio
+import bisect
+import logging
+import os
+import re
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+
+from rate_limit import background_priority
+
+logger = logging.getLogger(__name__)
+
+TICKER_UNIVERSE_FILE = os.getenv("TICKER_UNIVERSE_FILE", "")
+TICKER_REFRESH_INTERVAL = float(os.getenv("TICKER_REFRESH_INTERVAL", "0"))
+TICKER_SEARCH_LIMIT = 20
+MAX_TICKER_SEARCH_LIMIT = 100
+
+# Upper-case letters and digits, with "." or "-" for share classes (BRK.B)
+SYMBOL_PATTERN = re.compile(r"[A-Z0-9][A-Z0-9.\-]{0,15}")
+
+
+def normalize_symbol(raw: str) -> Optional[str]:
+    """Upper-case and trim a requested symbol; None if it cannot be a ticker."""
+    symbol = raw.strip().upper()
+    return symbol if SYMBOL_PATTERN.fullmatch(symbol) else None
+
+
+class TickerUniverse:
+    """The set of known tickers, held locally for validation and autocomplete.
+
+    Symbols are kept twice: a frozenset for membership checks and a
+    sorted list that prefix searches bisect into.
+    """
+
+    def __init__(self):
+        self._set: frozenset = frozenset()
+        self._sorted: list[str] = []
+        self.source: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.rejected = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def replace(self, symbols: Iterable[str], source: str):
+        """Swap in a new universe of tickers."""
+        normalized = {normalize_symbol(symbol) for symbol in symbols}
+        normalized.discard(None)
+        self._set = frozenset(normalized)
+        self._sorted = sorted(normalized)
+        self.source = source
+        self.loaded_at = time.time()
+
+    def load_file(self, path: str):
+        """Load tickers from a file with one symbol (or CSV row starting with one) per line."""
+        with open(path) as universe_file:
+            symbols = [
+                line.split(",", 1)[0]
+                for line in universe_file
+                if line.strip() and not line.startswith("#")
+            ]
+        self.replace(symbols, source=path)
+
+    def resolve(self, raw: str) -> Optional[str]:
+        """Normalize a requested symbol; None if it is malformed or not a known ticker.
+
+        Every well-formed symbol passes until a universe is loaded.
+        """
+        symbol = normalize_symbol(raw)
+        if symbol is None or (self.loaded and symbol not in self._set):
+            self.rejected += 1
+            return None
+        return symbol
+
+    def search(self, prefix: str, limit: int = TICKER_SEARCH_LIMIT) -> list[str]:
+        """Return up to limit tickers starting with prefix, in sorted order."""
+        prefix = prefix.strip().upper()
+        start = bisect.bisect_left(self._sorted, prefix)
+        matches = []
+        for symbol in self._sorted[start:start + limit]:
+            if not symbol.startswith(prefix):
+                break
+            matches.append(symbol)
+        return matches
+
+    def clear(self):
+        """Forget the loaded universe."""
+        self._set = frozenset()
+        self._sorted = []
+        self.source = None
+        self.loaded_at = None
+        self.rejected = 0
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "source": self.source,
+            "size": len(self._sorted),
+            "age_seconds": None if self.loaded_at is None else round(time.time() - self.loaded_at, 1),
+            "rejected": self.rejected,
+        }
+
+
+class TickerRefresher:
+    """Periodically reloads the ticker universe from the upstream."""
+
+    def __init__(
+        self,
+        universe: TickerUniverse,
+        fetch: Callable[[], Awaitable[list[str]]],
+        interval: float = TICKER_REFRESH_INTERVAL,
+    ):
+        self.universe = universe
+        self.fetch = fetch
+        self.interval = interval
+        self.refreshes = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh_once(self):
+        """Replace the universe with a fresh upstream listing."""
+        symbols = await self.fetch()
+        # An empty listing is far more likely an upstream hiccup than reality
+        if not symbols:
+            raise ValueError("Upstream returned no tickers")
+        self.universe.replace(symbols, source="upstream")
+        self.refreshes += 1
+
+    async def _run(self):
+        while True:
+            try:
+                with background_priority():
+                    await self.refresh_once()
+            except Exception:
+                self.failures += 1
+                logger.warning("Ticker universe refresh failed", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start refreshing in the background."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refresh."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+ticker_universe = TickerUniverse()
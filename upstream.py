@@ -0,0 +1,197 @@
+import asyncio
+import os
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from metrics import stage
+from rate_limit import UpstreamBudgetExhausted, upstream_scheduler
+
+if TYPE_CHECKING:
+    # httpx is imported on first use to keep worker startup fast
+    import httpx
+
+MASSIVE_BASE_URL = os.getenv("MASSIVE_BASE_URL", "https://api.massive.com")
+
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "5"))
+UPSTREAM_POOL_TIMEOUT = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "5"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "50"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+UPSTREAM_BATCH_CHUNK_SIZE = int(os.getenv("UPSTREAM_BATCH_CHUNK_SIZE", "50"))
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML)"
+}
+
+breaker = CircuitBreaker()
+
+_client: "Optional[httpx.AsyncClient]" = None
+_transport: "Optional[httpx.AsyncBaseTransport]" = None
+
+
+async def set_transport(transport: "Optional[httpx.AsyncBaseTransport]"):
+    """Route upstream traffic through a custom transport (tests, benchmarks).
+
+    The current client is closed first, so its pooled connections are
+    released; the next call builds one on the new transport.
+    """
+    global _transport
+    await close_client()
+    _transport = transport
+
+
+def get_client() -> "httpx.AsyncClient":
+    """Get the process-wide keep-alive client for the Massive API."""
+    global _client
+    if _client is None or _client.is_closed:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            base_url=MASSIVE_BASE_URL,
+            headers=HEADERS,
+            timeout=httpx.Timeout(
+                UPSTREAM_READ_TIMEOUT,
+                connect=UPSTREAM_CONNECT_TIMEOUT,
+                pool=UPSTREAM_POOL_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+            transport=_transport,
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+class UpstreamUnavailable(Exception):
+    """The Massive API failed, timed out, or is behind an open circuit."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamQuotaExhausted(UpstreamUnavailable):
+    """The plan's upstream request budget is spent for now."""
+
+
+async def _send(path: str, query: dict) -> "httpx.Response":
+    with stage("upstream"):
+        response = await get_client().get(path, params=query)
+    if response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+
+async def get(path: str, params: Optional[dict] = None) -> "httpx.Response":
+    """Issue an authenticated GET against the Massive API.
+
+    The call waits for request budget from the upstream scheduler, at the
+    priority of the calling context, and then goes through the circuit
+    breaker.
+    """
+    import httpx
+
+    query = {"apiKey": os.getenv("MASSIVE")}
+    if params:
+        query.update(params)
+    try:
+        await upstream_scheduler.acquire()
+    except UpstreamBudgetExhausted as exc:
+        raise UpstreamQuotaExhausted(str(exc), retry_after=exc.retry_after) from exc
+    try:
+        return await breaker.call(_send, path, query)
+    except CircuitOpen as exc:
+        await upstream_scheduler.release_unused()
+        raise UpstreamUnavailable(str(exc), retry_after=exc.retry_after) from exc
+    except httpx.HTTPError as exc:
+        raise UpstreamUnavailable(f"Upstream request failed: {exc!r}") from exc
+
+
+def _check(response: "httpx.Response"):
+    if response.is_error:
+        raise UpstreamUnavailable(f"Upstream returned {response.status_code}")
+
+
+async def fetch_snapshot(symbol: str) -> Optional[dict]:
+    """Fetch the snapshot for a single ticker, or None if it does not exist."""
+    response = await get(f"/v2/snapshot/locale/us/markets/stocks/tickers/{symbol}")
+    if response.status_code == 404:
+        return None
+    _check(response)
+    return response.json()["ticker"]
+
+
+async def _fetch_snapshot_chunk(symbols: list[str]) -> dict[str, dict]:
+    response = await get(
+        "/v2/snapshot/locale/us/markets/stocks/tickers",
+        params={"tickers": ",".join(symbols)},
+    )
+    _check(response)
+    return {ticker["ticker"]: ticker for ticker in response.json().get("tickers") or []}
+
+
+async def fetch_snapshots(symbols: list[str]) -> dict[str, dict]:
+    """Fetch snapshots for many tickers with the multi-ticker endpoint.
+
+    Symbols are split into chunks of UPSTREAM_BATCH_CHUNK_SIZE that are
+    requested concurrently. Unknown tickers are absent from the result.
+    """
+    chunks = [
+        symbols[i:i + UPSTREAM_BATCH_CHUNK_SIZE]
+        for i in range(0, len(symbols), UPSTREAM_BATCH_CHUNK_SIZE)
+    ]
+    snapshots = {}
+    for chunk in await asyncio.gather(*(_fetch_snapshot_chunk(chunk) for chunk in chunks)):
+        snapshots.update(chunk)
+    return snapshots
+
+
+async def fetch_ticker_universe(page_size: int = 1000) -> list[str]:
+    """Fetch every active US stock ticker from the reference tickers endpoint.
+
+    Results are paginated; each page costs one upstream request.
+    """
+    symbols = []
+    path, params = "/v3/reference/tickers", {"market": "stocks", "active": "true", "limit": page_size}
+    while path:
+        response = await get(path, params)
+        _check(response)
+        body = response.json()
+        symbols.extend(ticker["ticker"] for ticker in body.get("results") or [])
+        # next_url carries the cursor; httpx replaces a URL's query with params
+        next_url = urlsplit(body.get("next_url") or "")
+        path, params = next_url.path, dict(parse_qsl(next_url.query))
+    return symbols
+
+
+async def fetch_aggregates(symbol: str, timespan: str, start_ms: int, end_ms: int) -> list[dict]:
+    """Fetch the 1-unit bars of a ticker between two millisecond timestamps, oldest first.
+
+    Millisecond bounds keep day boundaries in UTC regardless of how the
+    upstream interprets calendar dates. Long ranges are paginated.
+    """
+    bars = []
+    path = f"/v2/aggs/ticker/{symbol}/range/1/{timespan}/{start_ms}/{end_ms}"
+    params = {"adjusted": "true", "sort": "asc", "limit": 50000}
+    while path:
+        response = await get(path, params)
+        if response.status_code == 404:
+            return []
+        _check(response)
+        body = response.json()
+        bars.extend(body.get("results") or [])
+        next_url = urlsplit(body.get("next_url") or "")
+        path, params = next_url.path, dict(parse_qsl(next_url.query))
+    return bars
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import bindparam, exists, func, insert, select, text
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+import models as models
+
+logger = logging.getLogger(__name__)
+
+QUOTE_WRITE_BEHIND = os.getenv("QUOTE_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_ENQUEUE_TIMEOUT = float(os.getenv("WRITE_BEHIND_ENQUEUE_TIMEOUT", "1"))
+WRITE_BEHIND_ID_BLOCK = int(os.getenv("WRITE_BEHIND_ID_BLOCK", "1000"))
+WRITE_BEHIND_MAX_ATTEMPTS = 3
+
+# Failures worth retrying as they are; anything else is blamed on the rows
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+
+def _insert_for_existing_users():
+    """INSERT ... SELECT of one parameter row that is skipped when its user is gone.
+
+    Another worker may delete an account while its rows are still
+    buffered here; those rows must neither become orphans nor fail the
+    batch they are flushed with.
+    """
+    table = models.StockQuote.__table__
+    params = {column.name: bindparam(column.name, type_=column.type) for column in table.columns}
+    return insert(table).from_select(
+        list(params),
+        select(*params.values()).where(exists().where(models.User.id == params["user_id"])),
+    )
+
+
+INSERT_QUOTE = _insert_for_existing_users()
+QUOTE_COLUMNS = [column.name for column in models.StockQuote.__table__.columns]
+
+
+class WriteBehindFull(Exception):
+    """Raised when the queue stays full for longer than the enqueue timeout."""
+
+
+class QuoteIdAllocator:
+    """Hands out stock_quotes ids from blocks reserved in one round trip.
+
+    On Postgres blocks come from the table's own serial sequence, so they
+    never collide with ids assigned by direct inserts or other workers.
+    Other databases continue from max(id); that is only safe with a single
+    writing process, which is what SQLite deployments have.
+    """
+
+    def __init__(self, session_factory, block_size: int = WRITE_BEHIND_ID_BLOCK):
+        self.session_factory = session_factory
+        self.block_size = block_size
+        self._ids: list[int] = []
+        self._next_local: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    async def take(self, count: int) -> list[int]:
+        """Return count unused ids."""
+        async with self._lock:
+            while len(self._ids) < count:
+                self._ids.extend(await self._reserve(max(self.block_size, count)))
+            ids, self._ids = self._ids[:count], self._ids[count:]
+            return ids
+
+    async def _reserve(self, count: int) -> list[int]:
+        async with self.session_factory() as db:
+            if db.bind.dialect.name == "postgresql":
+                result = await db.execute(
+                    text(
+                        "SELECT nextval(pg_get_serial_sequence('stock_quotes', 'id')) "
+                        "FROM generate_series(1, :count)"
+                    ),
+                    {"count": count},
+                )
+                return list(result.scalars())
+            if self._next_local is None:
+                current = await db.scalar(select(func.max(models.StockQuote.id)))
+                self._next_local = (current or 0) + 1
+        start, self._next_local = self._next_local, self._next_local + count
+        return list(range(start, start + count))
+
+
+class QuoteWriter:
+    """Buffers StockQuote rows in memory and bulk-inserts them.
+
+    A flush runs when batch_size rows are waiting or flush_interval
+    seconds have passed. Rows get their id and created_at up front, so
+    callers can respond without waiting for the insert. At most
+    queue_size rows may be buffered or in flight; beyond that submit()
+    waits up to enqueue_timeout and then raises WriteBehindFull.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        queue_size: int = WRITE_BEHIND_QUEUE_SIZE,
+        enqueue_timeout: float = WRITE_BEHIND_ENQUEUE_TIMEOUT,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout
+        self.ids = QuoteIdAllocator(session_factory)
+        self.running = False
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+        self._buffer: list[dict] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the background flusher."""
+        self._slots = asyncio.Semaphore(self.queue_size)
+        self._wakeup = asyncio.Event()
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting rows and flush everything still buffered."""
+        if not self.running:
+            return
+        self.running = False
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def submit_many(self, rows: list[dict]) -> list[dict]:
+        """Queue rows for insert and return them with id and created_at set."""
+        for acquired in range(len(rows)):
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                for _ in range(acquired):
+                    self._slots.release()
+                raise WriteBehindFull()
+
+        created_at = datetime.now(timezone.utc)
+        for row, quote_id in zip(rows, await self.ids.take(len(rows))):
+            row["id"] = quote_id
+            row["created_at"] = created_at
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return rows
+
+    async def submit(self, row: dict) -> dict:
+        """Queue a single row for insert."""
+        return (await self.submit_many([row]))[0]
+
+    def discard_user(self, user_id: int) -> int:
+        """Drop buffered rows of a deleted user so their flush cannot fail; return how many."""
+        kept = [row for row in self._buffer if row["user_id"] != user_id]
+        discarded = len(self._buffer) - len(kept)
+        self._buffer[:] = kept
+        for _ in range(discarded):
+            self._slots.release()
+        return discarded
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._buffer:
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:self.batch_size]
+                await self._flush(batch)
+            if not self.running:
+                return
+
+    async def _flush(self, batch: list[dict]):
+        try:
+            await self._insert(batch)
+        finally:
+            for _ in batch:
+                self._slots.release()
+
+    async def _insert(self, batch: list[dict]):
+        """Insert rows, retrying connection failures.
+
+        A batch the database rejects for its contents is split in half
+        until the offending rows are isolated, so only they are dropped.
+        """
+        for attempt in range(1, WRITE_BEHIND_MAX_ATTEMPTS + 1):
+            try:
+                async with self.session_factory() as db:
+                    await db.execute(
+                        INSERT_QUOTE, [{name: row.get(name) for name in QUOTE_COLUMNS} for row in batch]
+                    )
+                    await db.commit()
+                self.flushes += 1
+                self.flushed_rows += len(batch)
+                return
+            except Exception as exc:
+                transient = isinstance(exc, TRANSIENT_ERRORS) or getattr(exc, "connection_invalidated", False)
+                if not transient:
+                    if len(batch) == 1:
+                        self.dropped_rows += 1
+                        logger.exception("Dropping quote row %s rejected by the database", batch[0]["id"])
+                        return
+                    middle = len(batch) // 2
+                    await self._insert(batch[:middle])
+                    await self._insert(batch[middle:])
+                    return
+                if attempt == WRITE_BEHIND_MAX_ATTEMPTS:
+                    self.dropped_rows += len(batch)
+                    logger.exception("Dropping %d quote rows after failed flushes", len(batch))
+                    return
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+    def stats(self) -> dict:
+        """Return counters for monitoring."""
+        return {
+            "running": self.running,
+            "buffered": len(self._buffer),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "dropped_rows": self.dropped_rows,
+        }